@@ -0,0 +1,202 @@
+# src/travel_planner/affinity.py
+"""
+City x interest-category affinity scores used for the stopover experience bonus.
+
+    PYTHONPATH=src python -m travel_planner.affinity [--store itineraries.json] [--output affinity.npz]
+
+The matrix is rebuilt offline from the itinerary store: each city's itineraries are
+tokenized and every category's keywords are counted per thousand words, then each
+category column is scaled so the strongest city scores 1.0. ``precompute`` rebuilds it
+after filling the store; until then no matrix exists and every city scores 0, because
+a matrix built from a handful of seeded cities would favour exactly those cities.
+"""
+import argparse
+import os
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from travel_planner.interests import INTEREST_CATEGORIES, clean_interest
+from travel_planner.passages import tokenize
+
+DEFAULT_AFFINITY_PATH = ".cache/affinity.npz"
+
+# Words that signal each category, both in itinerary text and in free-form interests
+CATEGORY_KEYWORDS: Dict[str, frozenset] = {
+    "food & dining": frozenset(
+        "food dining eat eating restaurant restaurants hawker cuisine dumplings noodles seafood "
+        "cafe cafes breakfast lunch dinner brunch snack snacks street".split()),
+    "culture & history": frozenset(
+        "culture cultural history historic historical temple temples museum museums heritage colonial "
+        "palace mosque church cathedral fort monastery shrine traditional architecture".split()),
+    "nature & outdoors": frozenset(
+        "nature outdoors outdoor park parks garden gardens hike hiking trail trails peak island islands "
+        "botanic wildlife mountain mountains harbour reserve walk views".split()),
+    "shopping": frozenset(
+        "shopping shop shops mall malls boutique boutiques market markets souvenir souvenirs bazaar "
+        "stores arcade".split()),
+    "arts & entertainment": frozenset(
+        "arts art gallery galleries theatre theater opera show shows music performance concert "
+        "entertainment festival cinema".split()),
+    "beaches & relaxation": frozenset(
+        "beach beaches relaxation relax relaxing spa pool sand bay swim swimming sunset lagoon "
+        "massage resort".split()),
+    "adventure & sports": frozenset(
+        "adventure sports sport climb climbing kayak kayaking surf surfing dive diving cycling bike "
+        "zipline cruise ferry".split()),
+    "wine & nightlife": frozenset(
+        "wine wines nightlife bar bars rooftop cocktail cocktails club clubs pub pubs night brewery "
+        "drinks".split()),
+}
+
+
+def affinity_path() -> Path:
+    return Path(os.getenv("AFFINITY_PATH") or DEFAULT_AFFINITY_PATH)
+
+
+def category_weights(interests: Optional[Sequence[str]]) -> np.ndarray:
+    """0/1 vector over INTEREST_CATEGORIES for the categories a traveller's interests name"""
+    weights = np.zeros(len(INTEREST_CATEGORIES), dtype=np.float32)
+    for interest in interests or []:
+        if not isinstance(interest, str):
+            continue
+        label = clean_interest(interest)
+        words = set(tokenize(label))
+        for col, category in enumerate(INTEREST_CATEGORIES):
+            if label == category or words & CATEGORY_KEYWORDS[category]:
+                weights[col] = 1.0
+    return weights
+
+
+def is_category(label: str) -> bool:
+    """Whether a cleaned interest names one of the UI categories or one of their keywords"""
+    return label in CATEGORY_KEYWORDS or any(set(tokenize(label)) & keywords for keywords in CATEGORY_KEYWORDS.values())
+
+
+def keyword_profile(texts: Sequence[str]) -> np.ndarray:
+    """Keyword hits per thousand words for every category"""
+    counts = np.zeros(len(INTEREST_CATEGORIES), dtype=np.float64)
+    total = 0
+    for text in texts:
+        tokens = tokenize(text)
+        total += len(tokens)
+        for col, category in enumerate(INTEREST_CATEGORIES):
+            keywords = CATEGORY_KEYWORDS[category]
+            counts[col] += sum(1 for token in tokens if token in keywords)
+    return counts * 1000 / total if total else counts
+
+
+class AffinityMatrix:
+    """
+    Dense ``(cities, categories)`` float32 array plus the row of each IATA code.
+
+    Unknown cities map to an extra all-zero row, so scoring a batch is one gather and one
+    matrix product with no per-offer branching.
+    """
+
+    def __init__(self, codes: Sequence[str], scores: np.ndarray):
+        scores = np.asarray(scores, dtype=np.float32).reshape(len(codes), len(INTEREST_CATEGORIES))
+        self.codes = [c.upper() for c in codes]
+        self.rows = {code: row for row, code in enumerate(self.codes)}
+        # the trailing zero row stands in for every unknown city
+        self.scores = np.vstack([scores, np.zeros((1, len(INTEREST_CATEGORIES)), dtype=np.float32)])
+
+    @classmethod
+    def empty(cls) -> "AffinityMatrix":
+        return cls([], np.zeros((0, len(INTEREST_CATEGORIES))))
+
+    @classmethod
+    def load(cls, path) -> "AffinityMatrix":
+        with np.load(path) as data:
+            categories = [str(c) for c in data["categories"]]
+            if categories != INTEREST_CATEGORIES:
+                raise ValueError(f"{path} was built for categories {categories}; rebuild it")
+            return cls([str(c) for c in data["codes"]], data["scores"])
+
+    @classmethod
+    def from_env(cls) -> "AffinityMatrix":
+        path = affinity_path()
+        return cls.load(path) if path.exists() else cls.empty()
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def row_indices(self, codes: Sequence[str]) -> np.ndarray:
+        missing = len(self.codes)
+        return np.fromiter((self.rows.get(c.upper(), missing) if c else missing for c in codes),
+                           dtype=np.intp, count=len(codes))
+
+    def score(self, codes: Sequence[str], weights: np.ndarray) -> np.ndarray:
+        """
+        Affinity of each city for the weighted categories: ``weights`` is one vector over
+        INTEREST_CATEGORIES (result shape ``(len(codes),)``) or one column per traveller
+        (result shape ``(len(codes), travellers)``).
+        """
+        return self.scores[self.row_indices(codes)] @ np.asarray(weights, dtype=np.float32)
+
+    def save(self, path) -> Path:
+        target = Path(path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with open(target, "wb") as fh:
+            np.savez(fh, codes=np.array(self.codes, dtype="U3"), categories=np.array(INTEREST_CATEGORIES),
+                     scores=self.scores[:-1])
+        return target
+
+
+def build_matrix(itineraries: Dict[str, Dict]) -> AffinityMatrix:
+    """Affinity matrix from itinerary-store entries (``{key: {"city", "text", ...}}``)"""
+    texts: Dict[str, List[str]] = {}
+    for entry in itineraries.values():
+        if entry.get("text"):
+            texts.setdefault(entry["city"].upper(), []).append(entry["text"])
+    codes = sorted(texts)
+    if not codes:
+        return AffinityMatrix.empty()
+    profiles = np.vstack([keyword_profile(texts[code]) for code in codes])
+    peak = profiles.max(axis=0)
+    scores = np.divide(profiles, peak, out=np.zeros_like(profiles), where=peak > 0)
+    return AffinityMatrix(codes, scores)
+
+
+_matrix: Optional[AffinityMatrix] = None
+_matrix_lock = threading.Lock()
+
+
+def get_affinity_matrix() -> AffinityMatrix:
+    global _matrix
+    with _matrix_lock:
+        if _matrix is None:
+            _matrix = AffinityMatrix.from_env()
+        return _matrix
+
+
+def rebuild_affinity_matrix(itineraries: Dict[str, Dict], path=None) -> AffinityMatrix:
+    """Build the matrix from itinerary-store entries, save it and make it the process-wide one"""
+    global _matrix
+    matrix = build_matrix(itineraries)
+    matrix.save(path or affinity_path())
+    with _matrix_lock:
+        _matrix = matrix
+    return matrix
+
+
+def main() -> None:
+    from travel_planner.itinerary_store import ItineraryStore
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--store", help="itinerary store to read (default: the bundled one or ITINERARY_STORE_PATH)")
+    parser.add_argument("--output", default=str(affinity_path()))
+    args = parser.parse_args()
+
+    store = ItineraryStore(path=args.store or os.getenv("ITINERARY_STORE_PATH") or None)
+    matrix = rebuild_affinity_matrix(store.itineraries, args.output)
+    print(f"Wrote {len(matrix)} cities x {len(INTEREST_CATEGORIES)} categories to {args.output}")
+    for code in matrix.codes:
+        row = matrix.scores[matrix.rows[code]]
+        print(f"  {code}: " + " ".join(f"{c.split()[0]}={v:.2f}" for c, v in zip(INTEREST_CATEGORIES, row)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+# src/travel_planner/airports.py
+"""
+Airport and city reference data, served from a memory-mapped index.
+
+    PYTHONPATH=src python -m travel_planner.airports [--csv airports.csv] [--output airports.idx]
+
+The bundled CSV (IATA code, city, country, coordinates, timezone) is compiled into a flat
+binary file with one fixed-size slot per possible three-letter code, so a lookup is a
+single offset computation into the mapped file. Building only happens when the index is
+missing or older than its CSV; afterwards startup is an ``mmap`` call.
+"""
+import argparse
+import csv
+import logging
+import mmap
+import os
+import re
+import struct
+import tempfile
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional
+
+logger = logging.getLogger("travel_planner.airports")
+
+DEFAULT_CSV_PATH = Path(__file__).parent / "data" / "airports.csv"
+DEFAULT_INDEX_PATH = ".cache/airports.idx"
+
+MAGIC = b"TPAI"
+VERSION = 1
+HEADER = struct.Struct("<4sHHI")  # magic, version, reserved, number of codes
+SLOT = struct.Struct("<Iff")  # offset into the string table (0 = empty), latitude, longitude
+SLOTS = 26 ** 3
+STRINGS_START = HEADER.size + SLOTS * SLOT.size
+FIELD_SEP = "\x1f"
+
+_IATA = re.compile(r"[A-Z]{3}")
+
+
+class Airport(NamedTuple):
+    code: str
+    city: str
+    country: str
+    latitude: float
+    longitude: float
+    timezone: str
+
+
+def slot_of(code: str) -> Optional[int]:
+    """Slot number of a three-letter code (AAA = 0 ... ZZZ = 17575), None when not a code"""
+    if not _IATA.fullmatch(code):
+        return None
+    return (ord(code[0]) - 65) * 676 + (ord(code[1]) - 65) * 26 + (ord(code[2]) - 65)
+
+
+def airport_code(value: str, require_known: bool = True) -> str:
+    """Normalised three-letter code; ValueError when malformed or, with ``require_known``, not indexed"""
+    code = value.strip().upper()
+    if slot_of(code) is None:
+        raise ValueError(f"{value!r} is not a three-letter IATA code")
+    if require_known and code not in get_airport_index():
+        raise ValueError(f"Unknown airport or city code {code}")
+    return code
+
+
+def build_index(csv_path, index_path) -> int:
+    """Compile ``csv_path`` into the binary index at ``index_path``; returns the number of codes"""
+    slots = bytearray(SLOTS * SLOT.size)
+    strings = bytearray(b"\0")  # offset 0 marks an empty slot
+    count = 0
+    with open(csv_path, newline="", encoding="utf-8") as fh:
+        for row in csv.DictReader(fh):
+            code = (row.get("iata") or "").strip().upper()
+            slot = slot_of(code)
+            if slot is None:
+                continue
+            try:
+                latitude, longitude = float(row["latitude"]), float(row["longitude"])
+            except (KeyError, TypeError, ValueError):
+                latitude = longitude = float("nan")
+            fields = ((row.get(name) or "").strip() for name in ("city", "country", "timezone"))
+            payload = FIELD_SEP.join(fields).encode("utf-8")[:255]
+            if SLOT.unpack_from(slots, slot * SLOT.size)[0] == 0:
+                count += 1
+            SLOT.pack_into(slots, slot * SLOT.size, len(strings), latitude, longitude)
+            strings += bytes([len(payload)]) + payload
+
+    index_path = Path(index_path)
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = index_path.with_suffix(".tmp")
+    with open(tmp, "wb") as fh:
+        fh.write(HEADER.pack(MAGIC, VERSION, 0, count))
+        fh.write(slots)
+        fh.write(strings)
+    os.replace(tmp, index_path)
+    return count
+
+
+class AirportIndex:
+    """
+    Read-only view of a compiled index. The file is mapped rather than read, so opening it
+    costs the same for ten codes or ten thousand and the pages are shared between workers.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "rb") as fh:
+            self._map = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, _, self._count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError(f"{self.path} is not a version {VERSION} airport index")
+        self._lookup = lru_cache(maxsize=1024)(self._read)
+
+    @classmethod
+    def from_env(cls) -> "AirportIndex":
+        """
+        Open the index at AIRPORT_INDEX_PATH, (re)building it from AIRPORT_DATA_PATH first when
+        it is missing or stale. An unwritable index path falls back to a temporary file.
+        """
+        csv_path = Path(os.getenv("AIRPORT_DATA_PATH") or DEFAULT_CSV_PATH)
+        index_path = Path(os.getenv("AIRPORT_INDEX_PATH") or DEFAULT_INDEX_PATH)
+        if not index_path.exists() or index_path.stat().st_mtime < csv_path.stat().st_mtime:
+            try:
+                count = build_index(csv_path, index_path)
+            except OSError as exc:
+                fd, tmp = tempfile.mkstemp(suffix=".idx")
+                os.close(fd)
+                logger.warning("Cannot write airport index to %s (%s); using %s", index_path, exc, tmp)
+                index_path = Path(tmp)
+                count = build_index(csv_path, index_path)
+            logger.info("Built airport index with %d codes at %s", count, index_path)
+        return cls(index_path)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, code: object) -> bool:
+        return isinstance(code, str) and self.get(code) is not None
+
+    def get(self, code: str) -> Optional[Airport]:
+        return self._lookup(code.strip().upper())
+
+    def city_name(self, code: str) -> str:
+        """The city served by ``code``, or the code itself when unknown"""
+        airport = self.get(code) if code else None
+        return airport.city if airport else code
+
+    def metrics(self) -> Dict[str, int]:
+        info = self._lookup.cache_info()
+        return {"codes": self._count, "bytes": len(self._map), "lookups": info.hits + info.misses}
+
+    def _read(self, code: str) -> Optional[Airport]:
+        slot = slot_of(code)
+        if slot is None:
+            return None
+        offset, latitude, longitude = SLOT.unpack_from(self._map, HEADER.size + slot * SLOT.size)
+        if not offset:
+            return None
+        start = STRINGS_START + offset
+        length = self._map[start]
+        city, country, timezone = self._map[start + 1:start + 1 + length].decode("utf-8", "ignore").split(FIELD_SEP)
+        return Airport(code, city, country, round(latitude, 4), round(longitude, 4), timezone)
+
+
+_index: Optional[AirportIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_airport_index() -> AirportIndex:
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = AirportIndex.from_env()
+        return _index
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--csv", default=str(DEFAULT_CSV_PATH), help="CSV with iata,city,country,latitude,longitude,timezone")
+    parser.add_argument("--output", default=os.getenv("AIRPORT_INDEX_PATH") or DEFAULT_INDEX_PATH)
+    args = parser.parse_args()
+    count = build_index(args.csv, args.output)
+    print(f"Indexed {count} codes into {args.output} ({os.path.getsize(args.output) / 1024:.0f} KB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,33 @@
 # src/travel_planner/api.py
+import json
 import logging
-from typing import List, Optional, Any, Dict
+import os
+from datetime import date
+from typing import List, Optional, Any, Dict, Literal
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Response, WebSocket, WebSocketDisconnect
 from pydantic import BaseModel, Field, validator
-from starlette.responses import JSONResponse
-from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
 
-from travel_planner.crew import crew  # your existing crew object
+from travel_planner.affinity import get_affinity_matrix
+from travel_planner.airports import airport_code, get_airport_index
+from travel_planner.batch import get_batch_planner
+from travel_planner.cassette import get_cassette
+from travel_planner.crew_pool import PoolSaturated, pool_metrics, warm_pools
+from travel_planner.http_client import get_http_client
+from travel_planner.itinerary_store import get_itinerary_store
+from travel_planner.jobs import get_job_manager
+from travel_planner.offers import get_offer_registry
+from travel_planner.passages import get_passage_store
+from travel_planner.pipeline import run_plan, stream_plan
+from travel_planner.plan_cache import get_plan_cache
+from travel_planner.prefetch import get_prefetcher
+from travel_planner.price_store import get_price_store
+from travel_planner.research import get_research_cache
+from travel_planner.route_graph import get_leg_index
+from travel_planner.scrape_cache import get_page_cache
+from travel_planner.tools.flight_search import MAX_FANOUT_QUERIES, fanout_queries
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -22,6 +42,11 @@ app = FastAPI(
 )
 
 
+# the default only checks the shape of airport codes: the bundled index lists the main hubs, not every
+# airport Amadeus serves. "known" also requires them to be in the index
+STRICT_AIRPORTS = os.getenv("AIRPORT_VALIDATION", "format").lower() == "known"
+
+
 class TripRequest(BaseModel):
     origin: str = Field(..., min_length=3, max_length=5, description="Origin IATA code, e.g., MEL")
     destination: str = Field(..., min_length=3, max_length=5, description="Destination IATA code, e.g., BLR")
@@ -29,10 +54,62 @@ class TripRequest(BaseModel):
     interests: Optional[List[str]] = Field(default_factory=list, description="List of user interests, e.g., ['food','culture']")
     max_price: Optional[float] = Field(None, ge=0, description="Optional max price in EUR")
     preferred_airlines: Optional[List[str]] = Field(default_factory=list, description="Optional airline preferences")
+    non_stop: bool = Field(False, description="Only return non-stop flights")
+    max_stops: Optional[int] = Field(None, ge=0, le=3, description="Optional maximum number of stops")
+    flex_days: int = Field(0, ge=0, le=7, description="Also search this many days either side of date")
+    alternate_origins: Optional[List[str]] = Field(default_factory=list, description="Other acceptable origin airports, e.g., ['AVV']")
+    alternate_destinations: Optional[List[str]] = Field(default_factory=list, description="Other acceptable destination airports")
+    stopover_days: int = Field(0, ge=0, le=7, description="Also offer self-transfer routes with this many days in a hub (fast mode)")
+    use_cache: bool = Field(True, description="Serve an identical recent plan from the plan cache")
+    mode: Optional[Literal["crew", "fast"]] = Field(None, description="Pipeline mode: 'crew' (all LLM agents) or 'fast' (LLM only for itineraries); defaults to PIPELINE_MODE")
 
     @validator("origin", "destination")
     def uppercase_iata(cls, v: str) -> str:
-        return v.strip().upper()
+        return airport_code(v, require_known=STRICT_AIRPORTS)
+
+    @validator("date")
+    def iso_date(cls, v: str) -> str:
+        try:
+            return date.fromisoformat(v.strip()).isoformat()
+        except ValueError:
+            raise ValueError(f"{v!r} is not a date in YYYY-MM-DD format") from None
+
+    @validator("alternate_origins", "alternate_destinations", each_item=True)
+    def uppercase_alternates(cls, v: str) -> str:
+        return airport_code(v, require_known=STRICT_AIRPORTS)
+
+    @validator("alternate_destinations")
+    def bounded_fanout(cls, v: Optional[List[str]], values: Dict[str, Any]) -> Optional[List[str]]:
+        # every airport pair is searched on every day of the window; refuse rather than search part of it
+        origins = [values.get("origin"), *(values.get("alternate_origins") or [])]
+        destinations = [values.get("destination"), *(v or [])]
+        days = range(2 * values.get("flex_days", 0) + 1)
+        queries = len(fanout_queries(origins, destinations, days))
+        if queries > MAX_FANOUT_QUERIES:
+            raise ValueError(f"{queries} flight searches (airport pairs x days); at most {MAX_FANOUT_QUERIES} "
+                             "are allowed, so use fewer alternates or flex_days")
+        return v
+
+    def to_inputs(self) -> Dict[str, Any]:
+        """Kickoff inputs for the crew / pipeline."""
+        return {
+            "origin": self.origin,
+            "destination": self.destination,
+            "date": self.date,
+            "interests": self.interests or [],
+            "max_price": self.max_price,
+            "preferred_airlines": self.preferred_airlines or [],
+            "non_stop": self.non_stop,
+            "max_stops": self.max_stops,
+            "flex_days": self.flex_days,
+            "alternate_origins": self.alternate_origins or [],
+            "alternate_destinations": self.alternate_destinations or [],
+            "stopover_days": self.stopover_days,
+        }
+
+
+class BatchRequest(BaseModel):
+    trips: List[TripRequest] = Field(..., min_length=1, description="Trips to plan together; identical trips are planned once")
 
 
 class TripResponse(BaseModel):
@@ -40,42 +117,204 @@ class TripResponse(BaseModel):
     data: Optional[Dict[str, Any]]
 
 
+class JobResponse(BaseModel):
+    job_id: str
+    status: str
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    deduplicated: bool = False
+    data: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+
+
+@app.on_event("startup")
+def prewarm_crews():
+    """Build the crew pools and load the reference data (itineraries, airports, affinities) before the first request arrives."""
+    warm_pools()
+    get_itinerary_store()
+    get_airport_index()
+    get_affinity_matrix()
+
+
 @app.get("/healthz", tags=["health"])
 def healthz():
     """Simple healthcheck endpoint."""
     return {"status": "ok"}
 
 
+@app.get("/metrics", tags=["health"])
+def metrics():
+    """Crew pool utilisation and cache counters."""
+    from travel_planner.crew import flight_tool, gemini_llm
+    return {
+        "crew_pools": pool_metrics(),
+        "flight_cache": flight_tool.cache.metrics(),
+        "flight_search": flight_tool.metrics(),
+        "jobs": get_job_manager().metrics(),
+        "batches": get_batch_planner().metrics(),
+        "plan_cache": get_plan_cache().metrics(),
+        "llm_cache": gemini_llm.metrics(),
+        "research_cache": get_research_cache().metrics(),
+        "scrape_cache": get_page_cache().metrics(),
+        "passages": get_passage_store().metrics(),
+        "itinerary_store": get_itinerary_store().metrics(),
+        "airports": get_airport_index().metrics(),
+        "route_graph": get_leg_index().metrics(),
+        "price_store": get_price_store().metrics(),
+        "offer_context": get_offer_registry().metrics(),
+        "prefetch": get_prefetcher().metrics(),
+        "http": get_http_client().metrics(),
+        "cassette": get_cassette().metrics(),
+    }
+
+
 @app.post("/plan-trip", response_model=TripResponse, tags=["trip"])
 async def plan_trip(payload: TripRequest):
     """
     Plan a trip — runs the crew kickoff which orchestrates flight search, evaluation, and itinerary generation.
-    The crew.kickoff is run in a threadpool to avoid blocking the event loop.
+    In "fast" mode flight search and route evaluation run as direct Python calls and only the itinerary uses the LLM.
+    The pipeline is run in a threadpool to avoid blocking the event loop.
     """
-    inputs = {
-        "origin": payload.origin,
-        "destination": payload.destination,
-        "date": payload.date,
-        "interests": payload.interests or [],
-        "max_price": payload.max_price,
-        "preferred_airlines": payload.preferred_airlines or [],
-    }
+    inputs = payload.to_inputs()
 
-    logger.info("Received plan-trip request: %s -> %s on %s (interests=%s)",
-                inputs["origin"], inputs["destination"], inputs["date"], inputs["interests"])
+    logger.info("Received plan-trip request: %s -> %s on %s (interests=%s, mode=%s)",
+                inputs["origin"], inputs["destination"], inputs["date"], inputs["interests"], payload.mode)
 
     try:
-        # run the crew synchronously in a thread to avoid blocking the event loop
-        result = await run_in_threadpool(crew.kickoff, inputs)
+        # run the pipeline synchronously in a thread to avoid blocking the event loop
+        data = await run_in_threadpool(run_plan, inputs, payload.mode, payload.use_cache)
+    except PoolSaturated as exc:
+        logger.warning("Rejecting plan-trip request: %s", exc)
+        raise HTTPException(status_code=exc.status_code, detail=str(exc),
+                            headers={"Retry-After": str(exc.retry_after)})
     except Exception as exc:
         logger.exception("Error running crew.kickoff: %s", exc)
         # Return a helpful error to the client
         raise HTTPException(status_code=500, detail=f"Internal error while planning trip: {str(exc)}")
 
-    # If crew returns a string, wrap it; if it's already dict-like, pass through
-    if isinstance(result, str):
-        data = {"raw": result}
-    else:
-        data = result
-
     return TripResponse(status="success", data=data)
+
+
+@app.post("/plan-trip/jobs", response_model=JobResponse, status_code=202, tags=["trip"])
+def create_plan_job(payload: TripRequest, response: Response):
+    """
+    Queue a trip plan and return immediately with a job id.
+    An identical request that is still queued or running is attached to the existing job.
+    """
+    try:
+        job, created = get_job_manager().submit(payload.to_inputs(), payload.mode, payload.use_cache)
+    except PoolSaturated as exc:
+        logger.warning("Rejecting plan job: %s", exc)
+        raise HTTPException(status_code=exc.status_code, detail=str(exc),
+                            headers={"Retry-After": str(exc.retry_after)})
+    logger.info("Plan job %s %s for %s -> %s on %s", job.id, "queued" if created else "reused",
+                payload.origin, payload.destination, payload.date)
+    response.headers["Location"] = f"/plan-trip/jobs/{job.id}"
+    return JobResponse(deduplicated=not created, **job.to_dict())
+
+
+@app.post("/plan-trips", tags=["trip"])
+def plan_trips(payload: BatchRequest):
+    """
+    Plan several trips at once and stream one JSON line per event (NDJSON): batch_started,
+    trip_finished for each trip as soon as it is done (``index`` is its position in ``trips``),
+    then batch_finished. Identical trips are planned once and flight searches and stopover
+    research shared by several trips run once, all within BATCH_MAX_CONCURRENCY workers.
+    """
+    trips = [(trip.to_inputs(), trip.mode, trip.use_cache) for trip in payload.trips]
+    logger.info("Received plan-trips batch of %d trips", len(trips))
+    try:
+        events = get_batch_planner().stream(trips)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    return StreamingResponse(
+        (json.dumps(event, ensure_ascii=False, default=str) + "\n" for event in events),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/plan-trip/jobs/{job_id}", response_model=JobResponse, tags=["trip"])
+async def get_plan_job(job_id: str, wait: float = Query(0, ge=0, le=30, description="Seconds to long-poll for completion")):
+    """Status of a queued trip plan, with the result once it has finished."""
+    job = get_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job id")
+    if wait and not job.done:
+        await run_in_threadpool(job.wait, wait)
+    return JobResponse(**job.to_dict())
+
+
+@app.get("/fare-calendar", tags=["fares"])
+def fare_calendar(
+    origin: str = Query(..., description="Origin IATA code, e.g., MEL"),
+    destination: str = Query(..., description="Destination IATA code, e.g., BLR"),
+    start: Optional[str] = Query(None, description="First departure date (YYYY-MM-DD), defaults to today"),
+    days: int = Query(60, ge=1, le=366, description="Number of days to cover"),
+    max_stops: Optional[int] = Query(None, ge=0, le=3, description="Ignore fares with more stops"),
+    max_age_days: Optional[float] = Query(None, gt=0, description="Ignore fares observed longer ago than this"),
+):
+    """
+    Cheapest fare seen for each departure day, answered from the local price history only:
+    no Amadeus query and no agents. Days nobody has searched yet have a null price.
+    """
+    try:
+        origin = airport_code(origin, require_known=STRICT_AIRPORTS)
+        destination = airport_code(destination, require_known=STRICT_AIRPORTS)
+        start = start or date.today().isoformat()
+        calendar = get_price_store().fare_calendar(
+            origin, destination, start, days, max_stops=max_stops,
+            max_age=max_age_days * 86400 if max_age_days else None,
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    priced = [day for day in calendar if day["price"] is not None]
+    return {
+        "origin": origin,
+        "destination": destination,
+        "days": calendar,
+        "cheapest": min(priced, key=lambda day: day["price"]) if priced else None,
+        "days_with_data": len(priced),
+    }
+
+
+def _sse(event: Dict[str, Any]) -> str:
+    return f"event: {event['event']}\ndata: {json.dumps(event, ensure_ascii=False, default=str)}\n\n"
+
+
+@app.post("/plan-trip/stream", tags=["trip"])
+def plan_trip_stream(payload: TripRequest):
+    """
+    Plan a trip and stream progress as Server-Sent Events: task_started / task_finished
+    (with each task's output), tool_call (with latency) and finally plan_finished or error.
+    """
+    logger.info("Streaming plan-trip request: %s -> %s on %s", payload.origin, payload.destination, payload.date)
+    events = stream_plan(payload.to_inputs(), payload.mode, payload.use_cache)
+    return StreamingResponse(
+        (_sse(event) for event in events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.websocket("/plan-trip/ws")
+async def plan_trip_ws(websocket: WebSocket):
+    """WebSocket variant of /plan-trip/stream: send one TripRequest as JSON, receive events as JSON messages."""
+    await websocket.accept()
+    try:
+        payload = TripRequest(**await websocket.receive_json())
+    except WebSocketDisconnect:
+        return
+    except Exception as exc:
+        await websocket.send_json({"event": "error", "detail": str(exc), "status_code": 422})
+        await websocket.close(code=1003)
+        return
+
+    try:
+        async for event in iterate_in_threadpool(stream_plan(payload.to_inputs(), payload.mode, payload.use_cache)):
+            await websocket.send_text(json.dumps(event, ensure_ascii=False, default=str))
+    except WebSocketDisconnect:
+        logger.info("Client disconnected from plan-trip stream")
+        return
+    await websocket.close()
@@ -0,0 +1,224 @@
+# src/travel_planner/batch.py
+"""
+Plan a list of trips in one request.
+
+Partner batches overlap heavily: a group flying MEL -> BLR with different interests needs the
+same Amadeus queries and often the same stopover research. The batch planner
+
+* plans identical trips (same plan key) once and reports the result for each of them,
+* issues every distinct Amadeus query of the batch once and starts each trip as soon as all
+  of its own queries are in the flight cache,
+* runs that warm-up and the plans themselves on one pool of ``max_concurrency`` workers,
+  shared by every batch the process is serving.
+
+Trips that stop in the same city share one search and one set of page fetches for it
+(``research.index_city``), whatever their interests; each trip only ranks the city's
+passages for its own travellers. Results are streamed as trips finish.
+"""
+import functools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from travel_planner import crew as crew_module
+from travel_planner.cache import make_key
+from travel_planner.crew_pool import PoolSaturated
+from travel_planner.events import BATCH_FINISHED, BATCH_STARTED, ERROR, TRIP_FINISHED, EventStream, start_in_thread
+from travel_planner.pipeline import default_mode, run_plan
+from travel_planner.plan_cache import plan_key
+from travel_planner.tools.flight_search import FlightFilters, cap_fanout, date_window, fanout_queries
+
+logger = logging.getLogger("travel_planner.batch")
+
+# (inputs, mode, use_cache) of one trip, as the API passes them to run_plan
+Trip = Tuple[Dict[str, Any], Optional[str], bool]
+FlightQuery = Tuple[str, str, str, FlightFilters]
+
+
+def flight_queries(inputs: Dict[str, Any]) -> List[FlightQuery]:
+    """The Amadeus queries planning ``inputs`` starts with, capped like FlightSearch.search_many"""
+    filters = FlightFilters.build(
+        inputs.get("max_price"), inputs.get("preferred_airlines"),
+        inputs.get("non_stop", False), inputs.get("max_stops"),
+    )
+    origins = [o.upper() for o in [inputs["origin"], *inputs.get("alternate_origins", [])]]
+    destinations = [d.upper() for d in [inputs["destination"], *inputs.get("alternate_destinations", [])]]
+    dates = date_window(inputs["date"], inputs.get("flex_days", 0))
+    return [(o, d, day, filters) for o, d, day in cap_fanout(fanout_queries(origins, destinations, dates))]
+
+
+def query_key(query: FlightQuery) -> str:
+    origin, destination, day, filters = query
+    return make_key("batch_flight", origin, destination, day, **filters.to_params())
+
+
+class _Batch:
+    """Bookkeeping of one running batch: the distinct plans and which queries each still waits for"""
+
+    def __init__(self, trips: Sequence[Trip], stream: EventStream):
+        self.stream = stream
+        self.started = time.perf_counter()
+        self.lock = threading.Lock()
+        self.finished = threading.Event()
+        self.counts = {"succeeded": 0, "failed": 0}
+
+        plans: Dict[str, Dict[str, Any]] = {}
+        for index, (inputs, mode, use_cache) in enumerate(trips):
+            mode = mode or default_mode()
+            plan = plans.setdefault(plan_key(inputs, mode),
+                                    {"inputs": inputs, "mode": mode, "use_cache": True, "indexes": []})
+            plan["indexes"].append(index)
+            # one trip asking for a fresh plan gets every identical trip a fresh plan
+            plan["use_cache"] = plan["use_cache"] and use_cache
+        self.plans = list(plans.values())
+        self.remaining = len(self.plans)
+
+        self.queries: Dict[str, FlightQuery] = {}
+        self.waiting: Dict[str, List[Dict[str, Any]]] = {}
+        self.requested = 0
+        for plan in self.plans:
+            keys = set()
+            try:
+                queries = flight_queries(plan["inputs"])
+            except (KeyError, ValueError) as exc:
+                # nothing to warm up; the trip's own plan reports the bad input, the rest of the batch runs
+                logger.warning("No shared flight queries for trip %s: %s", plan["indexes"], exc)
+                queries = []
+            for query in queries:
+                key = query_key(query)
+                self.queries.setdefault(key, query)
+                keys.add(key)
+            plan["pending"] = keys
+            for key in keys:
+                self.waiting.setdefault(key, []).append(plan)
+            # what the same trips posted one by one would have sent to Amadeus
+            self.requested += len(keys) * len(plan["indexes"])
+
+
+class BatchPlanner:
+    """
+    Runs batches of trip plans on one bounded worker pool.
+
+    Each distinct flight query is a task; a plan is queued once the last of its queries has
+    finished, so plans of a large batch start while other trips' searches are still running.
+    """
+
+    def __init__(self, max_concurrency: int = 4, max_trips: int = 50):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_trips = max_trips
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="batch")
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {
+            "batches": 0, "trips": 0, "plans": 0, "succeeded": 0, "failed": 0,
+            "flight_queries": 0, "flight_queries_requested": 0,
+        }
+
+    @classmethod
+    def from_env(cls) -> "BatchPlanner":
+        return cls(
+            max_concurrency=int(os.getenv("BATCH_MAX_CONCURRENCY", os.getenv("CREW_POOL_SIZE", 4))),
+            max_trips=int(os.getenv("BATCH_MAX_TRIPS", 50)),
+        )
+
+    def stream(self, trips: Sequence[Trip]) -> Iterator[Dict[str, Any]]:
+        """
+        Plan every trip and yield batch_started, one trip_finished per trip (in the order they
+        finish, with the trip's ``index`` in ``trips``) and finally batch_finished.
+        """
+        if not trips:
+            raise ValueError("A batch needs at least one trip")
+        if len(trips) > self.max_trips:
+            raise ValueError(f"A batch can hold at most {self.max_trips} trips, got {len(trips)}")
+        stream = EventStream()
+        start_in_thread(self._run, trips, stream)
+        return iter(stream)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            data: Dict[str, Any] = dict(self.stats)
+        data["max_concurrency"] = self.max_concurrency
+        data["flight_queries_saved"] = data["flight_queries_requested"] - data["flight_queries"]
+        return data
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run(self, trips: Sequence[Trip], stream: EventStream) -> None:
+        try:
+            batch = _Batch(trips, stream)
+            stream.emit(BATCH_STARTED, trips=len(trips), plans=len(batch.plans),
+                        flight_queries=len(batch.queries), flight_queries_requested=batch.requested)
+            self._count(batches=1, trips=len(trips), plans=len(batch.plans),
+                        flight_queries=len(batch.queries), flight_queries_requested=batch.requested)
+            logger.info("Batch of %d trips: %d distinct plans, %d of %d flight queries after de-duplication",
+                        len(trips), len(batch.plans), len(batch.queries), batch.requested)
+
+            for plan in batch.plans:
+                if not plan["pending"]:
+                    self._executor.submit(self._plan, batch, plan)
+            for key, (origin, destination, day, filters) in batch.queries.items():
+                future = self._executor.submit(crew_module.flight_tool.search, origin, destination, day,
+                                               filters=filters)
+                future.add_done_callback(functools.partial(self._query_done, batch, key))
+            batch.finished.wait()
+            stream.emit(BATCH_FINISHED, trips=len(trips), **batch.counts,
+                        seconds=round(time.perf_counter() - batch.started, 3))
+        except Exception as exc:
+            logger.exception("Batch failed: %s", exc)
+            stream.emit(ERROR, detail=f"Internal error while planning trips: {exc}", status_code=500)
+        finally:
+            stream.close()
+
+    def _query_done(self, batch: _Batch, key: str, future: Future) -> None:
+        if future.exception() is not None:
+            # the plan searches again itself; a failed warm-up only costs the sharing
+            logger.warning("Shared flight query failed: %s", future.exception())
+        ready = []
+        with batch.lock:
+            for plan in batch.waiting.pop(key, []):
+                plan["pending"].discard(key)
+                if not plan["pending"]:
+                    ready.append(plan)
+        for plan in ready:
+            self._executor.submit(self._plan, batch, plan)
+
+    def _plan(self, batch: _Batch, plan: Dict[str, Any]) -> None:
+        result: Dict[str, Any]
+        try:
+            result = {"status": "success", "data": run_plan(plan["inputs"], plan["mode"], plan["use_cache"])}
+        except PoolSaturated as exc:
+            result = {"status": "error", "detail": str(exc), "status_code": exc.status_code,
+                      "retry_after": exc.retry_after}
+        except Exception as exc:
+            logger.exception("Batch trip failed: %s", exc)
+            result = {"status": "error", "detail": f"Internal error while planning trip: {exc}", "status_code": 500}
+
+        outcome = "succeeded" if result["status"] == "success" else "failed"
+        for n, index in enumerate(plan["indexes"]):
+            batch.stream.emit(TRIP_FINISHED, index=index, deduplicated=n > 0, **result)
+        self._count(**{outcome: len(plan["indexes"])})
+        with batch.lock:
+            batch.counts[outcome] += len(plan["indexes"])
+            batch.remaining -= 1
+            if not batch.remaining:
+                batch.finished.set()
+
+    def _count(self, **deltas: int) -> None:
+        with self._lock:
+            for name, value in deltas.items():
+                self.stats[name] += value
+
+
+_planner: Optional[BatchPlanner] = None
+_planner_lock = threading.Lock()
+
+
+def get_batch_planner() -> BatchPlanner:
+    global _planner
+    with _planner_lock:
+        if _planner is None:
+            _planner = BatchPlanner.from_env()
+        return _planner
@@ -0,0 +1,232 @@
+# src/travel_planner/cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+DEFAULT_CACHE_PATH = ".cache/travel_planner.sqlite"
+
+_MISSING = object()
+
+
+def make_key(*parts: Any, **params: Any) -> str:
+    """Build a stable cache key from positional parts and keyword params"""
+    payload = json.dumps([parts, params], sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def cache_path_from_env() -> Optional[str]:
+    """Return the shared on-disk cache path, or None when the disk tier is disabled"""
+    path = os.getenv("TRAVEL_PLANNER_CACHE_PATH", DEFAULT_CACHE_PATH)
+    return path or None
+
+
+class TwoTierCache:
+    """
+    In-process LRU in front of a shared SQLite store.
+
+    Values must be JSON-serializable. Both tiers honour the same TTL and the
+    disk tier is kept under ``max_bytes`` per namespace by evicting the least
+    recently used rows.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        path: Optional[str] = None,
+        ttl: Optional[float] = 900,
+        max_bytes: int = 64 * 1024 * 1024,
+        memory_max_bytes: int = 8 * 1024 * 1024,
+        enabled: bool = True,
+    ):
+        self.namespace = namespace
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.memory_max_bytes = min(memory_max_bytes, max_bytes)
+        self.enabled = enabled
+
+        self._lock = threading.RLock()
+        self._memory: "OrderedDict[str, Tuple[Optional[float], Any, int]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._db: Optional[sqlite3.Connection] = None
+        self.stats: Dict[str, int] = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "sets": 0,
+            "evictions": 0,
+        }
+
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                """CREATE TABLE IF NOT EXISTS cache (
+                       namespace TEXT NOT NULL,
+                       key TEXT NOT NULL,
+                       value BLOB NOT NULL,
+                       size INTEGER NOT NULL,
+                       expires_at REAL,
+                       accessed_at REAL NOT NULL,
+                       PRIMARY KEY (namespace, key)
+                   )"""
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS cache_lru ON cache (namespace, accessed_at)"
+            )
+
+    @classmethod
+    def from_env(cls, namespace: str, prefix: str, ttl: float, max_bytes: int) -> "TwoTierCache":
+        """
+        Build a cache configured by ``<prefix>_TTL``, ``<prefix>_MAX_BYTES`` and ``<prefix>_DISABLED``.
+        ``<prefix>_PATH`` points this namespace at its own SQLite file instead of the shared one.
+        """
+        return cls(
+            namespace,
+            path=os.getenv(f"{prefix}_PATH") or cache_path_from_env(),
+            ttl=float(os.getenv(f"{prefix}_TTL", ttl)),
+            max_bytes=int(os.getenv(f"{prefix}_MAX_BYTES", max_bytes)),
+            enabled=os.getenv(f"{prefix}_DISABLED", "").lower() not in ("1", "true", "yes"),
+        )
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Return the cached value for ``key`` or ``default`` on a miss"""
+        if not self.enabled:
+            return default
+
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value, _ = entry
+                if expires_at is None or expires_at > now:
+                    self._memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return value
+                self._drop_memory(key)
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ?",
+                    (self.namespace, key),
+                ).fetchone()
+                if row is not None:
+                    blob, expires_at = row
+                    if expires_at is None or expires_at > now:
+                        self._db.execute(
+                            "UPDATE cache SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                            (now, self.namespace, key),
+                        )
+                        value = json.loads(blob)
+                        self._remember(key, value, len(blob), expires_at)
+                        self.stats["disk_hits"] += 1
+                        return value
+                    self._db.execute(
+                        "DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key)
+                    )
+
+            self.stats["misses"] += 1
+            return default
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = _MISSING) -> None:
+        """Store ``value`` under ``key`` in both tiers"""
+        if not self.enabled:
+            return
+
+        ttl = self.ttl if ttl is _MISSING else ttl
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        blob = json.dumps(value, separators=(",", ":"), default=str).encode("utf-8")
+        if len(blob) > self.max_bytes:
+            return
+
+        with self._lock:
+            self.stats["sets"] += 1
+            self._remember(key, value, len(blob), expires_at)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO cache (namespace, key, value, size, expires_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (self.namespace, key, blob, len(blob), expires_at, now),
+                )
+                self._evict_disk()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._drop_memory(key)
+            if self._db is not None:
+                self._db.execute(
+                    "DELETE FROM cache WHERE namespace = ? AND key = ?", (self.namespace, key)
+                )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+
+    def metrics(self) -> Dict[str, Any]:
+        """Hit/miss counters plus current tier sizes"""
+        with self._lock:
+            hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+            lookups = hits + self.stats["misses"]
+            data: Dict[str, Any] = dict(self.stats)
+            data["hit_rate"] = round(hits / lookups, 4) if lookups else 0.0
+            data["memory_entries"] = len(self._memory)
+            data["memory_bytes"] = self._memory_bytes
+            data["disk_bytes"] = self._disk_bytes()
+            return data
+
+    def _remember(self, key: str, value: Any, size: int, expires_at: Optional[float]) -> None:
+        self._drop_memory(key)
+        if size > self.memory_max_bytes:
+            return
+        self._memory[key] = (expires_at, value, size)
+        self._memory_bytes += size
+        while self._memory_bytes > self.memory_max_bytes and self._memory:
+            oldest = next(iter(self._memory))
+            self._drop_memory(oldest)
+            self.stats["evictions"] += 1
+
+    def _drop_memory(self, key: str) -> None:
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_bytes -= entry[2]
+
+    def _disk_bytes(self) -> int:
+        if self._db is None:
+            return 0
+        row = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM cache WHERE namespace = ?", (self.namespace,)
+        ).fetchone()
+        return int(row[0])
+
+    def _evict_disk(self) -> None:
+        self._db.execute(
+            "DELETE FROM cache WHERE namespace = ? AND expires_at IS NOT NULL AND expires_at <= ?",
+            (self.namespace, time.time()),
+        )
+        overflow = self._disk_bytes() - self.max_bytes
+        if overflow <= 0:
+            return
+        rows = self._db.execute(
+            "SELECT key, size FROM cache WHERE namespace = ? ORDER BY accessed_at ASC",
+            (self.namespace,),
+        )
+        victims = []
+        for key, size in rows:
+            if overflow <= 0:
+                break
+            victims.append((self.namespace, key))
+            overflow -= size
+        self._db.executemany("DELETE FROM cache WHERE namespace = ? AND key = ?", victims)
+        self.stats["evictions"] += len(victims)
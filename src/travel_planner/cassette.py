@@ -0,0 +1,163 @@
+# src/travel_planner/cassette.py
+"""
+Record and replay every external exchange of a plan: Amadeus flight searches, Serper
+searches, page scrapes and Gemini completions.
+
+In ``record`` mode each successful exchange is stored with its wall-clock latency; ``save``
+writes them to one gzip-compressed JSON file (``CASSETTE_PATH``). In ``replay`` mode the same
+calls are answered from that file after sleeping for the recorded latency (scaled by
+``CASSETTE_LATENCY_SCALE``) or a fixed ``CASSETTE_LATENCY``; an exchange that was never
+recorded raises ``CassetteMiss`` instead of reaching the network. Failed calls are not
+recorded, so a replay only ever reproduces successes.
+"""
+import copy
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from travel_planner.cache import make_key
+
+logger = logging.getLogger("travel_planner.cassette")
+
+OFF, RECORD, REPLAY = "off", "record", "replay"
+CASSETTE_MODES = (OFF, RECORD, REPLAY)
+DEFAULT_CASSETTE_PATH = ".cache/cassette.json.gz"
+VERSION = 1
+
+T = TypeVar("T")
+
+
+class CassetteMiss(RuntimeError):
+    """Raised in replay mode for an exchange the cassette does not hold"""
+
+
+class Cassette:
+    """Recorded exchanges by kind ("amadeus", "serper", "scrape", "gemini") and request key"""
+
+    def __init__(self, path=DEFAULT_CASSETTE_PATH, mode: str = OFF, latency: Optional[float] = None,
+                 latency_scale: float = 1.0):
+        if mode not in CASSETTE_MODES:
+            raise ValueError(f"Unknown cassette mode {mode!r}; expected one of {', '.join(CASSETTE_MODES)}")
+        self.path = Path(path)
+        self.mode = mode
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self._lock = threading.Lock()
+        self._exchanges: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        # free-form details of the recording, e.g. the trip inputs to replay
+        self.meta: Dict[str, Any] = {}
+        self.stats: Dict[str, Any] = {"recorded": 0, "replayed": 0, "misses": 0, "unserializable": 0,
+                                      "simulated_latency_seconds": 0.0}
+        if mode == REPLAY or (mode == RECORD and self.path.exists()):
+            # recording adds to an existing cassette instead of starting over
+            self.load(self.path)
+
+    @classmethod
+    def from_env(cls) -> "Cassette":
+        latency = os.getenv("CASSETTE_LATENCY", "recorded").strip().lower()
+        return cls(
+            path=os.getenv("CASSETTE_PATH") or DEFAULT_CASSETTE_PATH,
+            mode=os.getenv("CASSETTE_MODE", OFF).strip().lower() or OFF,
+            latency=None if latency == "recorded" else float(latency),
+            latency_scale=float(os.getenv("CASSETTE_LATENCY_SCALE", 1.0)),
+        )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(entries) for entries in self._exchanges.values())
+
+    def exchange(self, kind: str, request: Any, call: Callable[[], T]) -> T:
+        """
+        ``call()`` with recording or replay around it. ``request`` identifies the exchange and
+        must leave out credentials; responses must be JSON-serializable to be recorded.
+        """
+        if self.mode == OFF:
+            return call()
+        key = make_key(kind, request)
+        if self.mode == REPLAY:
+            with self._lock:
+                entry = self._exchanges.get(kind, {}).get(key)
+                if entry is None:
+                    self.stats["misses"] += 1
+                else:
+                    self.stats["replayed"] += 1
+            if entry is None:
+                raise CassetteMiss(f"No recorded {kind} exchange for {str(request)[:120]}")
+            delay = self.latency if self.latency is not None else entry["latency"] * self.latency_scale
+            if delay > 0:
+                time.sleep(delay)
+                with self._lock:
+                    self.stats["simulated_latency_seconds"] += delay
+            return copy.deepcopy(entry["response"])
+
+        started = time.perf_counter()
+        response = call()
+        latency = round(time.perf_counter() - started, 3)
+        try:
+            json.dumps(response)
+        except (TypeError, ValueError):
+            logger.info("Not recording %s exchange: %s is not JSON-serializable", kind, type(response).__name__)
+            with self._lock:
+                self.stats["unserializable"] += 1
+            return response
+        with self._lock:
+            self._exchanges.setdefault(kind, {})[key] = {"response": copy.deepcopy(response), "latency": latency}
+            self.stats["recorded"] += 1
+        return response
+
+    def load(self, path) -> int:
+        """Add the exchanges stored at ``path``; returns how many were read"""
+        with gzip.open(path, "rt", encoding="utf-8") as fh:
+            data = json.load(fh)
+        if data.get("version") != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} cassette")
+        with self._lock:
+            self.meta.update(data.get("meta") or {})
+            for kind, entries in data["exchanges"].items():
+                self._exchanges.setdefault(kind, {}).update(entries)
+        return sum(len(entries) for entries in data["exchanges"].values())
+
+    def save(self, path=None) -> Path:
+        """Write every exchange to ``path`` (default: the cassette's own path) atomically"""
+        target = Path(path or self.path)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            payload = {"version": VERSION, "meta": self.meta, "exchanges": self._exchanges}
+            tmp = target.with_suffix(".tmp")
+            with gzip.open(tmp, "wt", encoding="utf-8") as fh:
+                json.dump(payload, fh, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, target)
+        return target
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            data: Dict[str, Any] = dict(self.stats)
+            data["exchanges"] = {kind: len(entries) for kind, entries in self._exchanges.items()}
+        data["mode"] = self.mode
+        data["simulated_latency_seconds"] = round(data["simulated_latency_seconds"], 3)
+        return data
+
+
+_cassette: Optional[Cassette] = None
+_cassette_lock = threading.Lock()
+
+
+def get_cassette() -> Cassette:
+    global _cassette
+    with _cassette_lock:
+        if _cassette is None:
+            _cassette = Cassette.from_env()
+        return _cassette
+
+
+def use_cassette(cassette: Optional[Cassette]) -> Optional[Cassette]:
+    """Make ``cassette`` the process-wide one (None: rebuild from the environment); returns the previous one"""
+    global _cassette
+    with _cassette_lock:
+        previous, _cassette = _cassette, cassette
+        return previous
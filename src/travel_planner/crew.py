@@ -1,74 +1,132 @@
 import os
-from crewai import Agent, Task, Crew, LLM
+from pathlib import Path
+from typing import Any, Dict, List
+
+import yaml
+from crewai import Agent, Task, Crew
+from .events import TASK_FINISHED, TASK_STARTED, emit
+from .cache import TwoTierCache
+from .llm_cache import CachedLLM
 from .tools.flight_search import FlightSearch
 from .tools.stopover_evaluator import StopoverEvaluator
-from .tools.local_guide_tools import SerperApiToolWrapper, ScrapeWebsiteToolWrapper
+from .tools.local_guide_tools import (
+    BatchScrapeToolWrapper, HubItineraryTool, SerperApiToolWrapper, ScrapeWebsiteToolWrapper,
+)
+
+CONFIG_DIR = Path(__file__).parent / "config"
 
 # Read your API key from the environment variable
 gemini_api_key = os.getenv("GEMINI_API_KEY", "<YOUR-API-KEY>")
 
 # Use Gemini 1.5 Flash model (faster, different rate limits)
-gemini_llm = LLM(
+# Completions are cached by prompt hash; agents with `llm_cache: false` in agents.yaml skip the cache
+gemini_llm = CachedLLM(
     model='gemini/gemini-1.5-flash',
     api_key=gemini_api_key
 )
+# a CachedLLM with its cache switched off, so even uncached completions can be recorded and replayed
+gemini_llm_uncached = CachedLLM(
+    model='gemini/gemini-1.5-flash',
+    api_key=gemini_api_key,
+    cache=TwoTierCache("llm_completions", enabled=False),
+)
 
-# Instantiate tools
+# Instantiate tools (shared by every crew so their caches are shared too)
 flight_tool = FlightSearch()
 evaluator_tool = StopoverEvaluator()
 search_tool = SerperApiToolWrapper()
 web_tool = ScrapeWebsiteToolWrapper()
+batch_web_tool = BatchScrapeToolWrapper()
+hub_tool = HubItineraryTool()
 
-# Create agents
-flight_planner = Agent(
-    role='Flight Planner',
-    goal='Find direct and one‑stop flight offers using Amadeus',
-    backstory='An expert flight planner with years of experience finding the best routes and deals.',
-    tools=[flight_tool],
-    llm=gemini_llm,
-    verbose=True
-)
+TOOLS = {tool.name: tool for tool in (flight_tool, evaluator_tool, search_tool, web_tool, batch_web_tool, hub_tool)}
 
-route_evaluator = Agent(
-    role='Route Evaluator',
-    goal='Rank flight options by cost and stopover experience value',
-    backstory='A travel expert who knows how to balance cost with experience quality.',
-    tools=[evaluator_tool],
-    llm=gemini_llm,
-    verbose=True
-)
 
-local_guide = Agent(
-    role='Local Guide',
-    goal='Generate a 1–2 day itinerary in the stopover city using web search and scraping',
-    backstory='A local travel guide who knows the best attractions and activities in cities worldwide.',
-    tools=[search_tool, web_tool],
-    llm=gemini_llm,
-    verbose=True
-)
+def _load_config(name: str) -> Dict[str, Any]:
+    with open(CONFIG_DIR / name, encoding="utf-8") as fh:
+        return yaml.safe_load(fh)
 
-# Define tasks
-search_flights = Task(
-    description='Given {origin}, {destination}, {date}, retrieve flight offers (direct & 1‑stop).',
-    expected_output='A list of flight offers with prices and stopover information.',
-    agent=flight_planner
-)
 
-evaluate_routes = Task(
-    description='From search_flights output, rank routes by total price minus an experience bonus, then select the top two.',
-    expected_output='The top two ranked flight routes with justification.',
-    agent=route_evaluator
-)
+AGENTS_CONFIG = {a["id"]: a for a in _load_config("agents.yaml")["agents"]}
+_tasks_config = _load_config("tasks.yaml")
+TASKS_CONFIG = {t["id"]: t for t in _tasks_config["tasks"]}
+CREWS_CONFIG: Dict[str, List[str]] = _tasks_config["crews"]
 
-plan_itinerary = Task(
-    description='For each chosen route with a stopover, produce a short 1–2 day itinerary in the stopover city, tailored to {interests}.',
-    expected_output='Detailed itineraries for each stopover city.',
-    agent=local_guide
-)
+# Defaults for optional kickoff inputs referenced by the task templates
+DEFAULT_INPUTS = {
+    "interests": [],
+    "flex_days": 0,
+    "alternate_origins": [],
+    "alternate_destinations": [],
+    "max_price": None,
+    "preferred_airlines": [],
+    "non_stop": False,
+    "max_stops": None,
+}
 
-# Assemble the crew
-crew = Crew(
-    agents=[flight_planner, route_evaluator, local_guide],
-    tasks=[search_flights, evaluate_routes, plan_itinerary],
-    verbose=True
-)
+
+def prepare_inputs(inputs: dict) -> dict:
+    """Fill in optional inputs so every task template can be interpolated"""
+    prepared = dict(DEFAULT_INPUTS)
+    prepared.update({k: v for k, v in inputs.items() if v is not None})
+    return prepared
+
+
+def build_agent(agent_id: str) -> Agent:
+    config = AGENTS_CONFIG[agent_id]
+    return Agent(
+        role=config["name"],
+        goal=config["description"].strip(),
+        backstory=config["backstory"].strip(),
+        tools=[TOOLS[name] for name in config.get("tools", [])],
+        llm=gemini_llm if config.get("llm_cache", True) else gemini_llm_uncached,
+        verbose=True
+    )
+
+
+def _task_progress(kind: str):
+    """Crew task_callback that reports each finished task and the one starting next"""
+    order = CREWS_CONFIG[kind]
+
+    def callback(output: Any) -> None:
+        task_id = getattr(output, "name", None)
+        emit(TASK_FINISHED, task=task_id, output=getattr(output, "raw", str(output)))
+        if task_id in order and order.index(task_id) + 1 < len(order):
+            emit(TASK_STARTED, task=order[order.index(task_id) + 1])
+
+    return callback
+
+
+def build_crew(kind: str = "plan") -> Crew:
+    """
+    Build a fresh crew from config/agents.yaml and config/tasks.yaml.
+    Agents and tasks are never shared between crews; tools are.
+    """
+    agents: Dict[str, Agent] = {}
+    tasks: Dict[str, Task] = {}
+    for task_id in CREWS_CONFIG[kind]:
+        config = TASKS_CONFIG[task_id]
+        agent_id = config["agent"]
+        if agent_id not in agents:
+            agents[agent_id] = build_agent(agent_id)
+        extra = {}
+        if config.get("context"):
+            extra["context"] = [tasks[c] for c in config["context"]]
+        tasks[task_id] = Task(
+            name=task_id,
+            description=config["description"].strip(),
+            expected_output=config["expected_output"].strip(),
+            agent=agents[agent_id],
+            **extra
+        )
+    return Crew(
+        agents=list(agents.values()),
+        tasks=list(tasks.values()),
+        task_callback=_task_progress(kind),
+        verbose=True
+    )
+
+
+# Assemble the default crews (kept for scripts; the API leases crews from crew_pool instead)
+crew = build_crew("plan")
+city_crew = build_crew("city")
@@ -0,0 +1,145 @@
+# src/travel_planner/crew_pool.py
+import math
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+
+class PoolSaturated(Exception):
+    """Raised when no crew can be leased; carries the HTTP status and a Retry-After hint"""
+
+    def __init__(self, message: str, status_code: int, retry_after: int):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class CrewPool:
+    """
+    A fixed set of pre-built crews leased to one request at a time.
+
+    At most ``max_waiting`` callers may queue for a crew; further callers are
+    rejected immediately with 429. Callers that wait longer than
+    ``acquire_timeout`` seconds are rejected with 503.
+    """
+
+    def __init__(self, factory: Callable[[], Any], size: int = 4, max_waiting: int = 16,
+                 acquire_timeout: float = 30.0, name: str = "crew"):
+        self.name = name
+        self.size = max(1, size)
+        self.max_waiting = max(0, max_waiting)
+        self.acquire_timeout = acquire_timeout
+
+        self._idle: "queue.LifoQueue[Any]" = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._leased = 0
+        self._avg_lease_seconds = 0.0
+        self.stats: Dict[str, int] = {"leases": 0, "rejected_queue_full": 0, "rejected_timeout": 0, "errors": 0}
+
+        for _ in range(self.size):
+            self._idle.put(factory())
+
+    @classmethod
+    def from_env(cls, factory: Callable[[], Any], name: str) -> "CrewPool":
+        return cls(
+            factory,
+            size=int(os.getenv("CREW_POOL_SIZE", 4)),
+            max_waiting=int(os.getenv("CREW_POOL_MAX_WAITING", 16)),
+            acquire_timeout=float(os.getenv("CREW_POOL_ACQUIRE_TIMEOUT", 30)),
+            name=name,
+        )
+
+    def retry_after(self) -> int:
+        """Seconds until a crew is likely to free up, based on recent lease durations"""
+        with self._lock:
+            backlog = self._waiting + 1
+            avg = self._avg_lease_seconds or 1.0
+        return max(1, math.ceil(avg * backlog / self.size))
+
+    @contextmanager
+    def lease(self, timeout: Optional[float] = None) -> Iterator[Any]:
+        """Borrow a crew for the duration of the ``with`` block"""
+        with self._lock:
+            if self._idle.empty() and self._waiting >= self.max_waiting:
+                self.stats["rejected_queue_full"] += 1
+                full = True
+            else:
+                full = False
+                self._waiting += 1
+        if full:
+            raise PoolSaturated(f"{self.name} pool queue is full", 429, self.retry_after())
+
+        try:
+            crew = self._idle.get(timeout=self.acquire_timeout if timeout is None else timeout)
+        except queue.Empty:
+            with self._lock:
+                self.stats["rejected_timeout"] += 1
+            raise PoolSaturated(f"timed out waiting for a {self.name} crew", 503, self.retry_after())
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+        started = time.monotonic()
+        with self._lock:
+            self._leased += 1
+            self.stats["leases"] += 1
+        try:
+            yield crew
+        except Exception:
+            with self._lock:
+                self.stats["errors"] += 1
+            raise
+        finally:
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self._leased -= 1
+                # exponentially weighted so Retry-After follows the current load
+                self._avg_lease_seconds = (
+                    elapsed if not self._avg_lease_seconds else 0.8 * self._avg_lease_seconds + 0.2 * elapsed
+                )
+            self._idle.put(crew)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            data: Dict[str, Any] = dict(self.stats)
+            data.update({
+                "size": self.size,
+                "idle": self._idle.qsize(),
+                "leased": self._leased,
+                "waiting": self._waiting,
+                "max_waiting": self.max_waiting,
+                "avg_lease_seconds": round(self._avg_lease_seconds, 3),
+            })
+            return data
+
+
+_pools: Dict[str, CrewPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(kind: str = "plan") -> CrewPool:
+    """Process-wide pool for the crew ``kind`` defined in config/tasks.yaml, built on first use"""
+    with _pools_lock:
+        pool = _pools.get(kind)
+        if pool is None:
+            from travel_planner.crew import build_crew
+            pool = _pools[kind] = CrewPool.from_env(lambda: build_crew(kind), name=kind)
+        return pool
+
+
+def warm_pools() -> None:
+    """Build the pools serving requests (CREW_POOL_WARM, default plan and city) ahead of the first request"""
+    from travel_planner.crew import CREWS_CONFIG
+    kinds = [k.strip() for k in os.getenv("CREW_POOL_WARM", "plan,city").split(",") if k.strip()]
+    for kind in kinds:
+        if kind in CREWS_CONFIG:
+            get_pool(kind)
+
+
+def pool_metrics() -> Dict[str, Dict[str, Any]]:
+    with _pools_lock:
+        return {kind: pool.metrics() for kind, pool in _pools.items()}
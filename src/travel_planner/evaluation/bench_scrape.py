@@ -0,0 +1,102 @@
+# src/travel_planner/evaluation/bench_scrape.py
+"""
+Compare streaming page extraction with the original BeautifulSoup path.
+
+    PYTHONPATH=src python -m travel_planner.evaluation.bench_scrape [--corpus saved_pages/] [--pages 20]
+
+Without --corpus a set of synthetic travel-guide pages (heavy head, inline scripts, long body) is used.
+"""
+import argparse
+import random
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Iterator, List, Tuple
+
+from bs4 import BeautifulSoup
+
+from travel_planner.scrape_cache import extract_text
+
+WORDS = ["temple", "hawker", "market", "harbour", "museum", "garden", "noodles", "skyline", "ferry", "night"]
+
+
+def make_pages(n: int, seed: int = 7) -> List[bytes]:
+    rng = random.Random(seed)
+    pages = []
+    for i in range(n):
+        head = "<head><title>Stopover guide</title>" + "<script>" + "var a=1;" * rng.randint(5_000, 20_000) + "</script>"
+        head += "<style>" + ".c{color:red}" * 2_000 + "</style></head>"
+        nav = "<nav>" + "".join(f"<a href='/p{j}'>Link {j}</a>" for j in range(300)) + "</nav>"
+        body = "".join(
+            f"<div class='card'><h2>Day {j}</h2><p>" + " ".join(rng.choice(WORDS) for _ in range(80)) + "</p></div>"
+            for j in range(rng.randint(500, 2_000))
+        )
+        pages.append(f"<html>{head}<body>{nav}<main>{body}</main><footer>(c) {i}</footer></body></html>".encode())
+    return pages
+
+
+def load_corpus(directory: str) -> List[bytes]:
+    return [path.read_bytes() for path in sorted(Path(directory).glob("*.htm*"))]
+
+
+def legacy_extract(content: bytes) -> str:
+    """The pre-streaming ScrapeWebsiteToolWrapper path: full soup, get_text() over everything, then truncate"""
+    soup = BeautifulSoup(content, 'html.parser')
+    for script in soup(["script", "style"]):
+        script.decompose()
+    text = soup.get_text()
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    text = ' '.join(chunk for chunk in chunks if chunk)
+    if len(text) > 2000:
+        text = text[:2000] + "..."
+    return text
+
+
+def chunked(content: bytes, max_bytes: int = 512 * 1024, size: int = 16 * 1024) -> Iterator[bytes]:
+    """Stand-in for a streamed response: 16 KB chunks, capped like PageCache"""
+    for start in range(0, min(len(content), max_bytes), size):
+        yield content[start:min(start + size, max_bytes)]
+
+
+def streaming_extract(content: bytes) -> str:
+    return extract_text(chunked(content))
+
+
+def measure(fn: Callable[[bytes], str], pages: List[bytes], repeat: int = 3) -> Tuple[float, float]:
+    """Best wall time per page (ms) and peak traced memory (MB) over the corpus"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for page in pages:
+            fn(page)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    for page in pages:
+        fn(page)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best * 1e3 / len(pages), peak / 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus", help="directory of saved .html pages")
+    parser.add_argument("--pages", type=int, default=20, help="number of synthetic pages")
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus) if args.corpus else make_pages(args.pages)
+    if not pages:
+        raise SystemExit(f"No .html files in {args.corpus}")
+    avg_kb = sum(map(len, pages)) / len(pages) / 1024
+    print(f"{len(pages)} pages, {avg_kb:.0f} KB average")
+    print(f"{'path':>10} {'ms/page':>9} {'peak MB':>9}")
+    legacy_ms, legacy_mb = measure(legacy_extract, pages)
+    streaming_ms, streaming_mb = measure(streaming_extract, pages)
+    print(f"{'legacy':>10} {legacy_ms:>9.2f} {legacy_mb:>9.1f}")
+    print(f"{'streaming':>10} {streaming_ms:>9.2f} {streaming_mb:>9.1f}")
+    print(f"speedup {legacy_ms / streaming_ms:.1f}x, memory {legacy_mb / max(streaming_mb, 1e-6):.1f}x lower")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# src/travel_planner/events.py
+import contextvars
+import functools
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+# Event types emitted while a plan runs
+PLAN_STARTED = "plan_started"
+TASK_STARTED = "task_started"
+TASK_FINISHED = "task_finished"
+TOOL_CALL = "tool_call"
+PLAN_CACHE = "plan_cache"
+CONTEXT_SAVINGS = "context_savings"
+PLAN_FINISHED = "plan_finished"
+ERROR = "error"
+
+# Event types of a batch of plans (POST /plan-trips)
+BATCH_STARTED = "batch_started"
+TRIP_FINISHED = "trip_finished"
+BATCH_FINISHED = "batch_finished"
+
+_CLOSED = object()
+
+
+class EventStream:
+    """Thread-safe queue of progress events for one plan"""
+
+    def __init__(self):
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self.started = time.monotonic()
+
+    def emit(self, event: str, **data: Any) -> None:
+        data["event"] = event
+        data["elapsed_ms"] = round((time.monotonic() - self.started) * 1000, 1)
+        self._queue.put(data)
+
+    def close(self) -> None:
+        self._queue.put(_CLOSED)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        while True:
+            item = self._queue.get()
+            if item is _CLOSED:
+                return
+            yield item
+
+
+_current_stream: "contextvars.ContextVar[Optional[EventStream]]" = contextvars.ContextVar(
+    "travel_planner_event_stream", default=None
+)
+
+
+@contextmanager
+def bind_stream(stream: Optional[EventStream]) -> Iterator[Optional[EventStream]]:
+    """Route events emitted in this context (and contexts copied from it) to ``stream``"""
+    token = _current_stream.set(stream)
+    try:
+        yield stream
+    finally:
+        _current_stream.reset(token)
+
+
+def emit(event: str, **data: Any) -> None:
+    """Emit to the stream bound to the current context; a no-op when nobody is listening"""
+    stream = _current_stream.get()
+    if stream is not None:
+        stream.emit(event, **data)
+
+
+@contextmanager
+def tool_timer(tool: str) -> Iterator[None]:
+    """Emit a tool_call event with the wall-clock latency of the block"""
+    started = time.perf_counter()
+    ok = True
+    try:
+        yield
+    except Exception:
+        ok = False
+        raise
+    finally:
+        emit(TOOL_CALL, tool=tool, latency_ms=round((time.perf_counter() - started) * 1000, 1), ok=ok)
+
+
+def traced_tool(run: Callable[..., Any]) -> Callable[..., Any]:
+    """Decorate a BaseTool._run so every agent tool call is reported with its latency"""
+
+    @functools.wraps(run)
+    def wrapper(self, *args: Any, **kwargs: Any) -> Any:
+        with tool_timer(self.name):
+            return run(self, *args, **kwargs)
+
+    return wrapper
+
+
+def start_in_thread(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> threading.Thread:
+    """Run ``fn`` on a daemon thread that inherits the caller's event stream"""
+    context = contextvars.copy_context()
+    thread = threading.Thread(target=context.run, args=(fn, *args), kwargs=kwargs, daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,181 @@
+# src/travel_planner/http_client.py
+import copy
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional, TypeVar
+from urllib.parse import urlsplit
+from urllib.request import getproxies
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from travel_planner.cache import make_key
+
+logger = logging.getLogger("travel_planner.http_client")
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+T = TypeVar("T")
+
+
+def _read_all(response: requests.Response) -> requests.Response:
+    response.content
+    return response
+
+
+class HostStats:
+    __slots__ = ("requests", "errors", "retries", "shared", "in_flight", "peak_in_flight", "latency_total", "latency_max")
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.shared = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def to_dict(self, pool_maxsize: int) -> Dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "retries": self.retries,
+            "single_flight_shared": self.shared,
+            "in_flight": self.in_flight,
+            "pool_utilisation": round(self.in_flight / pool_maxsize, 3),
+            "peak_pool_utilisation": round(self.peak_in_flight / pool_maxsize, 3),
+            "avg_latency_ms": round(1000 * self.latency_total / self.requests, 1) if self.requests else 0.0,
+            "max_latency_ms": round(1000 * self.latency_max, 1),
+        }
+
+
+class HttpClient:
+    """
+    One keep-alive ``requests.Session`` shared by the Serper and scraping code.
+
+    Each host gets at most ``pool_maxsize`` open connections (callers block for a free one),
+    failed connections and retryable statuses are retried with jittered exponential backoff,
+    and identical requests issued concurrently are collapsed into a single round trip.
+    The session honours the environment (proxies, NO_PROXY, CA bundle, .netrc) unless
+    ``trust_env`` is off, in which case only the proxies are read, once, at construction.
+    """
+
+    def __init__(self, pool_maxsize: int = 8, retries: int = 3, backoff: float = 0.3, jitter: float = 0.2,
+                 timeout: float = 10, trust_env: bool = True):
+        self.pool_maxsize = pool_maxsize
+        self.timeout = timeout
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff,
+            backoff_jitter=jitter,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({"GET", "HEAD", "POST"}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=pool_maxsize, pool_block=True, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.trust_env = trust_env
+        if not trust_env:
+            self.session.proxies.update(getproxies())
+
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+        self._hosts: Dict[str, HostStats] = {}
+
+    @classmethod
+    def from_env(cls) -> "HttpClient":
+        return cls(
+            pool_maxsize=int(os.getenv("HTTP_POOL_MAXSIZE", 8)),
+            retries=int(os.getenv("HTTP_RETRIES", 3)),
+            backoff=float(os.getenv("HTTP_BACKOFF", 0.3)),
+            timeout=float(os.getenv("HTTP_TIMEOUT", 10)),
+            trust_env=os.getenv("HTTP_TRUST_ENV", "true").lower() not in ("0", "false", "no"),
+        )
+
+    def get(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs: Any) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        """
+        Send a request through the shared pool. Concurrent callers with the same method, URL,
+        params, body and headers share one round trip; each gets its own copy of the response.
+        """
+        return self.fetch(method, url, _read_all, **kwargs)
+
+    def fetch(self, method: str, url: str, read: Callable[[requests.Response], T], **kwargs: Any) -> T:
+        """
+        Send a streamed request and return ``read(response)``. The response is closed as soon as
+        ``read`` returns: a fully read connection goes back to the pool, while one abandoned
+        before the end of the body is discarded so its remaining bytes are never downloaded.
+        Concurrent identical calls (headers included, so conditional requests only join
+        identical conditional requests) share one round trip; followers get a shallow copy of
+        the result, so callers may mutate its top level.
+        """
+        host = urlsplit(url).netloc
+        key = make_key(method.upper(), url, getattr(read, "__qualname__", repr(read)),
+                       params=kwargs.get("params"), json=kwargs.get("json"), data=kwargs.get("data"),
+                       headers=kwargs.get("headers"))
+        with self._lock:
+            stats = self._hosts.setdefault(host, HostStats())
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+            else:
+                stats.shared += 1
+        if not leader:
+            return copy.copy(future.result())
+
+        kwargs.setdefault("timeout", self.timeout)
+        started = time.perf_counter()
+        with self._lock:
+            stats.in_flight += 1
+            stats.peak_in_flight = max(stats.peak_in_flight, stats.in_flight)
+        try:
+            with self.session.request(method, url, stream=True, **kwargs) as response:
+                result = read(response)
+        except BaseException as exc:
+            self._finish(key, stats, started, error=True)
+            future.set_exception(exc)
+            raise
+        retries = getattr(getattr(response.raw, "retries", None), "history", ())
+        self._finish(key, stats, started, error=response.status_code >= 400, retries=len(retries or ()))
+        future.set_result(result)
+        return result
+
+    def metrics(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {host: stats.to_dict(self.pool_maxsize) for host, stats in self._hosts.items()}
+
+    def _finish(self, key: str, stats: HostStats, started: float, error: bool, retries: int = 0) -> None:
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._in_flight.pop(key, None)
+            stats.in_flight -= 1
+            stats.requests += 1
+            stats.errors += int(error)
+            stats.retries += retries
+            stats.latency_total += elapsed
+            stats.latency_max = max(stats.latency_max, elapsed)
+
+
+_client: Optional[HttpClient] = None
+_client_lock = threading.Lock()
+
+
+def get_http_client() -> HttpClient:
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient.from_env()
+        return _client
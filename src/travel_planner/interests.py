@@ -0,0 +1,22 @@
+# src/travel_planner/interests.py
+import re
+from typing import Iterable, List, Optional
+
+# The interest categories offered by the Streamlit UI, in its order and in canonical form
+INTEREST_CATEGORIES = [
+    "food & dining", "culture & history", "nature & outdoors", "shopping",
+    "arts & entertainment", "beaches & relaxation", "adventure & sports", "wine & nightlife",
+]
+
+_NOT_LABEL = re.compile(r"[^\w\s&]")
+_SPACES = re.compile(r"\s+")
+
+
+def clean_interest(interest: str) -> str:
+    """'🍽️ Food & Dining' -> 'food & dining' (emoji, punctuation and extra spaces removed)"""
+    return _SPACES.sub(" ", _NOT_LABEL.sub("", interest.lower())).strip()
+
+
+def canonical_interests(interests: Optional[Iterable[str]]) -> List[str]:
+    """Cleaned, de-duplicated and sorted interests, so order and UI decoration do not matter"""
+    return sorted({clean_interest(i) for i in interests or [] if isinstance(i, str)} - {""})
@@ -0,0 +1,150 @@
+# src/travel_planner/itinerary_store.py
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from travel_planner.interests import canonical_interests
+
+DEFAULT_STORE_PATH = Path(__file__).parent / "data" / "itineraries.json"
+
+
+def store_key(city: str, interests: Optional[List[str]]) -> str:
+    """'SIN|culture & history,food & dining'"""
+    return f"{city.strip().upper()}|{','.join(canonical_interests(interests))}"
+
+
+class ItineraryStore:
+    """
+    Itineraries precomputed offline for hub cities and common interest combinations.
+
+    The whole store is one JSON document loaded into dicts at startup, so lookups are
+    plain dictionary reads. A request matches its exact interests first, then the entry
+    for the same city sharing the most interests, then the city's general entry.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_age: float = 30 * 24 * 3600):
+        self.path = Path(path) if path else DEFAULT_STORE_PATH
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self.cities: Dict[str, Dict[str, Any]] = {}
+        self.itineraries: Dict[str, Dict[str, Any]] = {}
+        self._by_city: Dict[str, List[str]] = {}
+        self.stats: Dict[str, int] = {"exact_hits": 0, "partial_hits": 0, "misses": 0}
+        if self.path.exists():
+            with open(self.path, encoding="utf-8") as fh:
+                data = json.load(fh)
+            self.cities = data.get("cities", {})
+            for key, entry in data.get("itineraries", {}).items():
+                self._index(key, entry)
+
+    @classmethod
+    def from_env(cls) -> "ItineraryStore":
+        return cls(
+            path=os.getenv("ITINERARY_STORE_PATH") or None,
+            max_age=float(os.getenv("ITINERARY_STORE_MAX_AGE", 30 * 24 * 3600)),
+        )
+
+    def __len__(self) -> int:
+        return len(self.itineraries)
+
+    def lookup(self, city: str, interests: Optional[List[str]] = None, count: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Best stored itinerary for ``city`` and ``interests``, with a ``match`` of exact or partial.
+        ``count=False`` leaves the hit/miss metrics alone, for lookups that do not serve a plan
+        """
+        wanted = set(canonical_interests(interests))
+        key = store_key(city, interests)
+        with self._lock:
+            entry = self._fresh(key)
+            if entry is not None:
+                self.stats["exact_hits"] += int(count)
+                return {**entry, "key": key, "match": "exact"}
+
+            best, best_score = None, 0.0
+            for candidate in self._by_city.get(city.strip().upper(), []):
+                entry = self._fresh(candidate)
+                if entry is None:
+                    continue
+                stored = set(entry["interests"])
+                if wanted and stored:
+                    score = len(wanted & stored) / len(wanted | stored)
+                elif not stored:
+                    # the city's general entry is a weak match for any request
+                    score = 0.01
+                else:
+                    # no interests given: any itinerary for the city will do
+                    score = 0.005
+                if score > best_score:
+                    best, best_score = candidate, score
+            if best is None:
+                self.stats["misses"] += int(count)
+                return None
+            self.stats["partial_hits"] += int(count)
+            return {**self.itineraries[best], "key": best, "match": "partial"}
+
+    def find_city(self, text: str) -> Optional[str]:
+        """IATA code of the first known city whose name or code appears in ``text`` (e.g. a URL)"""
+        lowered = re.sub(r"%20|[-_+]", " ", text.lower())
+        for code, info in self.cities.items():
+            names = [info.get("name", "").lower(), *[a.lower() for a in info.get("aliases", [])]]
+            if any(name and name in lowered for name in names) or f"/{code.lower()}" in lowered:
+                return code
+        return None
+
+    def put(self, city: str, interests: Optional[List[str]], text: str, name: Optional[str] = None) -> str:
+        key = store_key(city, interests)
+        entry = {
+            "city": city.strip().upper(),
+            "interests": canonical_interests(interests),
+            "text": text.strip(),
+            "generated_at": time.time(),
+        }
+        with self._lock:
+            self._index(key, entry)
+            if name:
+                self.cities.setdefault(entry["city"], {})["name"] = name
+        return key
+
+    def save(self, path: Optional[str] = None) -> Path:
+        target = Path(path) if path else self.path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            data = {"version": 1, "cities": self.cities, "itineraries": dict(sorted(self.itineraries.items()))}
+        tmp = target.with_suffix(".tmp")
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(data, fh, ensure_ascii=False, indent=1)
+        os.replace(tmp, target)
+        return target
+
+    def metrics(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self.stats, "itineraries": len(self.itineraries), "cities": len(self._by_city)}
+
+    def _index(self, key: str, entry: Dict[str, Any]) -> None:
+        if key not in self.itineraries:
+            self._by_city.setdefault(entry["city"], []).append(key)
+        self.itineraries[key] = entry
+
+    def _fresh(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self.itineraries.get(key)
+        # hand-written seed entries carry no generated_at and never expire
+        generated_at = entry.get("generated_at") if entry else None
+        if entry is None or (self.max_age and generated_at and time.time() - generated_at > self.max_age):
+            return None
+        return entry
+
+
+_store: Optional[ItineraryStore] = None
+_store_lock = threading.Lock()
+
+
+def get_itinerary_store() -> ItineraryStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ItineraryStore.from_env()
+        return _store
@@ -0,0 +1,163 @@
+# src/travel_planner/jobs.py
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from travel_planner.crew_pool import PoolSaturated
+from travel_planner.pipeline import default_mode
+from travel_planner.plan_cache import plan_key
+
+logger = logging.getLogger("travel_planner.jobs")
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = "queued", "running", "succeeded", "failed"
+
+
+class Job:
+    __slots__ = ("id", "key", "use_cache", "status", "created_at", "started_at", "finished_at", "result", "error", "_finished")
+
+    def __init__(self, key: str, use_cache: bool = True):
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.use_cache = use_cache
+        self.status = QUEUED
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self._finished = threading.Event()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the job finishes or ``timeout`` elapses; returns whether it finished"""
+        return self._finished.wait(timeout)
+
+    @property
+    def done(self) -> bool:
+        return self._finished.is_set()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "data": self.result,
+            "error": self.error,
+        }
+
+
+class JobManager:
+    """
+    Runs trip plans on a background worker pool and keeps finished results for ``ttl`` seconds.
+
+    Submitting a request identical to one that is still queued or running returns
+    the existing job instead of starting another kickoff; a request with ``use_cache=False``
+    is only attached to a job that plans fresh as well. At most ``max_pending`` distinct
+    jobs may be queued or running; further submissions are rejected with 429.
+    """
+
+    def __init__(self, runner: Callable[..., Dict[str, Any]], max_workers: int = 4, ttl: float = 3600,
+                 max_pending: int = 64, retry_after: int = 30):
+        self.runner = runner
+        self.ttl = ttl
+        self.max_pending = max(1, max_pending)
+        self.retry_after = retry_after
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="plan-job")
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Job] = {}
+        self._in_flight: Dict[str, Job] = {}
+        self.stats: Dict[str, int] = {"submitted": 0, "deduplicated": 0, "succeeded": 0, "failed": 0, "expired": 0,
+                                      "rejected": 0}
+
+    @classmethod
+    def from_env(cls, runner: Callable[..., Dict[str, Any]]) -> "JobManager":
+        return cls(
+            runner,
+            max_workers=int(os.getenv("JOB_WORKERS", 4)),
+            ttl=float(os.getenv("JOB_RESULT_TTL", 3600)),
+            max_pending=int(os.getenv("JOB_MAX_PENDING", 64)),
+            retry_after=int(os.getenv("JOB_RETRY_AFTER", 30)),
+        )
+
+    def submit(self, inputs: Dict[str, Any], mode: Optional[str] = None,
+               use_cache: bool = True) -> Tuple[Job, bool]:
+        """Queue a plan; returns the job and whether it was newly created. Raises PoolSaturated when full"""
+        # equivalent requests (case, order, the default mode sent explicitly) share a job, as they share a cached plan
+        plan = plan_key(inputs, mode or default_mode())
+        key = f"{plan}:{'cached' if use_cache else 'fresh'}"
+        # a fresh plan also answers a request that would have accepted a cached one
+        candidates = (key, f"{plan}:fresh") if use_cache else (key,)
+        with self._lock:
+            self._purge()
+            existing = next((self._in_flight[k] for k in candidates if k in self._in_flight), None)
+            if existing is not None:
+                self.stats["deduplicated"] += 1
+                return existing, False
+            if len(self._in_flight) >= self.max_pending:
+                self.stats["rejected"] += 1
+                raise PoolSaturated(f"{len(self._in_flight)} plan jobs are already pending", status_code=429,
+                                    retry_after=self.retry_after)
+            job = Job(key, use_cache)
+            self._jobs[job.id] = job
+            self._in_flight[key] = job
+            self.stats["submitted"] += 1
+        self._executor.submit(self._execute, job, inputs, mode)
+        return job, True
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            self._purge()
+            return self._jobs.get(job_id)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            data: Dict[str, Any] = dict(self.stats)
+            data["in_flight"] = len(self._in_flight)
+            data["stored"] = len(self._jobs)
+            data["max_pending"] = self.max_pending
+            return data
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _execute(self, job: Job, inputs: Dict[str, Any], mode: Optional[str]) -> None:
+        job.status = RUNNING
+        job.started_at = time.time()
+        try:
+            job.result = self.runner(inputs, mode, job.use_cache)
+            job.status = SUCCEEDED
+        except Exception as exc:
+            logger.exception("Plan job %s failed: %s", job.id, exc)
+            job.error = str(exc)
+            job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                self._in_flight.pop(job.key, None)
+                self.stats[job.status] += 1
+            job._finished.set()
+
+    def _purge(self) -> None:
+        cutoff = time.time() - self.ttl
+        expired = [jid for jid, job in self._jobs.items() if job.done and job.finished_at < cutoff]
+        for jid in expired:
+            del self._jobs[jid]
+        self.stats["expired"] += len(expired)
+
+
+_manager: Optional[JobManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager() -> JobManager:
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            from travel_planner.pipeline import run_plan
+            _manager = JobManager.from_env(run_plan)
+        return _manager
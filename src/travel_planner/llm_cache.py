@@ -0,0 +1,105 @@
+# src/travel_planner/llm_cache.py
+import functools
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Union
+
+from crewai import LLM
+
+from travel_planner.cache import TwoTierCache, make_key
+from travel_planner.cassette import REPLAY, CassetteMiss, get_cassette
+
+logger = logging.getLogger("travel_planner.llm_cache")
+
+# Completion parameters that change what the model returns; credentials and transport settings are left out
+_KEY_PARAMS = (
+    "temperature", "top_p", "n", "stop", "max_tokens", "max_completion_tokens", "presence_penalty",
+    "frequency_penalty", "logit_bias", "seed", "logprobs", "top_logprobs", "reasoning_effort",
+)
+
+
+class LLMCacheMiss(CassetteMiss):
+    """Raised in replay mode when a prompt has no recorded completion"""
+
+
+def _replay_from_env() -> bool:
+    return os.getenv("LLM_CACHE_REPLAY", "").lower() in ("1", "true", "yes")
+
+
+class CachedLLM(LLM):
+    """
+    LLM whose text completions are cached by a hash of model, parameters and messages.
+
+    Calls that can execute tools (``tools`` together with ``available_functions``) always
+    go to the model so tool side effects are never skipped. With ``replay=True`` a miss
+    raises ``LLMCacheMiss`` instead of calling the model, which makes runs against a
+    recorded store deterministic and offline. A replaying cassette takes precedence: misses
+    are answered from it, and a prompt it does not hold raises ``CassetteMiss`` either way.
+    """
+
+    def __init__(self, model: str, cache: Optional[TwoTierCache] = None, replay: Optional[bool] = None,
+                 **kwargs: Any):
+        super().__init__(model=model, **kwargs)
+        self.cache = cache if cache is not None else TwoTierCache.from_env(
+            "llm_completions", prefix="LLM_CACHE", ttl=7 * 24 * 3600, max_bytes=256 * 1024 * 1024
+        )
+        self.replay = _replay_from_env() if replay is None else replay
+        self._stats_lock = threading.Lock()
+        self.stats: Dict[str, float] = {"hits": 0, "misses": 0, "bypassed": 0, "latency_saved_seconds": 0.0}
+
+    def completion_key(self, messages: Union[str, List[Dict[str, str]]], tools: Optional[List[dict]] = None) -> str:
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+        params = {name: getattr(self, name, None) for name in _KEY_PARAMS}
+        if self.response_format is not None:
+            params["response_format"] = getattr(self.response_format, "__name__", str(self.response_format))
+        return make_key("llm", self.model, messages=messages, tools=tools, **params)
+
+    def call(
+        self,
+        messages: Union[str, List[Dict[str, str]]],
+        tools: Optional[List[dict]] = None,
+        callbacks: Optional[List[Any]] = None,
+        available_functions: Optional[Dict[str, Any]] = None,
+        from_task: Optional[Any] = None,
+        from_agent: Optional[Any] = None,
+    ) -> Any:
+        # the model call itself goes through the cassette so recorded runs can be replayed offline
+        model_call = functools.partial(super().call, messages, tools, callbacks, available_functions,
+                                       from_task, from_agent)
+        key = self.completion_key(messages, tools)
+        if not self.cache.enabled or (tools and available_functions):
+            self._count("bypassed")
+            return get_cassette().exchange("gemini", key, model_call)
+
+        entry = self.cache.get(key)
+        if entry is not None:
+            self._count("hits", entry.get("latency", 0.0))
+            return entry["response"]
+        cassette = get_cassette()
+        if self.replay and cassette.mode != REPLAY:
+            raise LLMCacheMiss(f"No recorded completion for {self.model} prompt {key[:12]}")
+
+        self._count("misses")
+        started = time.perf_counter()
+        response = cassette.exchange("gemini", key, model_call)
+        if isinstance(response, str) and response.strip():
+            self.cache.set(key, {"response": response, "latency": round(time.perf_counter() - started, 3)})
+        return response
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            data: Dict[str, Any] = dict(self.stats)
+        lookups = data["hits"] + data["misses"]
+        data["hit_rate"] = round(data["hits"] / lookups, 4) if lookups else 0.0
+        data["latency_saved_seconds"] = round(data["latency_saved_seconds"], 3)
+        data["replay"] = self.replay
+        data["store"] = self.cache.metrics()
+        return data
+
+    def _count(self, name: str, latency_saved: float = 0.0) -> None:
+        with self._stats_lock:
+            self.stats[name] += 1
+            self.stats["latency_saved_seconds"] += latency_saved
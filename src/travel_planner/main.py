@@ -1,15 +1,198 @@
 # src/travel_planner/main.py
+"""
+Command-line entry points, installed as the scripts in pyproject.toml:
+
+    run      plan a trip (the sample trip unless --origin/--destination/--date/--interests are given)
+    record   plan it against the real services and save every external exchange to a cassette
+    replay   plan it offline from the cassette, at the recorded or a simulated latency
+    test     replay it many times, optionally concurrently, and report wall-clock percentiles
+    train    crewAI training iterations of the plan crew
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
 from dotenv import load_dotenv
 load_dotenv()
 
-# keep script mode for local ad-hoc runs
-if __name__ == "__main__":
-    from travel_planner.crew import crew
-    inputs = {
+SAMPLE_INTERESTS = ["food", "culture", "shopping"]
+# caches in front of the external services, switched off for cold replays
+CACHE_PREFIXES = ("FLIGHT_CACHE", "RESEARCH_CACHE", "SCRAPE_CACHE", "LLM_CACHE")
+
+
+def _trip_parser(description: str) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--mode", default=None,
+                        help="pipeline mode; 'fast' runs flight search and ranking without the LLM (default: PIPELINE_MODE or crew)")
+    parser.add_argument("--origin", default=None, help="origin IATA code (default MEL)")
+    parser.add_argument("--destination", default=None, help="destination IATA code (default BLR)")
+    parser.add_argument("--date", default=None, help="departure date, YYYY-MM-DD (default: in 30 days)")
+    parser.add_argument("--interests", nargs="*", default=None, help="traveller interests (default: food culture shopping)")
+    return parser
+
+
+def _pipeline_mode(parser: argparse.ArgumentParser, mode: Optional[str]) -> Optional[str]:
+    """``mode`` if the pipeline knows it, otherwise exit with a usage error"""
+    # checked only after the cassette is installed: importing the pipeline builds the tools and their caches
+    from travel_planner.pipeline import PIPELINE_MODES
+    if mode is not None and mode not in PIPELINE_MODES:
+        parser.error(f"argument --mode: invalid choice: {mode!r} (choose from {', '.join(PIPELINE_MODES)})")
+    return mode
+
+
+def _cassette_args(parser: argparse.ArgumentParser, replaying: bool) -> None:
+    parser.add_argument("--cassette", default=None, help="cassette file (default: CASSETTE_PATH or .cache/cassette.json.gz)")
+    if replaying:
+        parser.add_argument("--latency", default=None,
+                            help="seconds to wait per exchange instead of the recorded latency ('recorded' keeps it)")
+        parser.add_argument("--latency-scale", type=float, default=None, help="multiply recorded latencies, e.g. 0 or 0.5")
+        parser.add_argument("--warm-caches", action="store_true",
+                            help="keep the flight, research, scrape and LLM caches on, so repeated exchanges skip the cassette")
+
+
+def _trip_inputs(args: argparse.Namespace, recorded: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Inputs from the command line, falling back to the recorded trip and then the sample trip"""
+    base = recorded or {
         "origin": "MEL",
         "destination": "BLR",
-        "date": "2025-08-01",
-        "interests": ["food", "culture", "shopping"],
+        "date": (date.today() + timedelta(days=30)).isoformat(),
+        "interests": SAMPLE_INTERESTS,
     }
-    result = crew.kickoff(inputs=inputs)
-    print(result)
+    inputs = dict(base)
+    if args.origin:
+        inputs["origin"] = args.origin.strip().upper()
+    if args.destination:
+        inputs["destination"] = args.destination.strip().upper()
+    if args.date:
+        inputs["date"] = args.date
+    if args.interests is not None:
+        inputs["interests"] = args.interests
+    return inputs
+
+
+def _open_cassette(mode: str, args: argparse.Namespace):
+    """Install the process-wide cassette; caches stay in memory so every exchange reaches it"""
+    # a warm on-disk cache would answer calls before they are recorded (or replayed with latency)
+    os.environ["TRAVEL_PLANNER_CACHE_PATH"] = ""
+    os.environ["CASSETTE_MODE"] = mode
+    if args.cassette:
+        os.environ["CASSETTE_PATH"] = args.cassette
+    if getattr(args, "latency", None) is not None:
+        os.environ["CASSETTE_LATENCY"] = args.latency
+    if getattr(args, "latency_scale", None) is not None:
+        os.environ["CASSETTE_LATENCY_SCALE"] = str(args.latency_scale)
+    if mode == "replay" and not args.warm_caches:
+        # every plan pays every exchange's latency, as a cold process would
+        for prefix in CACHE_PREFIXES:
+            os.environ[f"{prefix}_DISABLED"] = "true"
+
+    from travel_planner.cassette import Cassette, use_cassette
+    cassette = Cassette.from_env()
+    use_cassette(cassette)
+    return cassette
+
+
+def _print(result: Dict[str, Any]) -> None:
+    print(json.dumps(result, ensure_ascii=False, indent=2, default=str))
+
+
+def run() -> None:
+    """Plan a trip and print the result"""
+    parser = _trip_parser("Plan a trip")
+    args = parser.parse_args()
+    mode = _pipeline_mode(parser, args.mode)
+    from travel_planner.pipeline import run_plan
+    _print(run_plan(_trip_inputs(args), mode))
+
+
+def record() -> None:
+    """Plan a trip against the real services and save every exchange to the cassette"""
+    parser = _trip_parser("Record the external exchanges of one plan")
+    _cassette_args(parser, replaying=False)
+    args = parser.parse_args()
+    cassette = _open_cassette("record", args)
+    mode = _pipeline_mode(parser, args.mode)
+    inputs = _trip_inputs(args)
+
+    from travel_planner.pipeline import run_plan
+    try:
+        result = run_plan(inputs, mode, use_cache=False)
+    finally:
+        # whatever was recorded before a failure is still worth keeping
+        cassette.meta.update({"inputs": inputs, "mode": mode, "recorded_at": time.time()})
+        path = cassette.save()
+        print(f"Recorded {cassette.metrics()['exchanges']} into {path}", file=sys.stderr)
+    _print(result)
+
+
+def replay() -> None:
+    """Plan the recorded trip offline from the cassette"""
+    parser = _trip_parser("Replay a recorded plan offline")
+    _cassette_args(parser, replaying=True)
+    args = parser.parse_args()
+    cassette = _open_cassette("replay", args)
+    mode = _pipeline_mode(parser, args.mode or cassette.meta.get("mode"))
+
+    from travel_planner.pipeline import run_plan
+    started = time.perf_counter()
+    result = run_plan(_trip_inputs(args, cassette.meta.get("inputs")), mode, use_cache=False)
+    _print(result)
+    print(f"Replayed in {time.perf_counter() - started:.2f}s: {cassette.metrics()}", file=sys.stderr)
+
+
+def test() -> None:
+    """Replay the recorded trip repeatedly and report how long each plan took"""
+    parser = _trip_parser("Load-test the pipeline offline against a cassette")
+    _cassette_args(parser, replaying=True)
+    parser.add_argument("--iterations", "-n", type=int, default=10, help="plans to run")
+    parser.add_argument("--concurrency", "-c", type=int, default=1, help="plans in flight at once")
+    args = parser.parse_args()
+    cassette = _open_cassette("replay", args)
+    mode = _pipeline_mode(parser, args.mode or cassette.meta.get("mode"))
+
+    from travel_planner.pipeline import run_plan
+    inputs = _trip_inputs(args, cassette.meta.get("inputs"))
+
+    def one(_: int) -> float:
+        started = time.perf_counter()
+        run_plan(inputs, mode, use_cache=False)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, args.concurrency), thread_name_prefix="load-test") as pool:
+        timings: List[float] = sorted(pool.map(one, range(args.iterations)))
+    elapsed = time.perf_counter() - started
+    quantiles = statistics.quantiles(timings, n=100) if len(timings) > 1 else timings * 99
+    _print({
+        "iterations": len(timings),
+        "concurrency": args.concurrency,
+        "seconds": round(elapsed, 3),
+        "plans_per_second": round(len(timings) / elapsed, 3) if elapsed else None,
+        "p50": round(quantiles[49], 3),
+        "p95": round(quantiles[94], 3),
+        "max": round(timings[-1], 3),
+        "cassette": cassette.metrics(),
+    })
+
+
+def train() -> None:
+    """Run crewAI training iterations of the plan crew and save the feedback file"""
+    parser = _trip_parser("Train the plan crew")
+    parser.add_argument("iterations", type=int, help="number of training iterations")
+    parser.add_argument("filename", help="where crewAI stores the training data, e.g. trained.pkl")
+    args = parser.parse_args()
+
+    from travel_planner.crew import build_crew, prepare_inputs
+    build_crew("plan").train(n_iterations=args.iterations, filename=args.filename,
+                             inputs=prepare_inputs(_trip_inputs(args)))
+
+
+# keep script mode for local ad-hoc runs
+if __name__ == "__main__":
+    run()
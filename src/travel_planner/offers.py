@@ -0,0 +1,247 @@
+# src/travel_planner/offers.py
+"""
+Slim offer records for agent hand-offs.
+
+Amadeus offers carry pricing breakdowns, fare rules and baggage allowances the agents never
+use, yet the whole JSON used to travel from search_flights into every later task's context.
+Agents now see one table row per offer with a short reference; the full payload stays in an
+in-process registry and any tool can resolve the reference back to it. The table only lists
+the cheapest offers that fit its token budget, so the whole result set is also registered
+under a search handle printed above it: passing the table on resolves every offer, not only
+the rows shown.
+"""
+import contextvars
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from travel_planner.events import CONTEXT_SAVINGS, emit
+from travel_planner.passages import estimate_tokens
+from travel_planner.tools.scoring import first_stopover, parse_duration, parse_price
+
+TABLE_COLUMNS = ("ref", "eur", "from", "to", "depart", "arrive", "hours", "stops", "via", "airlines")
+DEFAULT_TOKEN_BUDGET = 800
+
+_REF = re.compile(r"\bF[0-9a-f]{8}\b")
+# offer refs (F...) and search handles (S...) in order of mention
+_HANDLE_OR_REF = re.compile(r"\b[FS][0-9a-f]{8}\b")
+
+
+def offer_ref(offer: Dict[str, Any]) -> str:
+    """Stable short reference for a journey ('F' + 8 hex digits), the same across queries"""
+    from travel_planner.tools.flight_search import offer_signature
+
+    digest = hashlib.sha1(repr(offer_signature(offer)).encode("utf-8")).hexdigest()
+    return f"F{digest[:8]}"
+
+
+class OfferRecord:
+    """The fields of an offer the agents reason about, nothing else"""
+
+    __slots__ = ("ref", "price", "origin", "destination", "departure", "arrival", "hours", "stops", "via", "airlines")
+
+    def __init__(self, ref: str, price: float, origin: str, destination: str, departure: str, arrival: str,
+                 hours: float, stops: int, via: str, airlines: str):
+        self.ref = ref
+        self.price = price
+        self.origin = origin
+        self.destination = destination
+        self.departure = departure
+        self.arrival = arrival
+        self.hours = hours
+        self.stops = stops
+        self.via = via
+        self.airlines = airlines
+
+    @classmethod
+    def from_offer(cls, offer: Dict[str, Any]) -> Optional["OfferRecord"]:
+        price = parse_price(offer)
+        if price is None:
+            return None
+        try:
+            itinerary = (offer.get("itineraries") or [{}])[0]
+            segments = itinerary.get("segments") or []
+            first, last = (segments[0], segments[-1]) if segments else ({}, {})
+            carriers = list(dict.fromkeys(s.get("carrierCode") for s in segments if s.get("carrierCode")))
+        except (AttributeError, TypeError, IndexError):
+            return None
+        minutes = parse_duration(itinerary.get("duration"))
+        return cls(
+            ref=offer_ref(offer),
+            price=round(price, 2),
+            origin=first.get("departure", {}).get("iataCode", ""),
+            destination=last.get("arrival", {}).get("iataCode", ""),
+            # minute precision is plenty and drops the seconds from every row
+            departure=first.get("departure", {}).get("at", "")[:16],
+            arrival=last.get("arrival", {}).get("at", "")[:16],
+            hours=round(minutes / 60, 1) if minutes == minutes else None,
+            stops=max(0, len(segments) - 1),
+            via=first_stopover(offer) or "",
+            airlines=",".join(carriers),
+        )
+
+    def row(self) -> str:
+        hours = "" if self.hours is None else f"{self.hours:g}"
+        return "|".join([self.ref, f"{self.price:g}", self.origin, self.destination, self.departure,
+                         self.arrival, hours, str(self.stops), self.via or "-", self.airlines])
+
+
+def search_handle(refs: Iterable[str]) -> str:
+    """Stable handle for a result set ('S' + 8 hex digits), the same for the same offers"""
+    digest = hashlib.sha1("|".join(sorted(refs)).encode("utf-8")).hexdigest()
+    return f"S{digest[:8]}"
+
+
+def offers_table(records: Sequence[OfferRecord], token_budget: int = DEFAULT_TOKEN_BUDGET) -> str:
+    """Pipe-separated table of the cheapest records that fit in ``token_budget`` tokens"""
+    header = "|".join(TABLE_COLUMNS)
+    lines, used = [header], estimate_tokens(header)
+    ordered = sorted(records, key=lambda r: r.price)
+    for record in ordered:
+        line = record.row()
+        cost = estimate_tokens(line)
+        if used + cost > token_budget:
+            break
+        lines.append(line)
+        used += cost
+    omitted = len(ordered) - (len(lines) - 1)
+    if omitted:
+        lines.append(f"(+{omitted} pricier offers omitted)")
+    return "\n".join(lines)
+
+
+class OfferRegistry:
+    """
+    Full offer payloads by reference and whole result sets by search handle (least recently
+    stored dropped first), plus savings totals
+    """
+
+    def __init__(self, max_offers: int = 5000, max_searches: int = 500):
+        self.max_offers = max_offers
+        self.max_searches = max_searches
+        self._lock = threading.Lock()
+        self._offers: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._searches: "OrderedDict[str, List[Dict[str, Any]]]" = OrderedDict()
+        self.totals = {"handoffs": 0, "offers": 0, "raw_bytes": 0, "compact_bytes": 0,
+                       "raw_tokens": 0, "compact_tokens": 0}
+
+    def put(self, offer: Dict[str, Any], ref: Optional[str] = None) -> str:
+        ref = ref or offer_ref(offer)
+        with self._lock:
+            self._offers[ref] = offer
+            self._offers.move_to_end(ref)
+            while len(self._offers) > self.max_offers:
+                self._offers.popitem(last=False)
+        return ref
+
+    def put_search(self, offers: List[Dict[str, Any]], handle: str) -> str:
+        # the search keeps its own list, so evicting single refs never truncates it
+        with self._lock:
+            self._searches[handle] = offers
+            self._searches.move_to_end(handle)
+            while len(self._searches) > self.max_searches:
+                self._searches.popitem(last=False)
+        return handle
+
+    def get(self, ref: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._offers.get(ref)
+
+    def get_search(self, handle: str) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            return self._searches.get(handle)
+
+    def resolve(self, text: str) -> List[Dict[str, Any]]:
+        """
+        Full offers for every reference mentioned in ``text``, in order of first mention;
+        a search handle stands for every offer of that search
+        """
+        offers: Dict[str, Dict[str, Any]] = {}
+        for token in dict.fromkeys(_HANDLE_OR_REF.findall(text)):
+            if token.startswith("S"):
+                for offer in self.get_search(token) or []:
+                    offers.setdefault(offer_ref(offer), offer)
+            else:
+                offer = self.get(token)
+                if offer is not None:
+                    offers.setdefault(token, offer)
+        return list(offers.values())
+
+    def record(self, report: Dict[str, int]) -> None:
+        with self._lock:
+            self.totals["handoffs"] += 1
+            for key in ("offers", "raw_bytes", "compact_bytes", "raw_tokens", "compact_tokens"):
+                self.totals[key] += report[key]
+
+    def metrics(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self.totals, "stored": len(self._offers), "searches": len(self._searches),
+                    "tokens_saved": self.totals["raw_tokens"] - self.totals["compact_tokens"]}
+
+
+_run_savings: "contextvars.ContextVar[Optional[Dict[str, int]]]" = contextvars.ContextVar(
+    "travel_planner_offer_savings", default=None
+)
+
+
+@contextmanager
+def track_savings() -> Iterator[Dict[str, int]]:
+    """Collect the savings of every hand-off made in this context into the yielded dict"""
+    totals: Dict[str, int] = {}
+    token = _run_savings.set(totals)
+    try:
+        yield totals
+    finally:
+        _run_savings.reset(token)
+
+
+def compact_offers(offers: Iterable[Dict[str, Any]],
+                   token_budget: int = DEFAULT_TOKEN_BUDGET) -> Tuple[str, Dict[str, int]]:
+    """
+    Register full offers (one by one and as a search) and return the agent-facing table, headed
+    by the search handle, with a report of what it saved: bytes and estimated tokens of the raw
+    JSON versus the table.
+    """
+    offers = [o for o in offers if isinstance(o, dict)]
+    registry = get_offer_registry()
+    records, priced = [], []
+    for offer in offers:
+        record = OfferRecord.from_offer(offer)
+        if record is not None:
+            registry.put(offer, record.ref)
+            records.append(record)
+            priced.append(offer)
+    handle = registry.put_search(priced, search_handle(r.ref for r in records))
+    table = f"search {handle}: {len(records)} offers\n" + offers_table(records, token_budget)
+    raw = json.dumps(offers, ensure_ascii=False)
+    report = {
+        "offers": len(offers),
+        "rows": sum(1 for line in table.splitlines() if _REF.match(line)),
+        "raw_bytes": len(raw.encode("utf-8")),
+        "compact_bytes": len(table.encode("utf-8")),
+        "raw_tokens": estimate_tokens(raw),
+        "compact_tokens": estimate_tokens(table),
+    }
+    registry.record(report)
+    run_totals = _run_savings.get()
+    if run_totals is not None:
+        for key, value in report.items():
+            run_totals[key] = run_totals.get(key, 0) + value
+    emit(CONTEXT_SAVINGS, **report, tokens_saved=report["raw_tokens"] - report["compact_tokens"])
+    return table, report
+
+
+_registry: Optional[OfferRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_offer_registry() -> OfferRegistry:
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = OfferRegistry()
+        return _registry
@@ -0,0 +1,165 @@
+# src/travel_planner/passages.py
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional
+
+_WORD = re.compile(r"[^\W_]+", re.UNICODE)
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with "
+    "you your we our they their there here can also more most all any".split()
+)
+# Searched when the traveller gave no interests
+DEFAULT_QUERY = "things to do see visit eat local food sights"
+
+
+def tokenize(text: str) -> List[str]:
+    return [w for w in _WORD.findall(text.lower()) if w not in STOPWORDS and len(w) > 1]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token count (about four characters per token)"""
+    return len(text) // 4 + 1
+
+
+def chunk_text(text: str, words: int = 60, overlap: int = 15) -> List[str]:
+    """Split text into overlapping windows of ``words`` words"""
+    tokens = text.split()
+    if len(tokens) <= words:
+        return [" ".join(tokens)] if tokens else []
+    step = max(1, words - overlap)
+    return [" ".join(tokens[i:i + words]) for i in range(0, len(tokens) - overlap, step)]
+
+
+class PassageIndex:
+    """
+    BM25 index over chunks of the pages read for one city.
+
+    Adding a source again replaces its passages, so re-scraped pages do not pile up duplicates.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        self._passages: Dict[int, Dict] = {}
+        self._by_source: Dict[str, List[int]] = {}
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._total_length = 0
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self._passages)
+
+    def has_source(self, source: str) -> bool:
+        return source in self._by_source
+
+    def add(self, source: str, text: str) -> int:
+        """Index ``text`` under ``source``; returns the number of passages added"""
+        chunks = chunk_text(text)
+        with self._lock:
+            self._remove(source)
+            ids = []
+            for chunk in chunks:
+                terms = Counter(tokenize(chunk))
+                if not terms:
+                    continue
+                pid = self._next_id
+                self._next_id += 1
+                length = sum(terms.values())
+                self._passages[pid] = {"source": source, "text": chunk, "length": length}
+                for term, count in terms.items():
+                    self._postings.setdefault(term, {})[pid] = count
+                self._total_length += length
+                ids.append(pid)
+            self._by_source[source] = ids
+            return len(ids)
+
+    def search(self, query: str, k: int = 8, token_budget: Optional[int] = None) -> List[Dict]:
+        """Best passages for ``query`` (highest score first), stopping before ``token_budget`` is exceeded"""
+        terms = set(tokenize(query))
+        with self._lock:
+            n = len(self._passages)
+            if not n or not terms:
+                return []
+            avg_length = self._total_length / n
+            scores: Dict[int, float] = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                for pid, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._passages[pid]["length"] / avg_length)
+                    scores[pid] = scores.get(pid, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+
+            results, used, seen = [], 0, set()
+            for pid, score in ranked:
+                passage = self._passages[pid]
+                if passage["text"] in seen:
+                    continue
+                cost = estimate_tokens(passage["text"])
+                if token_budget is not None and used + cost > token_budget:
+                    continue
+                seen.add(passage["text"])
+                used += cost
+                results.append({"source": passage["source"], "text": passage["text"], "score": round(score, 3)})
+                if len(results) == k:
+                    break
+            return results
+
+    def _remove(self, source: str) -> None:
+        for pid in self._by_source.pop(source, []):
+            passage = self._passages.pop(pid)
+            self._total_length -= passage["length"]
+            for term in set(tokenize(passage["text"])):
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop(pid, None)
+                    if not postings:
+                        del self._postings[term]
+
+
+def format_passages(passages: List[Dict]) -> str:
+    if not passages:
+        return "No relevant passages found."
+    return "\n\n".join(f"[{i}] {p['text']}\n(source: {p['source']})" for i, p in enumerate(passages, 1))
+
+
+class PassageStore:
+    """Per-city indexes kept across requests; the least recently used cities are dropped first"""
+
+    def __init__(self, max_cities: int = 64):
+        self.max_cities = max_cities
+        self._lock = threading.Lock()
+        self._indexes: "OrderedDict[str, PassageIndex]" = OrderedDict()
+
+    def index(self, city: str) -> PassageIndex:
+        key = city.strip().upper()
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is None:
+                index = self._indexes[key] = PassageIndex()
+                while len(self._indexes) > self.max_cities:
+                    self._indexes.popitem(last=False)
+            else:
+                self._indexes.move_to_end(key)
+            return index
+
+    def metrics(self) -> Dict[str, int]:
+        with self._lock:
+            return {"cities": len(self._indexes), "passages": sum(len(i) for i in self._indexes.values())}
+
+
+_store: Optional[PassageStore] = None
+_store_lock = threading.Lock()
+
+
+def get_passage_store() -> PassageStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = PassageStore()
+        return _store
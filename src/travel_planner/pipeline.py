@@ -0,0 +1,229 @@
+# src/travel_planner/pipeline.py
+import contextvars
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional
+
+from travel_planner import crew as crew_module
+from travel_planner.crew import CREWS_CONFIG, prepare_inputs
+from travel_planner.crew_pool import PoolSaturated, get_pool
+from travel_planner.events import (
+    ERROR, PLAN_CACHE, PLAN_FINISHED, PLAN_STARTED, TASK_FINISHED, TASK_STARTED,
+    EventStream, bind_stream, emit, start_in_thread, tool_timer,
+)
+from travel_planner.itinerary_store import get_itinerary_store
+from travel_planner.offers import track_savings
+from travel_planner.plan_cache import get_plan_cache, plan_key
+from travel_planner.prefetch import candidate_cities, get_prefetcher
+from travel_planner.research import city_research_notes, research_query
+from travel_planner.route_graph import stopover_routes
+from travel_planner.tools.flight_search import FlightFilters, date_window
+
+logger = logging.getLogger("travel_planner.pipeline")
+
+# "crew": every stage is an LLM agent turn (original behaviour)
+# "fast": flight search and route ranking run as direct Python calls, only the itinerary uses the LLM
+PIPELINE_MODES = ("crew", "fast")
+
+
+def default_mode() -> str:
+    mode = os.getenv("PIPELINE_MODE", "crew").strip().lower()
+    return mode if mode in PIPELINE_MODES else "crew"
+
+
+def result_to_data(result: Any) -> Dict[str, Any]:
+    """Normalise a kickoff result (str, dict or CrewOutput) into a JSON-friendly dict"""
+    if isinstance(result, dict):
+        return result
+    if isinstance(result, str):
+        return {"raw": result}
+    raw = getattr(result, "raw", None)
+    if raw is not None:
+        return {"raw": raw}
+    return {"raw": str(result)}
+
+
+def search_and_rank(inputs: Dict[str, Any]) -> Dict[str, Any]:
+    """The search_flights -> evaluate_routes stages without any LLM turn"""
+    filters = FlightFilters.build(
+        inputs.get("max_price"), inputs.get("preferred_airlines"),
+        inputs.get("non_stop", False), inputs.get("max_stops"),
+    )
+    dates = date_window(inputs["date"], inputs.get("flex_days", 0))
+    emit(TASK_STARTED, task="search_flights")
+    with tool_timer(crew_module.flight_tool.name):
+        offers = crew_module.flight_tool.search_many(
+            [inputs["origin"], *inputs.get("alternate_origins", [])],
+            [inputs["destination"], *inputs.get("alternate_destinations", [])],
+            dates,
+            filters=filters,
+        )
+    emit(TASK_FINISHED, task="search_flights", output=f"{len(offers)} flight offers found",
+         data={"offers_found": len(offers)})
+    # Start researching the likely stopovers now; the ranking below decides which ones are kept
+    prefetch = get_prefetcher().start(offers, inputs.get("interests", []))
+
+    emit(TASK_STARTED, task="evaluate_routes")
+    routes = crew_module.evaluator_tool._run(offers, inputs.get("interests", []))
+    self_transfer: List[Dict[str, Any]] = []
+    if inputs.get("stopover_days"):
+        # multi-day stays in the hubs the ticketed offers connect through, combined from single legs;
+        # scored by graph cost rather than the evaluator's score, so they are kept in their own list
+        hubs = candidate_cities(offers, inputs.get("interests"), int(os.getenv("ROUTE_GRAPH_HUBS", 3)))
+        with tool_timer("route_graph"):
+            self_transfer = stopover_routes(crew_module.flight_tool, inputs, hubs, dates, filters=filters,
+                                            k=int(os.getenv("ROUTE_GRAPH_ROUTES", 2)))
+    cancelled = prefetch.keep(stopover_cities(routes + self_transfer))
+    if cancelled:
+        logger.info("Cancelled research prefetch for %s", ", ".join(cancelled))
+    emit(TASK_FINISHED, task="evaluate_routes", output=json.dumps(routes, ensure_ascii=False),
+         data={"routes": routes, "self_transfer_routes": self_transfer})
+    return {"offers": offers, "routes": routes, "self_transfer_routes": self_transfer}
+
+
+def stopover_cities(routes: List[Dict[str, Any]]) -> Dict[str, List[str]]:
+    """Distinct stopover cities in rank order, each with the ids of the routes through it"""
+    cities: Dict[str, List[str]] = {}
+    for route in routes:
+        city = route.get("stopover_city")
+        if city:
+            cities.setdefault(city, []).append(route.get("id"))
+    return cities
+
+
+def plan_itineraries(routes: List[Dict[str, Any]], inputs: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Write one itinerary per stopover city concurrently (capped by ITINERARY_MAX_CONCURRENCY)
+    and return them in rank order. A failed city is reported without losing the others.
+    """
+    cities = stopover_cities(routes)
+    if not cities:
+        return []
+    workers = min(len(cities), max(1, int(os.getenv("ITINERARY_MAX_CONCURRENCY", 4))))
+
+    store = get_itinerary_store()
+
+    def plan_city(city: str) -> str:
+        # Hubs precomputed for exactly these interests need no crew at all
+        stored = store.lookup(city, inputs.get("interests"))
+        if stored is not None and stored["match"] == "exact":
+            return stored["text"]
+        city_routes = [r for r in routes if r.get("stopover_city") == city]
+        with get_pool("city").lease() as city_crew:
+            result = city_crew.kickoff(inputs={
+                **inputs, "city": city, "routes": json.dumps(city_routes, ensure_ascii=False),
+                "research_query": research_query(city, inputs.get("interests")),
+                "research_notes": city_research_notes(city, inputs.get("interests")),
+            })
+        return result_to_data(result).get("raw")
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="itinerary") as executor:
+        # each worker gets its own copy of the context so progress events reach the caller's stream
+        futures = {city: executor.submit(contextvars.copy_context().run, plan_city, city) for city in cities}
+
+    itineraries: List[Dict[str, Any]] = []
+    errors: List[BaseException] = []
+    for city, future in futures.items():
+        entry: Dict[str, Any] = {"city": city, "route_ids": cities[city], "itinerary": None}
+        exc = future.exception()
+        if exc is None:
+            entry["itinerary"] = future.result()
+        else:
+            logger.warning("Itinerary for %s failed: %s", city, exc)
+            entry["error"] = str(exc)
+            errors.append(exc)
+        itineraries.append(entry)
+    if len(errors) == len(itineraries):
+        raise errors[0]
+    return itineraries
+
+
+def merge_itineraries(itineraries: List[Dict[str, Any]]) -> Optional[str]:
+    sections = [f"## Stopover in {i['city']}\n\n{i['itinerary']}" for i in itineraries if i.get("itinerary")]
+    return "\n\n".join(sections) or None
+
+
+def run_fast_pipeline(inputs: Dict[str, Any]) -> Dict[str, Any]:
+    inputs = prepare_inputs(inputs)
+    ranked = search_and_rank(inputs)
+    routes = ranked["routes"]
+    self_transfer = ranked["self_transfer_routes"]
+    logger.info("Fast pipeline ranked %d offers into %d routes (%d self-transfer)", len(ranked["offers"]),
+                len(routes), len(self_transfer))
+
+    itineraries: List[Dict[str, Any]] = []
+    itinerary: Optional[str] = None
+    # one itinerary per stopover city: the evaluator's cities in rank order, then any only self-transfers reach
+    stopovers = routes + self_transfer
+    if stopovers:
+        emit(TASK_STARTED, task="plan_itinerary", cities=list(stopover_cities(stopovers)))
+        itineraries = plan_itineraries(stopovers, inputs)
+        itinerary = merge_itineraries(itineraries)
+        emit(TASK_FINISHED, task="plan_itinerary", output=itinerary or "",
+             data={"cities": [i["city"] for i in itineraries]})
+
+    return {
+        "mode": "fast",
+        "offers_found": len(ranked["offers"]),
+        "routes": routes,
+        "self_transfer_routes": self_transfer,
+        "itinerary": itinerary,
+        "itineraries": itineraries,
+    }
+
+
+def run_plan(inputs: Dict[str, Any], mode: Optional[str] = None, use_cache: bool = True) -> Dict[str, Any]:
+    """Plan a trip in the requested pipeline mode and return a JSON-friendly dict"""
+    mode = mode or default_mode()
+    if mode not in PIPELINE_MODES:
+        raise ValueError(f"Unknown pipeline mode: {mode}")
+    if not use_cache:
+        return _run_plan_uncached(inputs, mode)
+
+    data, info = get_plan_cache().get_or_compute(
+        plan_key(inputs, mode), lambda: _run_plan_uncached(inputs, mode)
+    )
+    emit(PLAN_CACHE, **info)
+    logger.info("Plan cache %s (age %.1fs)", info["status"], info["age_seconds"])
+    return data
+
+
+def _run_plan_uncached(inputs: Dict[str, Any], mode: str) -> Dict[str, Any]:
+    if mode == "fast":
+        return run_fast_pipeline(inputs)
+    # Each request gets its own crew so concurrent kickoffs never share agents or tasks
+    with get_pool("plan").lease() as crew, track_savings() as savings:
+        emit(TASK_STARTED, task=CREWS_CONFIG["plan"][0])
+        data = dict(result_to_data(crew.kickoff(inputs=prepare_inputs(inputs))))
+    if savings:
+        # what handing the agents offer tables instead of raw Amadeus JSON saved in this run
+        data["context_savings"] = savings
+    return data
+
+
+def stream_plan(inputs: Dict[str, Any], mode: Optional[str] = None,
+                use_cache: bool = True) -> Iterator[Dict[str, Any]]:
+    """
+    Run a plan on a background thread and yield its progress events as they happen.
+    The last event is plan_finished (with the full result) or error.
+    """
+    stream = EventStream()
+    mode = mode or default_mode()
+
+    def worker() -> None:
+        with bind_stream(stream):
+            emit(PLAN_STARTED, mode=mode)
+            try:
+                emit(PLAN_FINISHED, data=run_plan(inputs, mode, use_cache))
+            except PoolSaturated as exc:
+                emit(ERROR, detail=str(exc), status_code=exc.status_code, retry_after=exc.retry_after)
+            except Exception as exc:
+                logger.exception("Streamed plan failed: %s", exc)
+                emit(ERROR, detail=f"Internal error while planning trip: {exc}", status_code=500)
+            finally:
+                stream.close()
+
+    start_in_thread(worker)
+    return iter(stream)
@@ -0,0 +1,191 @@
+# src/travel_planner/plan_cache.py
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from travel_planner.cache import TwoTierCache, make_key
+from travel_planner.interests import canonical_interests
+from travel_planner.tools.flight_search import airline_codes
+
+logger = logging.getLogger("travel_planner.plan_cache")
+
+HIT, STALE, MISS, COALESCED, BYPASS = "hit", "stale", "miss", "coalesced", "bypass"
+
+_MISSING = object()
+
+
+def plan_key(inputs: Dict[str, Any], mode: Optional[str]) -> str:
+    """Cache key for a trip request; equivalent requests (case, order, emoji labels) share a key"""
+    return make_key(
+        "plan",
+        mode=mode,
+        origin=str(inputs.get("origin", "")).strip().upper(),
+        destination=str(inputs.get("destination", "")).strip().upper(),
+        date=str(inputs.get("date", "")).strip(),
+        interests=canonical_interests(inputs.get("interests")),
+        max_price=inputs.get("max_price") or None,
+        airlines=sorted(airline_codes(inputs.get("preferred_airlines"))),
+        non_stop=bool(inputs.get("non_stop")),
+        max_stops=inputs.get("max_stops"),
+        flex_days=inputs.get("flex_days") or 0,
+        alternate_origins=sorted(c.strip().upper() for c in inputs.get("alternate_origins") or []),
+        alternate_destinations=sorted(c.strip().upper() for c in inputs.get("alternate_destinations") or []),
+        stopover_days=inputs.get("stopover_days") or 0,
+    )
+
+
+def is_cacheable(data: Dict[str, Any]) -> bool:
+    """Whether a plan is worth reusing: not an error and, for fast plans, with offers and routes"""
+    if not isinstance(data, dict) or data.get("error"):
+        return False
+    # Amadeus errors surface as zero offers; caching them would pin the outage for the whole ttl
+    if "offers_found" in data and not data["offers_found"]:
+        return False
+    return not ("routes" in data and not (data["routes"] or data.get("self_transfer_routes")))
+
+
+class PlanCache:
+    """
+    Whole-plan memoization with stale-while-revalidate.
+
+    Plans younger than ``ttl`` are served as-is. Plans up to ``ttl + stale_ttl`` old are
+    served immediately while one background refresh recomputes them. Concurrent misses
+    for the same key wait for a single computation instead of each starting a kickoff.
+    Plans that failed or found nothing are returned but not stored (see ``is_cacheable``).
+    """
+
+    def __init__(self, store: TwoTierCache, ttl: float = 600, stale_ttl: float = 3600,
+                 refresh_workers: int = 2):
+        self.store = store
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._refresher = ThreadPoolExecutor(max_workers=max(1, refresh_workers), thread_name_prefix="plan-refresh")
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, Future] = {}
+        self.stats: Dict[str, Any] = {
+            HIT: 0, STALE: 0, MISS: 0, COALESCED: 0,
+            "refreshes": 0, "refresh_failures": 0, "not_stored": 0,
+            "refresh_seconds_total": 0.0, "served_age_seconds_total": 0.0,
+        }
+
+    @classmethod
+    def from_env(cls) -> "PlanCache":
+        store = TwoTierCache.from_env("plans", prefix="PLAN_CACHE", ttl=4200, max_bytes=128 * 1024 * 1024)
+        ttl = float(os.getenv("PLAN_CACHE_TTL", 600))
+        stale_ttl = float(os.getenv("PLAN_CACHE_STALE_TTL", 3600))
+        # the store keeps entries for the whole fresh + stale window
+        store.ttl = ttl + stale_ttl
+        return cls(store, ttl=ttl, stale_ttl=stale_ttl)
+
+    def get_or_compute(self, key: str, compute: Callable[[], Dict[str, Any]]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Return (plan, info) where info has the cache status and the age of the plan served"""
+        if not self.store.enabled:
+            return compute(), {"status": BYPASS, "age_seconds": 0.0}
+
+        entry = self.store.get(key, _MISSING)
+        if entry is not _MISSING:
+            age = time.time() - entry["stored_at"]
+            if age < self.ttl:
+                self._record(HIT, age)
+                return entry["data"], {"status": HIT, "age_seconds": round(age, 3)}
+            self._record(STALE, age)
+            self._refresh_in_background(key, compute)
+            return entry["data"], {"status": STALE, "age_seconds": round(age, 3)}
+
+        with self._lock:
+            future = self._in_flight.get(key)
+            leader = future is None
+            if leader:
+                future = self._in_flight[key] = Future()
+        if not leader:
+            self._record(COALESCED, 0.0)
+            return future.result(), {"status": COALESCED, "age_seconds": 0.0}
+
+        self._record(MISS, 0.0)
+        try:
+            data = self._compute_and_store(key, compute)
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(data)
+            return data, {"status": MISS, "age_seconds": 0.0}
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            in_flight = len(self._in_flight)
+        served = stats[HIT] + stats[STALE]
+        lookups = served + stats[MISS] + stats[COALESCED]
+        return {
+            "hits": stats[HIT],
+            "stale_hits": stats[STALE],
+            "misses": stats[MISS],
+            "coalesced": stats[COALESCED],
+            "hit_rate": round(served / lookups, 4) if lookups else 0.0,
+            "avg_age_seconds": round(stats["served_age_seconds_total"] / served, 3) if served else 0.0,
+            "refreshes": stats["refreshes"],
+            "refresh_failures": stats["refresh_failures"],
+            "not_stored": stats["not_stored"],
+            "avg_refresh_seconds": round(stats["refresh_seconds_total"] / stats["refreshes"], 3) if stats["refreshes"] else 0.0,
+            "in_flight": in_flight,
+            "store": self.store.metrics(),
+        }
+
+    def _record(self, status: str, age: float) -> None:
+        with self._lock:
+            self.stats[status] += 1
+            self.stats["served_age_seconds_total"] += age
+
+    def _compute_and_store(self, key: str, compute: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        data = compute()
+        if is_cacheable(data):
+            self.store.set(key, {"stored_at": time.time(), "data": data})
+        else:
+            # a stale entry, if any, keeps being served until a refresh finds something
+            with self._lock:
+                self.stats["not_stored"] += 1
+        return data
+
+    def _refresh_in_background(self, key: str, compute: Callable[[], Dict[str, Any]]) -> None:
+        with self._lock:
+            if key in self._in_flight:
+                return
+            future = self._in_flight[key] = Future()
+
+        def refresh() -> None:
+            started = time.monotonic()
+            try:
+                data = self._compute_and_store(key, compute)
+                future.set_result(data)
+                with self._lock:
+                    self.stats["refreshes"] += 1
+                    self.stats["refresh_seconds_total"] += time.monotonic() - started
+            except Exception as exc:
+                logger.warning("Background plan refresh failed: %s", exc)
+                future.set_exception(exc)
+                with self._lock:
+                    self.stats["refresh_failures"] += 1
+            finally:
+                with self._lock:
+                    self._in_flight.pop(key, None)
+
+        self._refresher.submit(refresh)
+
+
+_plan_cache: Optional[PlanCache] = None
+_plan_cache_lock = threading.Lock()
+
+
+def get_plan_cache() -> PlanCache:
+    global _plan_cache
+    with _plan_cache_lock:
+        if _plan_cache is None:
+            _plan_cache = PlanCache.from_env()
+        return _plan_cache
@@ -0,0 +1,95 @@
+# src/travel_planner/precompute.py
+"""
+Offline job that precomputes hub-city itineraries into the itinerary store.
+
+    PYTHONPATH=src python -m travel_planner.precompute [--cities SIN HKG] [--top-n 10] [--output path.json]
+
+Each city is planned for every interest combination in COMMON_INTERESTS; cities whose
+entries are still fresh are skipped unless --force is given. The affinity matrix used for
+experience scoring is rebuilt from the filled store afterwards.
+"""
+import argparse
+import logging
+import time
+from typing import Dict, List, Optional
+
+from travel_planner.affinity import affinity_path, rebuild_affinity_matrix
+from travel_planner.airports import get_airport_index
+from travel_planner.interests import INTEREST_CATEGORIES
+from travel_planner.itinerary_store import ItineraryStore, get_itinerary_store, store_key
+from travel_planner.research import city_research_notes
+
+logger = logging.getLogger("travel_planner.precompute")
+
+# Busiest long-haul stopover hubs, most popular first
+HUB_CITIES: Dict[str, str] = {
+    "SIN": "Singapore", "DXB": "Dubai", "DOH": "Doha", "HKG": "Hong Kong", "IST": "Istanbul",
+    "KUL": "Kuala Lumpur", "BKK": "Bangkok", "AUH": "Abu Dhabi", "ICN": "Seoul", "NRT": "Tokyo",
+    "FRA": "Frankfurt", "AMS": "Amsterdam", "LHR": "London", "CDG": "Paris", "SYD": "Sydney",
+    "TPE": "Taipei", "HEL": "Helsinki", "LAX": "Los Angeles", "JFK": "New York", "MEX": "Mexico City",
+}
+
+# The UI's default pair, every single interest, and a city-wide general itinerary
+COMMON_INTERESTS: List[List[str]] = [
+    ["food & dining", "culture & history"],
+    *([category] for category in INTEREST_CATEGORIES),
+    [],
+]
+
+
+def precompute(store: ItineraryStore, cities: Dict[str, str], combos: List[List[str]], force: bool = False) -> int:
+    """Run the hub crew for every missing or stale city x interests pair; returns how many were written"""
+    from travel_planner.crew import build_crew
+    from travel_planner.pipeline import result_to_data
+
+    crew = build_crew("hub")
+    written = 0
+    for code, name in cities.items():
+        for interests in combos:
+            existing = store.lookup(code, interests, count=False)
+            if existing is not None and existing["match"] == "exact" and not force:
+                continue
+            started = time.perf_counter()
+            try:
+                result = crew.kickoff(inputs={
+                    "city": code,
+                    "city_name": name,
+                    "interests": ", ".join(interests) or "a bit of everything",
+                    "research_notes": city_research_notes(code, interests),
+                })
+            except Exception as exc:
+                logger.warning("Precompute failed for %s: %s", store_key(code, interests), exc)
+                continue
+            text = result_to_data(result).get("raw")
+            if text:
+                store.put(code, interests, text, name=name)
+                written += 1
+                logger.info("%s: %d chars in %.1fs", store_key(code, interests), len(text),
+                            time.perf_counter() - started)
+    return written
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cities", nargs="+", help="IATA codes (default: the top-N hubs)")
+    parser.add_argument("--top-n", type=int, default=10, help="number of hubs when --cities is not given")
+    parser.add_argument("--output", help="store file to write (default: the one loaded at startup)")
+    parser.add_argument("--force", action="store_true", help="recompute fresh entries too")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    if args.cities:
+        airports = get_airport_index()
+        cities = {code.upper(): HUB_CITIES.get(code.upper()) or airports.city_name(code.upper()) for code in args.cities}
+    else:
+        cities = dict(list(HUB_CITIES.items())[:args.top_n])
+    store = get_itinerary_store()
+    written = precompute(store, cities, COMMON_INTERESTS, force=args.force)
+    path = store.save(args.output)
+    print(f"Wrote {written} itineraries; {len(store)} stored in {path}")
+    matrix = rebuild_affinity_matrix(store.itineraries)
+    print(f"Rebuilt the affinity matrix for {len(matrix)} cities in {affinity_path()}")
+
+
+if __name__ == "__main__":
+    main()
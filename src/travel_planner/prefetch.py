@@ -0,0 +1,119 @@
+# src/travel_planner/prefetch.py
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from travel_planner.research import index_city
+from travel_planner.tools.scoring import rank_offers
+
+logger = logging.getLogger("travel_planner.prefetch")
+
+
+def candidate_cities(offers: List[Dict[str, Any]], interests: Optional[List[str]], top_n: int) -> List[str]:
+    """The ``top_n`` distinct stopover cities the route evaluator is most likely to pick"""
+    batch, ranked, _ = rank_offers(offers, interests or [], len(offers))
+    cities: List[str] = []
+    for row in ranked:
+        city = batch.stopover(row)
+        if city and city not in cities:
+            cities.append(city)
+            if len(cities) == top_n:
+                break
+    return cities
+
+
+class PrefetchHandle:
+    """Prefetches started for one plan; ``keep`` cancels the ones for cities that were not chosen"""
+
+    def __init__(self, prefetcher: "ResearchPrefetcher"):
+        self._prefetcher = prefetcher
+        self._jobs: Dict[str, Tuple[Future, threading.Event]] = {}
+
+    @property
+    def cities(self) -> List[str]:
+        return list(self._jobs)
+
+    def keep(self, cities: Iterable[str]) -> List[str]:
+        """Cancel prefetches for every city not in ``cities``; returns the cancelled cities"""
+        wanted = set(cities)
+        cancelled = [city for city in self._jobs if city not in wanted]
+        for city in cancelled:
+            future, stop = self._jobs[city]
+            stop.set()
+            if future.cancel():
+                self._prefetcher._count("cancelled_queued")
+            self._prefetcher._count("cancelled")
+        return cancelled
+
+
+class ResearchPrefetcher:
+    """
+    Warms the research cache for likely stopover cities while routes are still being ranked.
+
+    For each candidate city it builds the city's passage index (``research.index_city``): the
+    interest-independent search and its top pages that the research notes are ranked from.
+    A city whose handle cancels it before its turn is skipped.
+    """
+
+    def __init__(self, top_n: int = 3, max_workers: int = 4, enabled: bool = True):
+        self.top_n = top_n
+        self.enabled = enabled
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="prefetch")
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {
+            "started": 0, "completed": 0, "cancelled": 0, "cancelled_queued": 0,
+            "failures": 0,
+        }
+
+    @classmethod
+    def from_env(cls) -> "ResearchPrefetcher":
+        return cls(
+            top_n=int(os.getenv("PREFETCH_TOP_N", 3)),
+            max_workers=int(os.getenv("PREFETCH_WORKERS", 4)),
+            enabled=os.getenv("PREFETCH_DISABLED", "").lower() not in ("1", "true", "yes"),
+        )
+
+    def start(self, offers: List[Dict[str, Any]], interests: Optional[List[str]]) -> PrefetchHandle:
+        handle = PrefetchHandle(self)
+        api_key = os.getenv("SERPER_API_KEY")
+        if not self.enabled or not api_key or not offers:
+            return handle
+        for city in candidate_cities(offers, interests, self.top_n):
+            stop = threading.Event()
+            future = self._executor.submit(self._prefetch_city, city, api_key, stop)
+            handle._jobs[city] = (future, stop)
+            self._count("started")
+        return handle
+
+    def metrics(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self.stats)
+
+    def _prefetch_city(self, city: str, api_key: str, stop: threading.Event) -> None:
+        if stop.is_set():
+            return
+        try:
+            index_city(city, api_key)
+        except Exception as exc:
+            logger.warning("Research prefetch for %s failed: %s", city, exc)
+            self._count("failures")
+            return
+        self._count("completed")
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+
+_prefetcher: Optional[ResearchPrefetcher] = None
+_prefetcher_lock = threading.Lock()
+
+
+def get_prefetcher() -> ResearchPrefetcher:
+    global _prefetcher
+    with _prefetcher_lock:
+        if _prefetcher is None:
+            _prefetcher = ResearchPrefetcher.from_env()
+        return _prefetcher
@@ -0,0 +1,287 @@
+# src/travel_planner/price_store.py
+"""
+Append-only columnar history of every fare Amadeus has returned.
+
+Each route (``MEL-BLR``) is a directory holding one flat little-endian file per column, so
+appending a response is a handful of ``write`` calls and reads are ``np.memmap`` views:
+
+    day.i4      departure date as days since 1970-01-01
+    price.f4    total price in EUR
+    stops.i1    stops on the outbound itinerary
+    carrier.S2  validating (or first operating) airline
+    seen.u4     when the fare was observed, seconds since the epoch
+
+``meta.json`` records how many leading rows are sorted by day. Range queries binary-search that
+prefix and scan only the unsorted tail, which is folded back in once it grows past
+``compact_every`` rows.
+
+Compaction never rewrites the live columns: it writes a sorted copy of every column and its
+``meta.json`` into the next generation directory (``g1``, ``g2``, ...) and then switches the
+route over by atomically replacing its ``CURRENT`` file. A crash part-way leaves the old
+generation in use; without ``CURRENT`` the columns live in the route directory itself.
+"""
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from datetime import date as date_cls, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger("travel_planner.price_store")
+
+COLUMNS: Dict[str, np.dtype] = {
+    "day": np.dtype("<i4"),
+    "price": np.dtype("<f4"),
+    "stops": np.dtype("<i1"),
+    "carrier": np.dtype("S2"),
+    "seen": np.dtype("<u4"),
+}
+EPOCH = date_cls(1970, 1, 1)
+DEFAULT_STORE_PATH = ".cache/prices"
+
+_ROUTE = re.compile(r"[A-Z]{3}-[A-Z]{3}")
+_GENERATION = re.compile(r"g(\d+)")
+
+
+def to_day(value: str) -> int:
+    return (date_cls.fromisoformat(value) - EPOCH).days
+
+
+def from_day(day: int) -> str:
+    return (EPOCH + timedelta(days=int(day))).isoformat()
+
+
+def offer_row(offer: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Price, stops and carrier of one Amadeus offer, or None without a usable price"""
+    from travel_planner.tools.flight_search import offer_price, offer_stops
+
+    price = offer_price(offer)
+    if not np.isfinite(price):
+        return None
+    carriers = offer.get("validatingAirlineCodes") or []
+    if not carriers:
+        try:
+            carriers = [offer["itineraries"][0]["segments"][0]["carrierCode"]]
+        except (KeyError, IndexError, TypeError):
+            carriers = [""]
+    return {"price": price, "stops": min(offer_stops(offer), 127), "carrier": str(carriers[0] or "")[:2]}
+
+
+class PriceStore:
+    """Per-route columnar fare history; one writer process, any number of readers"""
+
+    def __init__(self, path: str = DEFAULT_STORE_PATH, compact_every: int = 4096, enabled: bool = True):
+        self.path = Path(path)
+        self.compact_every = compact_every
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.stats = {"appended": 0, "queries": 0, "compactions": 0}
+
+    @classmethod
+    def from_env(cls) -> "PriceStore":
+        return cls(
+            path=os.getenv("PRICE_STORE_PATH") or DEFAULT_STORE_PATH,
+            compact_every=int(os.getenv("PRICE_STORE_COMPACT_EVERY", 4096)),
+            enabled=os.getenv("PRICE_STORE_DISABLED", "").lower() not in ("1", "true", "yes"),
+        )
+
+    def append_offers(self, origin: str, destination: str, departure_date: str,
+                      offers: Iterable[Dict[str, Any]], seen: Optional[float] = None) -> int:
+        """Append one search response; returns the number of rows written"""
+        if not self.enabled:
+            return 0
+        rows = [row for row in map(offer_row, offers) if row is not None]
+        if not rows:
+            return 0
+        columns = {
+            "day": np.full(len(rows), to_day(departure_date), dtype=COLUMNS["day"]),
+            "price": np.array([r["price"] for r in rows], dtype=COLUMNS["price"]),
+            "stops": np.array([r["stops"] for r in rows], dtype=COLUMNS["stops"]),
+            "carrier": np.array([r["carrier"].encode("ascii", "replace") for r in rows], dtype=COLUMNS["carrier"]),
+            "seen": np.full(len(rows), int(seen if seen is not None else time.time()), dtype=COLUMNS["seen"]),
+        }
+        directory = self._route_dir(origin, destination)
+        with self._lock:
+            directory.mkdir(parents=True, exist_ok=True)
+            current = self._current(directory)
+            self._repair(current)
+            for name, values in columns.items():
+                with open(self._file(current, name), "ab") as fh:
+                    fh.write(values.tobytes())
+            self.stats["appended"] += len(rows)
+            meta = self._meta(current)
+            if self._rows(current) - meta["sorted_rows"] >= self.compact_every:
+                self._compact(directory)
+        return len(rows)
+
+    def fare_calendar(self, origin: str, destination: str, start: str, days: int = 60,
+                      max_stops: Optional[int] = None, max_age: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Cheapest observed fare for every departure day in ``[start, start + days)``; days
+        without data have a price of None. ``max_age`` (seconds) ignores older observations.
+        """
+        first = to_day(start)
+        calendar: List[Dict[str, Any]] = [
+            {"date": from_day(first + i), "price": None, "stops": None, "carrier": None, "observed_at": None}
+            for i in range(days)
+        ]
+        with self._lock:
+            self.stats["queries"] += 1
+            columns = self._select(self._route_dir(origin, destination), first, first + days)
+        if columns is None:
+            return calendar
+        keep = np.ones(len(columns["day"]), dtype=bool)
+        if max_stops is not None:
+            keep &= columns["stops"] <= max_stops
+        if max_age is not None:
+            keep &= columns["seen"] >= time.time() - max_age
+        columns = {name: values[keep] for name, values in columns.items()}
+        if not len(columns["day"]):
+            return calendar
+
+        # cheapest row of each day: sort by (day, price) and take the first row of every day
+        order = np.lexsort((columns["price"], columns["day"]))
+        day_sorted = columns["day"][order]
+        _, first_rows = np.unique(day_sorted, return_index=True)
+        for row in order[first_rows]:
+            entry = calendar[int(columns["day"][row]) - first]
+            entry["price"] = round(float(columns["price"][row]), 2)
+            entry["stops"] = int(columns["stops"][row])
+            entry["carrier"] = columns["carrier"][row].decode("ascii", "replace") or None
+            entry["observed_at"] = int(columns["seen"][row])
+        return calendar
+
+    def compact(self, origin: str, destination: str) -> int:
+        """Sort a route's rows by departure day; returns the row count"""
+        with self._lock:
+            return self._compact(self._route_dir(origin, destination))
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            routes = [d for d in self.path.iterdir() if d.is_dir()] if self.path.exists() else []
+            return {
+                **self.stats,
+                "routes": len(routes),
+                "rows": sum(self._rows(self._current(d)) for d in routes),
+                "bytes": sum(f.stat().st_size for d in routes for f in d.rglob("*") if f.is_file()),
+            }
+
+    def _route_dir(self, origin: str, destination: str) -> Path:
+        route = f"{origin.strip().upper()}-{destination.strip().upper()}"
+        if not _ROUTE.fullmatch(route):
+            raise ValueError(f"Invalid route {route}")
+        return self.path / route
+
+    def _generation(self, directory: Path) -> int:
+        try:
+            return int((directory / "CURRENT").read_text())
+        except (OSError, ValueError):
+            return 0
+
+    def _current(self, directory: Path) -> Path:
+        """Where the route's live columns are"""
+        generation = self._generation(directory)
+        return directory / f"g{generation}" if generation else directory
+
+    def _file(self, directory: Path, name: str) -> Path:
+        return directory / f"{name}.{COLUMNS[name].str[1:]}"
+
+    def _rows(self, directory: Path) -> int:
+        # a write cut short leaves columns of different lengths; only complete rows count
+        sizes = []
+        for name, dtype in COLUMNS.items():
+            path = self._file(directory, name)
+            sizes.append(path.stat().st_size // dtype.itemsize if path.exists() else 0)
+        return min(sizes)
+
+    def _repair(self, directory: Path) -> None:
+        # cut every column back to the last complete row so new rows stay aligned
+        rows = self._rows(directory)
+        for name, dtype in COLUMNS.items():
+            path = self._file(directory, name)
+            if path.exists() and path.stat().st_size > rows * dtype.itemsize:
+                logger.warning("Truncating %s to %d rows after an interrupted write", path, rows)
+                os.truncate(path, rows * dtype.itemsize)
+
+    def _meta(self, directory: Path) -> Dict[str, int]:
+        try:
+            return json.loads((directory / "meta.json").read_text())
+        except (OSError, ValueError):
+            return {"sorted_rows": 0}
+
+    def _map(self, directory: Path, rows: int) -> Dict[str, np.ndarray]:
+        return {name: np.memmap(self._file(directory, name), dtype=dtype, mode="r", shape=(rows,))
+                for name, dtype in COLUMNS.items()}
+
+    def _select(self, directory: Path, low: int, high: int) -> Optional[Dict[str, np.ndarray]]:
+        """Rows with ``low <= day < high``, copied out of the mapped columns"""
+        if not directory.exists():
+            return None
+        directory = self._current(directory)
+        rows = self._rows(directory)
+        if not rows:
+            return None
+        mapped = self._map(directory, rows)
+        sorted_rows = min(self._meta(directory)["sorted_rows"], rows)
+        head = mapped["day"][:sorted_rows]
+        start, stop = np.searchsorted(head, low, "left"), np.searchsorted(head, high, "left")
+        tail = np.flatnonzero((mapped["day"][sorted_rows:] >= low) & (mapped["day"][sorted_rows:] < high))
+        picked = np.concatenate([np.arange(start, stop), tail + sorted_rows])
+        return {name: np.asarray(values[picked]) for name, values in mapped.items()}
+
+    def _compact(self, directory: Path) -> int:
+        generation = self._generation(directory)
+        current = self._current(directory)
+        rows = self._rows(current)
+        if not rows:
+            return 0
+        mapped = self._map(current, rows)
+        order = np.argsort(mapped["day"], kind="stable")
+        target = directory / f"g{generation + 1}"
+        # left over from a compaction that crashed before switching over
+        shutil.rmtree(target, ignore_errors=True)
+        target.mkdir()
+        for name, values in mapped.items():
+            _write_synced(self._file(target, name), np.asarray(values[order]).tobytes())
+        _write_synced(target / "meta.json", json.dumps({"sorted_rows": rows}).encode())
+        _write_synced(directory / "CURRENT.tmp", str(generation + 1).encode())
+        os.replace(directory / "CURRENT.tmp", directory / "CURRENT")
+        self._drop_generations(directory, keep=generation)
+        self.stats["compactions"] += 1
+        return rows
+
+    def _drop_generations(self, directory: Path, keep: int) -> None:
+        # generations before the one just replaced; that one stays for readers still mapping it
+        for path in directory.iterdir():
+            match = _GENERATION.fullmatch(path.name)
+            if match and int(match.group(1)) < keep:
+                shutil.rmtree(path, ignore_errors=True)
+        if keep > 0:
+            for name in COLUMNS:
+                self._file(directory, name).unlink(missing_ok=True)
+            (directory / "meta.json").unlink(missing_ok=True)
+
+
+def _write_synced(path: Path, data: bytes) -> None:
+    with open(path, "wb") as fh:
+        fh.write(data)
+        fh.flush()
+        os.fsync(fh.fileno())
+
+
+_store: Optional[PriceStore] = None
+_store_lock = threading.Lock()
+
+
+def get_price_store() -> PriceStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = PriceStore.from_env()
+        return _store
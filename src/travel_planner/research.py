@@ -0,0 +1,157 @@
+# src/travel_planner/research.py
+import logging
+import os
+import re
+import threading
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional
+
+from travel_planner.airports import get_airport_index
+from travel_planner.cache import TwoTierCache, make_key
+from travel_planner.cassette import get_cassette
+from travel_planner.http_client import get_http_client
+from travel_planner.interests import canonical_interests
+from travel_planner.passages import DEFAULT_QUERY, PassageIndex, format_passages, get_passage_store
+from travel_planner.scrape_cache import get_page_cache
+
+logger = logging.getLogger("travel_planner.research")
+
+SERPER_URL = "https://google.serper.dev/search"
+
+_SPACES = re.compile(r"\s+")
+
+# cities whose search results and pages are being indexed, so concurrent plans stopping there share the work
+_cities_in_flight: Dict[str, Future] = {}
+_cities_lock = threading.Lock()
+
+
+def research_query(city: str, interests: Optional[List[str]] = None) -> str:
+    """The web search for a stopover city: without interests it is the one every traveller's notes are indexed from"""
+    terms = " ".join(canonical_interests(interests)).replace("&", "and")
+    # search engines know "Singapore" far better than "SIN"
+    city = get_airport_index().city_name(city)
+    return _SPACES.sub(" ", f"{city} stopover 1-2 day itinerary {terms}").strip()
+
+
+def search_key(query: str) -> str:
+    return make_key("serper", _SPACES.sub(" ", query.lower()).strip())
+
+
+def serper_search(query: str, api_key: str, num: int = 5) -> List[Dict[str, Any]]:
+    """Organic Serper results for ``query``; raises requests exceptions on failure"""
+    return get_cassette().exchange("serper", {"q": query, "num": num},
+                                   lambda: _serper_search(query, api_key, num))
+
+
+def _serper_search(query: str, api_key: str, num: int) -> List[Dict[str, Any]]:
+    response = get_http_client().post(
+        SERPER_URL,
+        headers={"X-API-KEY": api_key, "Content-Type": "application/json"},
+        json={"q": query, "num": num},
+        timeout=10,
+    )
+    response.raise_for_status()
+    return [
+        {"title": r.get("title", "No title"), "link": r.get("link", "No link"), "snippet": r.get("snippet", "No description")}
+        for r in response.json().get("organic", [])[:num]
+    ]
+
+
+def format_search_results(query: str, results: List[Dict[str, Any]]) -> str:
+    if not results:
+        return f"No search results found for: {query}"
+    formatted = [
+        f"{i}. **{r['title']}**\n   URL: {r['link']}\n   {r['snippet']}\n"
+        for i, r in enumerate(results, 1)
+    ]
+    return f"Search results for: {query}\n\n" + "\n".join(formatted)
+
+
+def cached_search(query: str, api_key: str, num: int = 5) -> List[Dict[str, Any]]:
+    """Serper results for ``query`` from the research cache, searching (and caching) on a miss"""
+    cache = get_research_cache()
+    key = search_key(query)
+    results = cache.get(key)
+    if results is None:
+        results = serper_search(query, api_key, num=num)
+        cache.set(key, results)
+    return results
+
+
+def interest_query(interests: Optional[List[str]]) -> str:
+    return " ".join(canonical_interests(interests)) or DEFAULT_QUERY
+
+
+def city_research_notes(city: str, interests: Optional[List[str]], api_key: Optional[str] = None,
+                        token_budget: Optional[int] = None) -> str:
+    """
+    The passages most relevant to ``interests`` from the search results and pages read for ``city``,
+    within ``token_budget`` tokens. The search and the pages are shared by every traveller stopping
+    in the city (see ``index_city``); only the ranking is per traveller.
+    """
+    api_key = api_key or os.getenv("SERPER_API_KEY")
+    if not api_key:
+        return "No research notes available."
+    token_budget = token_budget or int(os.getenv("PASSAGE_TOKEN_BUDGET", 600))
+    index = index_city(city, api_key)
+    return format_passages(index.search(interest_query(interests), k=8, token_budget=token_budget))
+
+
+def index_city(city: str, api_key: str) -> PassageIndex:
+    """
+    The city's passage index after one interest-independent search and its top pages have been
+    added. Pages are indexed once per city and kept across requests; concurrent callers for the
+    same city (e.g. trips of one batch with different interests) wait for a single pass.
+    """
+    key = city.strip().upper()
+    with _cities_lock:
+        pending = _cities_in_flight.get(key)
+        leader = pending is None
+        if leader:
+            pending = _cities_in_flight[key] = Future()
+    if not leader:
+        return pending.result()
+    try:
+        index = _index_city(key, api_key)
+    except BaseException as exc:
+        pending.set_exception(exc)
+        raise
+    else:
+        pending.set_result(index)
+    finally:
+        with _cities_lock:
+            _cities_in_flight.pop(key, None)
+    return index
+
+
+def _index_city(city: str, api_key: str) -> PassageIndex:
+    index = get_passage_store().index(city)
+    try:
+        results = cached_search(research_query(city), api_key)
+    except Exception as exc:
+        logger.warning("Research search for %s failed: %s", city, exc)
+        results = []
+
+    for result in results:
+        index.add(f"search:{result['link']}", f"{result['title']}. {result['snippet']}")
+    urls = [r["link"] for r in results[:int(os.getenv("PASSAGE_PAGES", 3))]
+            if r["link"].startswith("http") and not index.has_source(r["link"])]
+    for page in get_page_cache().get_many(urls, deadline=float(os.getenv("SCRAPE_BATCH_DEADLINE", 15))):
+        if page["status"] == "ok":
+            index.add(page["url"], page["text"])
+    return index
+
+
+_research_cache: Optional[TwoTierCache] = None
+_research_cache_lock = threading.Lock()
+
+
+def get_research_cache() -> TwoTierCache:
+    """Search results shared by the serper_api tool and the prefetcher"""
+    global _research_cache
+    with _research_cache_lock:
+        if _research_cache is None:
+            _research_cache = TwoTierCache.from_env(
+                "research", prefix="RESEARCH_CACHE", ttl=24 * 3600, max_bytes=64 * 1024 * 1024
+            )
+        return _research_cache
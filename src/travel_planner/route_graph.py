@@ -0,0 +1,284 @@
+# src/travel_planner/route_graph.py
+"""
+Self-transfer stopover routes assembled from single-leg offers.
+
+Every offer ``FlightSearch`` sees (fresh or from its cache) is recorded as one edge in an
+in-memory adjacency index. A multi-day route such as MEL -> SIN, three days in Singapore,
+SIN -> BLR is then a path in that graph, so ranking every outbound x onward combination
+costs no extra Amadeus queries: only origin -> hub and hub -> destination are ever searched.
+"""
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from datetime import date as date_cls, datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from travel_planner.tools.scoring import InterestMatcher, parse_duration, parse_price
+
+logger = logging.getLogger("travel_planner.route_graph")
+
+# Cost of one hour in the air, in euros
+HOUR_WEIGHT = 5.0
+# Shortest connection accepted between two legs on the same day
+MIN_CONNECTION = timedelta(hours=2)
+
+
+class Leg:
+    """One bookable offer seen as an edge between its first departure and last arrival"""
+
+    __slots__ = ("origin", "destination", "departure", "arrival", "price", "minutes", "carrier", "offer")
+
+    def __init__(self, origin: str, destination: str, departure: datetime, arrival: datetime,
+                 price: float, minutes: float, carrier: Optional[str], offer: Dict[str, Any]):
+        self.origin = origin
+        self.destination = destination
+        self.departure = departure
+        self.arrival = arrival
+        self.price = price
+        self.minutes = minutes
+        self.carrier = carrier
+        self.offer = offer
+
+    @classmethod
+    def from_offer(cls, offer: Dict[str, Any]) -> Optional["Leg"]:
+        """The outbound itinerary of ``offer`` as a leg, or None when it lacks times or a price"""
+        try:
+            itinerary = offer["itineraries"][0]
+            segments = itinerary["segments"]
+            first, last = segments[0], segments[-1]
+            departure = datetime.fromisoformat(first["departure"]["at"])
+            arrival = datetime.fromisoformat(last["arrival"]["at"])
+            origin = first["departure"]["iataCode"].upper()
+            destination = last["arrival"]["iataCode"].upper()
+        except (KeyError, IndexError, TypeError, ValueError, AttributeError):
+            return None
+        price = parse_price(offer)
+        if price is None or origin == destination:
+            return None
+        minutes = parse_duration(itinerary.get("duration"))
+        if minutes != minutes:  # NaN: fall back to the local clock times
+            minutes = max(0.0, (arrival - departure).total_seconds() / 60)
+        return cls(origin, destination, departure, arrival, price, minutes, first.get("carrierCode"), offer)
+
+    @property
+    def key(self) -> Tuple:
+        return (self.origin, self.destination, self.departure, self.carrier, self.offer.get("id"))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.offer.get("id"),
+            "origin": self.origin,
+            "destination": self.destination,
+            "departure": self.departure.isoformat(),
+            "arrival": self.arrival.isoformat(),
+            "price": self.price,
+            "carrier": self.carrier,
+        }
+
+
+class LegIndex:
+    """
+    Adjacency index of recently seen legs: origin -> departure date -> legs.
+
+    Legs are forgotten after ``max_age`` seconds, matching the flight cache, so routes are
+    never built from fares the cache itself would no longer serve.
+    """
+
+    def __init__(self, max_age: float = 900, max_legs: int = 50_000):
+        self.max_age = max_age
+        self.max_legs = max_legs
+        self._lock = threading.Lock()
+        self._adjacency: Dict[str, Dict[date_cls, Dict[Tuple, Tuple[float, Leg]]]] = {}
+        self._count = 0
+
+    @classmethod
+    def from_env(cls) -> "LegIndex":
+        return cls(
+            max_age=float(os.getenv("ROUTE_GRAPH_MAX_AGE", os.getenv("FLIGHT_CACHE_TTL", 900))),
+            max_legs=int(os.getenv("ROUTE_GRAPH_MAX_LEGS", 50_000)),
+        )
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add_offers(self, offers: Iterable[Dict[str, Any]]) -> int:
+        """Record every usable offer as a leg; returns how many were added or refreshed"""
+        now = time.time()
+        added = 0
+        with self._lock:
+            for offer in offers:
+                leg = Leg.from_offer(offer) if isinstance(offer, dict) else None
+                if leg is None:
+                    continue
+                day = self._adjacency.setdefault(leg.origin, {}).setdefault(leg.departure.date(), {})
+                if leg.key not in day:
+                    self._count += 1
+                day[leg.key] = (now, leg)
+                added += 1
+            if self._count > self.max_legs:
+                self._prune(now, force=True)
+        return added
+
+    def legs_from(self, origin: str, day: date_cls) -> List[Leg]:
+        """Fresh legs leaving ``origin`` on ``day`` (local date)"""
+        cutoff = time.time() - self.max_age
+        with self._lock:
+            entries = self._adjacency.get(origin, {}).get(day, {})
+            return [leg for seen, leg in entries.values() if seen >= cutoff]
+
+    def metrics(self) -> Dict[str, int]:
+        with self._lock:
+            return {"legs": self._count, "airports": len(self._adjacency)}
+
+    def _prune(self, now: float, force: bool = False) -> None:
+        # drop expired legs; when that is not enough, drop the oldest departure days
+        cutoff = now - self.max_age
+        for days in self._adjacency.values():
+            for entries in days.values():
+                for key in [k for k, (seen, _) in entries.items() if seen < cutoff]:
+                    del entries[key]
+                    self._count -= 1
+        if force and self._count > self.max_legs:
+            all_days = sorted((day, origin) for origin, days in self._adjacency.items() for day in days)
+            for day, origin in all_days:
+                if self._count <= self.max_legs:
+                    break
+                self._count -= len(self._adjacency[origin].pop(day))
+
+
+def k_shortest_routes(index: LegIndex, origins: Sequence[str], destinations: Sequence[str],
+                      dates: Sequence[str], k: int = 3, min_stay: int = 1, max_stay: int = 3,
+                      max_legs: int = 2, hour_weight: float = HOUR_WEIGHT,
+                      bonus: Optional[Callable[[str], float]] = None,
+                      accepts: Optional[Callable[[Dict[str, Any]], bool]] = None,
+                      max_price: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    The ``k`` cheapest routes from any origin (departing on one of ``dates``) to any destination
+    with at least one stopover of ``min_stay``..``max_stay`` days, using only legs whose offer
+    passes ``accepts`` (e.g. ``FlightFilters.accepts``) when it is given. Paths whose fares add
+    up to more than ``max_price`` are dropped as soon as they exceed it, so they never take
+    one of the k places.
+
+    Best-first search over partial paths: a leg costs its price plus ``hour_weight`` per hour in
+    the air, minus ``bonus(hub)`` (floored at zero) when it ends at a stopover. Each airport and
+    arrival day is expanded at most ``k`` times, which bounds the work to O(k x legs) while still
+    yielding the k best routes in cost order.
+    """
+    bonus = bonus or (lambda city: 0.0)
+    accepts = accepts or (lambda offer: True)
+    budget = float("inf") if max_price is None else max_price
+    targets = set(destinations)
+    counter = itertools.count()
+    heap: List[Tuple[float, int, Tuple[Leg, ...]]] = []
+    for origin in dict.fromkeys(origins):
+        for day in dates:
+            for leg in index.legs_from(origin, date_cls.fromisoformat(day)):
+                # a direct offer is not a stopover route
+                if leg.destination in targets or leg.destination in origins or leg.price > budget:
+                    continue
+                if not accepts(leg.offer):
+                    continue
+                cost = leg.price + hour_weight * leg.minutes / 60 - bonus(leg.destination)
+                heapq.heappush(heap, (max(cost, 0.0), next(counter), (leg,)))
+
+    expanded: Dict[Tuple[str, date_cls], int] = {}
+    routes: List[Dict[str, Any]] = []
+    while heap and len(routes) < k:
+        cost, _, path = heapq.heappop(heap)
+        last = path[-1]
+        if last.destination in targets:
+            routes.append(_route(path, cost))
+            continue
+        state = (last.destination, last.arrival.date())
+        if expanded.get(state, 0) >= k or len(path) >= max_legs:
+            continue
+        expanded[state] = expanded.get(state, 0) + 1
+        visited = {path[0].origin, *(leg.destination for leg in path)}
+        spent = sum(leg.price for leg in path)
+        for stay in range(min_stay, max_stay + 1):
+            for leg in index.legs_from(last.destination, last.arrival.date() + timedelta(days=stay)):
+                if leg.destination in visited or leg.departure < last.arrival + MIN_CONNECTION:
+                    continue
+                if spent + leg.price > budget or not accepts(leg.offer):
+                    continue
+                step = leg.price + hour_weight * leg.minutes / 60
+                if leg.destination not in targets:
+                    step -= bonus(leg.destination)
+                heapq.heappush(heap, (cost + max(step, 0.0), next(counter), path + (leg,)))
+    return routes
+
+
+def _route(path: Tuple[Leg, ...], cost: float) -> Dict[str, Any]:
+    hubs = [leg.destination for leg in path[:-1]]
+    stays = [(nxt.departure.date() - leg.arrival.date()).days for leg, nxt in zip(path, path[1:])]
+    return {
+        "hubs": hubs,
+        "stay_days": stays,
+        "price": round(sum(leg.price for leg in path), 2),
+        "minutes_in_air": round(sum(leg.minutes for leg in path)),
+        "cost": round(cost, 2),
+        "legs": [leg.to_dict() for leg in path],
+    }
+
+
+def stopover_routes(flight_tool, inputs: Dict[str, Any], hubs: List[str], dates: List[str],
+                    filters=None, index: Optional["LegIndex"] = None, k: int = 3) -> List[Dict[str, Any]]:
+    """
+    Self-transfer routes with ``inputs["stopover_days"]`` days in one of ``hubs``.
+
+    Only the single legs are searched (origin -> hub on ``dates``, hub -> destination on the
+    matching later dates), through the flight cache; the combinations come from the graph.
+    The graph also holds legs other searches saw unfiltered, so every leg is checked against
+    ``filters`` again and the whole route against its max_price.
+    Results are shaped like StopoverEvaluator routes so the itinerary stage can use them as-is,
+    but their ``score`` is the graph cost (lower is better), so they are ranked apart from them.
+    """
+    days = int(inputs.get("stopover_days") or 0)
+    if days <= 0 or not hubs or not dates:
+        return []
+    index = index if index is not None else get_leg_index()
+    origins = [inputs["origin"], *inputs.get("alternate_origins", [])]
+    destinations = [inputs["destination"], *inputs.get("alternate_destinations", [])]
+    hubs = [h for h in hubs if h not in origins and h not in destinations]
+    onward = sorted({(date_cls.fromisoformat(d) + timedelta(days=days + delta)).isoformat()
+                     for d in dates for delta in (0, 1)})  # overnight arrivals depart a calendar day later
+    flight_tool.search_many(origins, hubs, dates, filters=filters)
+    flight_tool.search_many(hubs, destinations, onward, filters=filters)
+
+    bonuses = dict(zip(hubs, InterestMatcher(inputs.get("interests", [])).city_bonuses(hubs).tolist()))
+    found = k_shortest_routes(index, origins, destinations, dates, k=k, min_stay=days,
+                              max_stay=days + 1, bonus=lambda city: bonuses.get(city, 0.0),
+                              accepts=filters.accepts if filters is not None else None,
+                              max_price=getattr(filters, "max_price", None))
+    logger.info("Route graph found %d self-transfer routes via %s", len(found), ", ".join(hubs))
+    routes = []
+    for n, route in enumerate(found, 1):
+        hub = route["hubs"][0]
+        stops = [f"{h} ({d} days)" for h, d in zip(route["hubs"], route["stay_days"])]
+        path = " → ".join([route["legs"][0]["origin"], *stops, route["legs"][-1]["destination"]])
+        routes.append({
+            "id": f"ST{n}",
+            "price": route["price"],
+            "stopover_city": hub,
+            "stopover_days": route["stay_days"][0],
+            "self_transfer": True,
+            "score": route["cost"],
+            "legs": route["legs"],
+            "summary": f"Self-transfer {path}: €{route['price']}",
+        })
+    return routes
+
+
+_index: Optional[LegIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_leg_index() -> LegIndex:
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = LegIndex.from_env()
+        return _index
@@ -0,0 +1,277 @@
+# src/travel_planner/scrape_cache.py
+import codecs
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from html.parser import HTMLParser
+from itertools import chain
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from urllib.parse import urlsplit
+
+from travel_planner.cache import TwoTierCache, make_key
+from travel_planner.cassette import get_cassette
+from travel_planner.http_client import get_http_client
+
+logger = logging.getLogger("travel_planner.scrape_cache")
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+
+class ScrapeFailed(RuntimeError):
+    """Raised without a network call while a URL is in the negative cache"""
+
+
+# Elements whose text is never main content; their whole subtree is skipped
+SKIP_TAGS = frozenset({
+    "script", "style", "noscript", "template", "svg", "iframe", "nav", "footer", "aside", "form", "button", "select",
+})
+_SPACES = re.compile(r"\s+")
+_CHARSET = re.compile(r"charset=[\"']?([\w-]+)", re.IGNORECASE)
+# <meta charset="..."> or <meta http-equiv="Content-Type" content="...; charset=...">
+_META_CHARSET = re.compile(rb"<meta[^>]*?charset\s*=\s*[\"']?\s*([\w-]+)", re.IGNORECASE)
+# browsers only look for the meta declaration this far into the document
+SNIFF_BYTES = 1024
+
+
+class TextExtractor(HTMLParser):
+    """Incremental visible-text extractor that reports when ``max_chars`` have been collected"""
+
+    def __init__(self, max_chars: int = 2000):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self._parts: List[str] = []
+        self._length = 0
+        self._skip_depth = 0
+
+    @property
+    def done(self) -> bool:
+        return self._length > self.max_chars
+
+    def handle_starttag(self, tag: str, attrs: Any) -> None:
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_data(self, data: str) -> None:
+        if self._skip_depth or self.done:
+            return
+        chunk = _SPACES.sub(" ", data).strip()
+        if chunk:
+            self._parts.append(chunk)
+            self._length += len(chunk) + 1
+
+    def text(self) -> str:
+        text = " ".join(self._parts)
+        if len(text) > self.max_chars:
+            text = text[:self.max_chars] + "..."
+        return text
+
+
+def extract_text(chunks: Iterable[bytes], encoding: Optional[str] = None, max_chars: int = 2000) -> str:
+    """
+    Visible text of an HTML byte stream, parsed incrementally and abandoned once ``max_chars``
+    are collected. Without an ``encoding`` the first chunk is sniffed for a <meta> charset
+    """
+    chunks = iter(chunks)
+    first = next(chunks, b"")
+    encoding = encoding or sniffed_charset(first)
+    try:
+        decoder = codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+    except LookupError:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    parser = TextExtractor(max_chars)
+    for chunk in chain([first], chunks):
+        parser.feed(decoder.decode(chunk))
+        if parser.done:
+            break
+    else:
+        parser.feed(decoder.decode(b"", final=True))
+        parser.close()
+    return parser.text()
+
+
+def declared_charset(content_type: Optional[str]) -> Optional[str]:
+    """Charset from a Content-Type header; None when the server does not say"""
+    match = _CHARSET.search(content_type or "")
+    return match.group(1) if match else None
+
+
+def sniffed_charset(head: bytes) -> Optional[str]:
+    """Charset a page declares in a <meta> tag near its start; None (so UTF-8 is assumed) without one"""
+    match = _META_CHARSET.search(head[:SNIFF_BYTES])
+    return match.group(1).decode("ascii") if match else None
+
+
+def capped_chunks(response: Any, max_bytes: int, chunk_size: int = 16 * 1024) -> Iterator[bytes]:
+    """Body chunks of a streamed response, stopping after ``max_bytes``"""
+    remaining = max_bytes
+    for chunk in response.iter_content(chunk_size):
+        if remaining <= 0:
+            return
+        yield chunk[:remaining]
+        remaining -= len(chunk)
+
+
+class PageCache:
+    """
+    Extracted page text keyed by URL, kept on disk with the response's ETag/Last-Modified.
+
+    Entries younger than ``max_age`` are served without a request. Older ones are
+    revalidated with a conditional GET; a 304 refreshes the entry without parsing.
+    URLs that fail are skipped for ``failure_ttl`` seconds, doubling per consecutive
+    failure up to ``max_failure_ttl``, so a dead host does not cost a timeout every plan.
+    Bodies are streamed and parsed incrementally: at most ``max_bytes`` are downloaded and
+    the download stops as soon as ``max_chars`` of text have been collected.
+    """
+
+    def __init__(self, store: TwoTierCache, max_age: float = 6 * 3600, failure_ttl: float = 300,
+                 max_failure_ttl: float = 24 * 3600, max_bytes: int = 512 * 1024, max_chars: int = 8000):
+        self.store = store
+        self.max_bytes = max_bytes
+        self.max_chars = max_chars
+        self.max_age = max_age
+        self.failure_ttl = failure_ttl
+        self.max_failure_ttl = max_failure_ttl
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {
+            "fresh_hits": 0, "revalidated": 0, "fetched": 0, "failures": 0, "negative_hits": 0,
+        }
+
+    @classmethod
+    def from_env(cls) -> "PageCache":
+        return cls(
+            TwoTierCache.from_env("pages", prefix="SCRAPE_CACHE", ttl=7 * 24 * 3600, max_bytes=128 * 1024 * 1024),
+            max_age=float(os.getenv("SCRAPE_MAX_AGE", 6 * 3600)),
+            failure_ttl=float(os.getenv("SCRAPE_FAILURE_TTL", 300)),
+            max_bytes=int(os.getenv("SCRAPE_MAX_BYTES", 512 * 1024)),
+            max_chars=int(os.getenv("SCRAPE_MAX_CHARS", 8000)),
+        )
+
+    def get_text(self, url: str) -> str:
+        """Extracted text for ``url``; raises requests exceptions or ScrapeFailed on failure"""
+        url = url.strip()
+        key, failure_key = make_key("page", url), make_key("page-failure", url)
+        streak_key = make_key("page-failure-streak", url)
+        failure = self.store.get(failure_key)
+        if failure is not None:
+            self._count("negative_hits")
+            raise ScrapeFailed(f"{url} failed {failure['count']} time(s) recently: {failure['error']}")
+
+        entry = self.store.get(key)
+        if entry is not None and time.time() - entry["fetched_at"] < self.max_age:
+            self._count("fresh_hits")
+            return entry["text"]
+
+        headers = {"User-Agent": USER_AGENT}
+        if entry is not None:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        try:
+            # revalidations are recorded apart from first fetches: only they can answer 304
+            page = get_cassette().exchange(
+                "scrape", {"url": url, "conditional": entry is not None},
+                lambda: get_http_client().fetch("GET", url, self._read_page, headers=headers, timeout=10),
+            )
+        except Exception as exc:
+            self._record_failure(failure_key, streak_key, exc)
+            raise
+        if entry is not None and page["status"] == 304:
+            self._count("revalidated")
+            self.store.set(key, {**entry, "fetched_at": time.time()})
+            return entry["text"]
+
+        self._count("fetched")
+        # the page may be shared with concurrent callers of the same URL, so it is not mutated
+        self.store.set(key, {**{k: v for k, v in page.items() if k != "status"}, "fetched_at": time.time()})
+        # a success clears the failure streak
+        self.store.delete(streak_key)
+        return page["text"]
+
+    def get_many(self, urls: List[str], per_host: int = 2, deadline: float = 15) -> List[Dict[str, Any]]:
+        """
+        Fetch ``urls`` concurrently, at most ``per_host`` at a time per host, and return within
+        ``deadline`` seconds. Each result has the url and a status of ok, error or timeout;
+        pages still downloading or queued at the deadline are reported as timeouts and finish
+        in the background, so they land in the cache for the next caller.
+        """
+        urls = list(dict.fromkeys(u.strip() for u in urls if u and u.strip()))
+        if not urls:
+            return []
+        host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        for url in urls:
+            host_slots.setdefault(urlsplit(url).netloc, threading.BoundedSemaphore(max(1, per_host)))
+
+        def fetch(url: str) -> str:
+            with host_slots[urlsplit(url).netloc]:
+                return self.get_text(url)
+
+        executor = ThreadPoolExecutor(max_workers=min(len(urls), 8), thread_name_prefix="scrape")
+        futures = {url: executor.submit(fetch, url) for url in urls}
+        wait(futures.values(), timeout=deadline)
+        # queued URLs are not cancelled: the workers exit once they have warmed the cache
+        executor.shutdown(wait=False)
+
+        results = []
+        for url, future in futures.items():
+            if not future.done():
+                results.append({"url": url, "status": "timeout", "error": f"not finished within {deadline:.0f}s"})
+            elif future.exception() is not None:
+                results.append({"url": url, "status": "error", "error": str(future.exception())})
+            else:
+                results.append({"url": url, "status": "ok", "text": future.result()})
+        return results
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            data: Dict[str, Any] = dict(self.stats)
+        data["store"] = self.store.metrics()
+        return data
+
+    def _read_page(self, response: Any) -> Dict[str, Any]:
+        if response.status_code == 304:
+            return {"status": 304}
+        response.raise_for_status()
+        return {
+            "status": response.status_code,
+            "text": extract_text(
+                capped_chunks(response, self.max_bytes),
+                declared_charset(response.headers.get("Content-Type")),
+                self.max_chars,
+            ),
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }
+
+    def _record_failure(self, failure_key: str, streak_key: str, exc: Exception) -> None:
+        # the streak outlives the negative entry so repeated failures back off further
+        count = (self.store.get(streak_key) or 0) + 1
+        ttl = min(self.failure_ttl * 2 ** (count - 1), self.max_failure_ttl)
+        self.store.set(streak_key, count, ttl=self.max_failure_ttl)
+        self.store.set(failure_key, {"count": count, "error": str(exc)[:200]}, ttl=ttl)
+        self._count("failures")
+        logger.info("Scrape failed (%d in a row), skipping for %.0fs: %s", count, ttl, exc)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+
+_page_cache: Optional[PageCache] = None
+_page_cache_lock = threading.Lock()
+
+
+def get_page_cache() -> PageCache:
+    global _page_cache
+    with _page_cache_lock:
+        if _page_cache is None:
+            _page_cache = PageCache.from_env()
+        return _page_cache
@@ -1,32 +1,343 @@
 # src/travel_planner/tools/flight_search.py
+import logging
 import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date as date_cls, timedelta
+from itertools import product
 from amadeus import Client, ResponseError
 from crewai.tools import BaseTool
-from typing import List, Dict, Any
-from pydantic import PrivateAttr
+from typing import List, Dict, Any, Optional, Sequence, Tuple, Type, TypeVar, Union
+from pydantic import BaseModel, Field, PrivateAttr
+
+from travel_planner.cache import TwoTierCache, make_key
+from travel_planner.cassette import get_cassette
+from travel_planner.concurrency import host_limiter
+from travel_planner.events import traced_tool
+from travel_planner.offers import DEFAULT_TOKEN_BUDGET, compact_offers
+from travel_planner.price_store import get_price_store
+from travel_planner.route_graph import get_leg_index
+from travel_planner.tools.scoring import parse_price
+
+logger = logging.getLogger("travel_planner.flight_search")
+
+_MISSING = object()
+
+# Upper bound on queries a single fan-out may issue (e.g. ±7 days x 2 x 2 airports)
+MAX_FANOUT_QUERIES = 60
+
+T = TypeVar("T")
+
+
+# Airline names offered in the UI, mapped to the IATA codes Amadeus filters on
+AIRLINE_CODES = {
+    "cathay pacific": "CX",
+    "singapore airlines": "SQ",
+    "emirates": "EK",
+    "qatar airways": "QR",
+    "lufthansa": "LH",
+    "qantas": "QF",
+    "malaysia airlines": "MH",
+    "thai airways": "TG",
+    "etihad airways": "EY",
+    "air india": "AI",
+    "british airways": "BA",
+    "virgin australia": "VA",
+}
+
+
+def airline_codes(airlines: Optional[List[str]]) -> List[str]:
+    """Translate airline names or codes to IATA codes; 'Any' and unknown names are dropped"""
+    codes = []
+    for airline in airlines or []:
+        name = airline.strip()
+        code = AIRLINE_CODES.get(name.lower())
+        if code is None and len(name) == 2 and name.isalnum():
+            code = name.upper()
+        if code and code not in codes:
+            codes.append(code)
+    return codes
+
+
+def offer_stops(offer: Dict[str, Any]) -> int:
+    """Most stops on any itinerary of the offer, counting technical stops"""
+    stops = 0
+    for itinerary in offer.get("itineraries", []):
+        segments = itinerary.get("segments", [])
+        technical = sum(int(s.get("numberOfStops", 0) or 0) for s in segments)
+        stops = max(stops, len(segments) - 1 + technical)
+    return stops
+
+
+class FlightFilters(BaseModel):
+    """Trip constraints pushed down into the Amadeus query and re-checked locally"""
+    max_price: Optional[float] = Field(None, ge=0)
+    airlines: List[str] = Field(default_factory=list)
+    non_stop: bool = False
+    max_stops: Optional[int] = Field(None, ge=0)
+
+    @classmethod
+    def build(cls, max_price: Optional[float] = None, preferred_airlines: Optional[List[str]] = None,
+              non_stop: bool = False, max_stops: Optional[int] = None) -> "FlightFilters":
+        return cls(
+            max_price=max_price or None,
+            airlines=airline_codes(preferred_airlines),
+            non_stop=bool(non_stop) or max_stops == 0,
+            max_stops=max_stops,
+        )
+
+    def to_params(self) -> Dict[str, Any]:
+        """Amadeus flight-offers query parameters for these constraints"""
+        params: Dict[str, Any] = {}
+        if self.max_price is not None:
+            # maxPrice must be a whole number; round up so borderline offers are not lost
+            params["maxPrice"] = int(-(-self.max_price // 1))
+        if self.airlines:
+            params["includedAirlineCodes"] = ",".join(sorted(self.airlines))
+        if self.non_stop:
+            params["nonStop"] = "true"
+        return params
+
+    def accepts(self, offer: Dict[str, Any]) -> bool:
+        if self.max_price is not None and offer_price(offer) > self.max_price:
+            return False
+        max_stops = 0 if self.non_stop else self.max_stops
+        if max_stops is not None and offer_stops(offer) > max_stops:
+            return False
+        if self.airlines:
+            allowed = set(self.airlines)
+            carriers = {
+                segment.get("carrierCode")
+                for itinerary in offer.get("itineraries", [])
+                for segment in itinerary.get("segments", [])
+            }
+            if not carriers or not carriers <= allowed:
+                return False
+        return True
+
+
+def _bypass_from_env() -> bool:
+    return os.getenv("FLIGHT_CACHE_BYPASS", "").lower() in ("1", "true", "yes")
+
+
+def _airport_list(codes: Union[str, List[str]]) -> List[str]:
+    """Accept a single code, a comma-separated string or a list; return unique upper-case codes"""
+    if isinstance(codes, str):
+        codes = codes.split(",")
+    seen = []
+    for code in codes:
+        code = code.strip().upper()
+        if code and code not in seen:
+            seen.append(code)
+    return seen
+
+
+def date_window(date: str, flex_days: int = 0) -> List[str]:
+    """Dates within ±flex_days of ``date``, skipping days already in the past"""
+    center = date_cls.fromisoformat(date.strip())
+    today = date_cls.today()
+    days = [center]
+    for offset in range(1, max(0, flex_days) + 1):
+        days.extend([center - timedelta(days=offset), center + timedelta(days=offset)])
+    return [d.isoformat() for d in days if d == center or d >= today]
+
+
+def fanout_queries(origins: Sequence[str], destinations: Sequence[str],
+                   dates: Sequence[str]) -> List[Tuple[str, str, str]]:
+    """Every origin x destination x date query of a fan-out, skipping same-airport pairs"""
+    return [(o, d, day) for o, d, day in product(origins, destinations, dates) if o != d]
+
+
+def cap_fanout(queries: List[T]) -> List[T]:
+    """The first MAX_FANOUT_QUERIES ``queries``, warning about any left out"""
+    if len(queries) > MAX_FANOUT_QUERIES:
+        logger.warning("Fan-out of %d flight queries capped at %d; %d not searched",
+                       len(queries), MAX_FANOUT_QUERIES, len(queries) - MAX_FANOUT_QUERIES)
+    return queries[:MAX_FANOUT_QUERIES]
+
+
+def offer_signature(offer: Dict[str, Any]) -> tuple:
+    """Identify the same physical journey returned by different queries"""
+    signature = []
+    for itinerary in offer.get("itineraries", []):
+        for segment in itinerary.get("segments", []):
+            signature.append((
+                segment.get("carrierCode"),
+                segment.get("number"),
+                segment.get("departure", {}).get("iataCode"),
+                segment.get("departure", {}).get("at"),
+            ))
+    return tuple(signature) or (offer.get("id"),)
+
+
+def offer_price(offer: Dict[str, Any]) -> float:
+    """The price ranking uses (scoring.parse_price), or infinity when the offer has none"""
+    price = parse_price(offer)
+    return float("inf") if price is None or price != price else price
+
+
+def merge_offers(results: List[List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Merge offer lists, keep the cheapest copy of each journey and sort by price"""
+    best: Dict[tuple, Dict[str, Any]] = {}
+    for offers in results:
+        for offer in offers:
+            key = offer_signature(offer)
+            current = best.get(key)
+            if current is None or offer_price(offer) < offer_price(current):
+                best[key] = offer
+    return sorted(best.values(), key=offer_price)
+
+
+class FlightSearchInput(BaseModel):
+    """Arguments the agent may pass to flight_search; everything after date is optional"""
+    origin: str = Field(..., description="Origin IATA code, or comma-separated alternatives")
+    destination: str = Field(..., description="Destination IATA code, or comma-separated alternatives")
+    date: str = Field(..., description="Departure date in YYYY-MM-DD format")
+    flex_days: int = Field(0, ge=0, le=7, description="Also search this many days either side of date")
+    max_price: Optional[float] = Field(None, ge=0, description="Maximum total price in EUR")
+    preferred_airlines: Optional[List[str]] = Field(None, description="Airline names or IATA codes")
+    non_stop: bool = Field(False, description="Only non-stop flights")
+    max_stops: Optional[int] = Field(None, ge=0, description="Maximum number of stops")
+
 
 class FlightSearch(BaseTool):
     name: str = "flight_search"
-    description: str = "Search for flights using Amadeus API"
+    description: str = (
+        "Search for flights using Amadeus API. origin and destination accept one IATA code "
+        "or a comma-separated list of alternatives (e.g. 'LHR,LGW'); flex_days searches "
+        "that many days either side of date. max_price (EUR), preferred_airlines, non_stop and "
+        "max_stops are applied by Amadeus before offers are returned. Returns one merged, "
+        "de-duplicated table of offers, cheapest first, headed by a search handle that stands for "
+        "every offer found; pass the table (or the refs you want compared) on to stopover_evaluator."
+    )
+    args_schema: Type[BaseModel] = FlightSearchInput
     _client: Client = PrivateAttr()
+    _cache: TwoTierCache = PrivateAttr()
+    _max_workers: int = PrivateAttr()
+    _in_flight: Dict[str, Future] = PrivateAttr(default_factory=dict)
+    _in_flight_lock: Any = PrivateAttr(default_factory=threading.Lock)
+    _stats: Dict[str, int] = PrivateAttr(default_factory=lambda: {"fanouts": 0, "queries_dropped": 0})
+    _stats_lock: Any = PrivateAttr(default_factory=threading.Lock)
 
-    def __init__(self, **kwargs):
+    def __init__(self, cache: Optional[TwoTierCache] = None, **kwargs):
         super().__init__(**kwargs)
         self._client = Client(
             client_id=os.getenv("AMADEUS_CLIENT_ID"),
             client_secret=os.getenv("AMADEUS_CLIENT_SECRET"),
         )
+        self._cache = cache if cache is not None else TwoTierCache.from_env(
+            "flight_offers", prefix="FLIGHT_CACHE", ttl=900, max_bytes=64 * 1024 * 1024
+        )
+        self._max_workers = int(os.getenv("FLIGHT_SEARCH_MAX_WORKERS", 8))
+
+    @property
+    def cache(self) -> TwoTierCache:
+        return self._cache
 
-    def _run(self, origin: str, destination: str, date: str) -> List[Dict[str, Any]]:
+    def metrics(self) -> Dict[str, int]:
+        with self._stats_lock:
+            return dict(self._stats)
+
+    @traced_tool
+    def _run(self, origin: str, destination: str, date: str, flex_days: int = 0,
+             max_price: Optional[float] = None, preferred_airlines: Optional[List[str]] = None,
+             non_stop: bool = False, max_stops: Optional[int] = None) -> Union[str, List[Dict[str, Any]]]:
+        filters = FlightFilters.build(max_price, preferred_airlines, non_stop, max_stops)
+        offers = self.search_many(
+            _airport_list(origin), _airport_list(destination), date_window(date, flex_days),
+            filters=filters,
+        )
+        if os.getenv("FLIGHT_TOOL_OUTPUT", "table").lower() == "json":
+            return offers
+        # agents get one row per offer; the full payloads stay resolvable by reference
+        table, _ = compact_offers(offers, int(os.getenv("OFFER_TABLE_TOKENS", DEFAULT_TOKEN_BUDGET)))
+        return table
+
+    def search_many(self, origins: List[str], destinations: List[str], dates: List[str],
+                    filters: Optional[FlightFilters] = None,
+                    bypass_cache: bool = False) -> List[Dict[str, Any]]:
+        """Run every origin x destination x date query on a bounded pool and merge the offers"""
+        requested = fanout_queries(origins, destinations, dates)
+        queries = cap_fanout(requested)
+        with self._stats_lock:
+            self._stats["fanouts"] += 1
+            self._stats["queries_dropped"] += len(requested) - len(queries)
+        if not queries:
+            return []
+        if len(queries) == 1:
+            return self.search(*queries[0], filters=filters, bypass_cache=bypass_cache)
+
+        workers = max(1, min(self._max_workers, len(queries)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="flight-search") as pool:
+            results = list(pool.map(
+                lambda q: self.search(*q, filters=filters, bypass_cache=bypass_cache), queries
+            ))
+        return merge_offers(results)
+
+    def search(self, origin: str, destination: str, date: str,
+               filters: Optional[FlightFilters] = None,
+               bypass_cache: bool = False) -> List[Dict[str, Any]]:
+        """Return Amadeus offers for one query, served from cache when fresh"""
+        filters = filters or FlightFilters()
+        params = {
+            "originLocationCode": origin.strip().upper(),
+            "destinationLocationCode": destination.strip().upper(),
+            "departureDate": date.strip(),
+            "adults": 1,
+            "currencyCode": "EUR",
+            "max": int(os.getenv("FLIGHT_SEARCH_MAX_RESULTS", 10)),
+            **filters.to_params(),
+        }
+        key = make_key("flight_offers_search", **params)
+
+        if not (bypass_cache or _bypass_from_env()):
+            cached = self._cache.get(key, _MISSING)
+            if cached is not _MISSING:
+                get_leg_index().add_offers(cached)
+                return [offer for offer in cached if filters.accepts(offer)]
+
+        # identical queries already on their way to Amadeus (e.g. trips of one batch) share its response
+        with self._in_flight_lock:
+            pending = self._in_flight.get(key)
+            leader = pending is None
+            if leader:
+                pending = self._in_flight[key] = Future()
+        if not leader:
+            return [offer for offer in pending.result() if filters.accepts(offer)]
+        try:
+            data = self._fetch(key, params)
+        except BaseException as exc:
+            pending.set_exception(exc)
+            raise
+        else:
+            pending.set_result(data)
+        finally:
+            with self._in_flight_lock:
+                self._in_flight.pop(key, None)
+        # Amadeus cannot express every constraint (e.g. max_stops), so re-check before agents see it
+        return [offer for offer in data if filters.accepts(offer)]
+
+    def _fetch(self, key: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        # Amadeus enforces a per-second quota per host, shared by every worker thread
+        host_limiter(
+            self._client.host, rate=float(os.getenv("AMADEUS_RATE_LIMIT", 10))
+        ).acquire()
         try:
-            res = self._client.shopping.flight_offers_search.get(
-                originLocationCode=origin,
-                destinationLocationCode=destination,
-                departureDate=date,
-                adults=1,
-                max=10
-            )
-            return res.data or []
+            data = get_cassette().exchange(
+                "amadeus", params, lambda: self._client.shopping.flight_offers_search.get(**params).data
+            ) or []
         except ResponseError as e:
             print("Amadeus error:", e)
             return []
+
+        # Only successful responses are cached so transient errors are retried
+        self._cache.set(key, data)
+        # every offer seen becomes an edge the route graph can combine into self-transfer routes
+        get_leg_index().add_offers(data)
+        try:
+            get_price_store().append_offers(params["originLocationCode"], params["destinationLocationCode"],
+                                            params["departureDate"], data)
+        except (OSError, ValueError) as exc:
+            logger.warning("Could not record fares for %s-%s: %s", params["originLocationCode"],
+                           params["destinationLocationCode"], exc)
+        return data
@@ -1,145 +1,74 @@
 # src/travel_planner/tools/local_guide_tools.py
 import os
+import re
+from typing import List, Optional, Type, Union
+
 import requests
-import json
 from crewai.tools import BaseTool
-from typing import List, Dict, Any
-from bs4 import BeautifulSoup
-import time
+from pydantic import BaseModel, Field
+
+from travel_planner.events import traced_tool
+from travel_planner.itinerary_store import get_itinerary_store
+from travel_planner.passages import PassageIndex, format_passages
+from travel_planner.research import cached_search, format_search_results, get_research_cache, search_key
+from travel_planner.scrape_cache import get_page_cache
 
 class SerperApiToolWrapper(BaseTool):
     name: str = "serper_api"
     description: str = "Search the web for information"
 
+    @traced_tool
     def _run(self, query: str) -> str:
         """Search the web using Serper API and return actual URLs with descriptions"""
+        # Prefetched or earlier identical searches are served from the research cache
+        results = get_research_cache().get(search_key(query))
+        if results is not None:
+            return format_search_results(query, results)
+
         api_key = os.getenv("SERPER_API_KEY")
         if not api_key:
             return "Error: SERPER_API_KEY not found in environment variables"
-        
-        url = "https://google.serper.dev/search"
-        headers = {
-            "X-API-KEY": api_key,
-            "Content-Type": "application/json"
-        }
-        
-        payload = {
-            "q": query,
-            "num": 5  # Get top 5 results
-        }
-        
+
         try:
-            response = requests.post(url, headers=headers, json=payload, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            # Extract organic results
-            organic_results = data.get("organic", [])
-            
-            if not organic_results:
-                return f"No search results found for: {query}"
-            
-            # Format results with actual URLs
-            formatted_results = []
-            for i, result in enumerate(organic_results[:5], 1):
-                title = result.get("title", "No title")
-                link = result.get("link", "No link")
-                snippet = result.get("snippet", "No description")
-                
-                formatted_results.append(f"{i}. **{title}**\n   URL: {link}\n   {snippet}\n")
-            
-            return f"Search results for: {query}\n\n" + "\n".join(formatted_results)
-            
+            results = cached_search(query, api_key, num=5)
         except requests.exceptions.RequestException as e:
             return f"Error searching the web: {str(e)}"
         except Exception as e:
             return f"Unexpected error: {str(e)}"
+        return format_search_results(query, results)
 
 class ScrapeWebsiteToolWrapper(BaseTool):
     name: str = "scrape_website"
     description: str = "Scrape website content"
 
+    @traced_tool
     def _run(self, url: str) -> str:
         """Scrape website content with fallback content"""
         # Skip placeholder URLs
         if "example.com" in url or "[Insert URL" in url:
             return self._get_fallback_content(url)
-        
+
+        # Fresh pages come from the scrape cache, older ones are revalidated with a conditional GET
         try:
-            headers = {
-                "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-            }
-            
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Remove script and style elements
-            for script in soup(["script", "style"]):
-                script.decompose()
-            
-            # Extract text content
-            text = soup.get_text()
-            
-            # Clean up whitespace
-            lines = (line.strip() for line in text.splitlines())
-            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            text = ' '.join(chunk for chunk in chunks if chunk)
-            
-            # Limit content length
-            if len(text) > 2000:
-                text = text[:2000] + "..."
-            
-            return f"Scraped content from: {url}\n\n{text}"
-            
+            text = get_page_cache().get_text(url)
         except requests.exceptions.RequestException as e:
             return self._get_fallback_content(url, error=str(e))
         except Exception as e:
             return self._get_fallback_content(url, error=str(e))
+
+        return f"Scraped content from: {url}\n\n{truncate(text)}"
     
     def _get_fallback_content(self, url: str, error: str = None) -> str:
         """Provide fallback content when scraping fails"""
-        if "hong kong" in url.lower() or "hkg" in url.lower():
-            return """**Hong Kong 1-2 Day Itinerary (Culture & Food Focus)**
-
-**Day 1:**
-- **Morning**: Visit Victoria Peak for panoramic city views
-- **Lunch**: Dim sum at Tim Ho Wan (Michelin-starred)
-- **Afternoon**: Explore Central district and Man Mo Temple
-- **Evening**: Street food tour in Mong Kok, visit Temple Street Night Market
-- **Dinner**: Traditional Cantonese cuisine at Luk Yu Tea House
+        # A precomputed itinerary for a hub named in the URL beats the generic template
+        store = get_itinerary_store()
+        city = store.find_city(url)
+        # not a served plan, so it stays out of the store's hit rate
+        entry = store.lookup(city, count=False) if city else None
+        if entry is not None:
+            return entry["text"]
 
-**Day 2:**
-- **Morning**: Visit Wong Tai Sin Temple
-- **Lunch**: Local cha chaan teng (Hong Kong-style café)
-- **Afternoon**: Explore Tsim Sha Tsui waterfront, visit Hong Kong Museum of History
-- **Evening**: Symphony of Lights show at Victoria Harbour
-- **Dinner**: Seafood at Jumbo Kingdom or local dai pai dong
-
-**Must-Try Foods**: Dim sum, egg tarts, milk tea, wonton noodles, roast goose"""
-        
-        elif "sydney" in url.lower() or "syd" in url.lower():
-            return """**Sydney 1-2 Day Itinerary (Culture & Food Focus)**
-
-**Day 1:**
-- **Morning**: Visit Sydney Opera House and take a guided tour
-- **Lunch**: Fresh seafood at Sydney Fish Market
-- **Afternoon**: Walk across Sydney Harbour Bridge, visit The Rocks historic district
-- **Evening**: Sunset drinks at Opera Bar
-- **Dinner**: Modern Australian cuisine at Quay or Bennelong
-
-**Day 2:**
-- **Morning**: Bondi Beach walk and coastal views
-- **Lunch**: Beachside café at Bondi
-- **Afternoon**: Visit Art Gallery of NSW or Museum of Contemporary Art
-- **Evening**: Dinner in Darling Harbour or Chinatown
-- **Night**: Optional: Sydney Tower Eye for city views
-
-**Must-Try Foods**: Fish and chips, meat pies, pavlova, flat white coffee, fresh oysters"""
-        
-        else:
-            return f"""**Itinerary for Stopover City**
+        return f"""**Itinerary for Stopover City**
 
 **Day 1:**
 - **Morning**: Explore local landmarks and cultural sites
@@ -157,4 +86,74 @@ class ScrapeWebsiteToolWrapper(BaseTool):
 
 **Local Highlights**: Experience the unique culture, cuisine, and attractions of this vibrant city.
 
-{error if error else ""}""" 
\ No newline at end of file
+{error if error else ""}""" 
+
+
+def truncate(text: str, limit: int = 2000) -> str:
+    return text[:limit] + "..." if len(text) > limit else text
+
+
+class BatchScrapeInput(BaseModel):
+    urls: Union[List[str], str] = Field(..., description="URLs to read, as a list or comma/newline separated text")
+    query: Optional[str] = Field(None, description="What you are looking for; returns only the best matching passages")
+
+
+class BatchScrapeToolWrapper(BaseTool):
+    name: str = "scrape_websites"
+    description: str = (
+        "Scrape several websites at once. Pass every URL you want to read (e.g. all search results) "
+        "in one call; pages are fetched in parallel and each one's content or error is returned. "
+        "Give a query (e.g. 'street food markets') to get only the most relevant passages instead of whole pages."
+    )
+    args_schema: Type[BaseModel] = BatchScrapeInput
+
+    @traced_tool
+    def _run(self, urls: Union[List[str], str], query: Optional[str] = None) -> str:
+        """Scrape many URLs concurrently under a per-host limit and an overall deadline"""
+        if isinstance(urls, str):
+            urls = re.split(r"[\s,]+", urls)
+        # Placeholder URLs never reach the network, same as scrape_website
+        urls = [u for u in urls if u.startswith("http") and "example.com" not in u]
+        if not urls:
+            return "Error: no valid URLs given"
+
+        results = get_page_cache().get_many(
+            urls,
+            per_host=int(os.getenv("SCRAPE_BATCH_PER_HOST", 2)),
+            deadline=float(os.getenv("SCRAPE_BATCH_DEADLINE", 15)),
+        )
+        failed = [f"Could not scrape {r['url']} ({r['status']}): {r['error']}" for r in results if r["status"] != "ok"]
+        pages = [r for r in results if r["status"] == "ok"]
+        if query:
+            # Rank passages across all pages so only the relevant text becomes prompt tokens
+            index = PassageIndex()
+            for page in pages:
+                index.add(page["url"], page["text"])
+            budget = int(os.getenv("PASSAGE_TOKEN_BUDGET", 600))
+            sections = [format_passages(index.search(query, k=8, token_budget=budget))]
+        else:
+            sections = [f"Scraped content from: {p['url']}\n\n{truncate(p['text'])}" for p in pages]
+        return "\n\n---\n\n".join(sections + failed)
+
+
+class HubItineraryInput(BaseModel):
+    city: str = Field(..., description="Stopover city IATA code, e.g. SIN")
+    interests: Optional[List[str]] = Field(None, description="Traveller interests, e.g. ['food','culture']")
+
+
+class HubItineraryTool(BaseTool):
+    name: str = "hub_itinerary"
+    description: str = (
+        "Instantly look up a ready-made 1-2 day itinerary for a major stopover hub. "
+        "Try this first; only research the city live when it has no itinerary."
+    )
+    args_schema: Type[BaseModel] = HubItineraryInput
+
+    @traced_tool
+    def _run(self, city: str, interests: Optional[List[str]] = None) -> str:
+        """Answer from the precomputed itinerary store"""
+        entry = get_itinerary_store().lookup(city, interests)
+        if entry is None:
+            return f"No precomputed itinerary for {city}; research it live with serper_api and scrape_websites."
+        note = "" if entry["match"] == "exact" else " (closest stored interests: " + ", ".join(entry["interests"]) + ")"
+        return f"Precomputed itinerary for {city.upper()}{note}:\n\n{entry['text']}"
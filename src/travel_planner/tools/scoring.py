@@ -0,0 +1,195 @@
+# src/travel_planner/tools/scoring.py
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from travel_planner.affinity import AffinityMatrix, category_weights, get_affinity_matrix, is_category
+from travel_planner.airports import get_airport_index
+from travel_planner.interests import clean_interest
+
+# Bonus subtracted from the price for every place-naming interest matched by a stopover
+INTEREST_BONUS = 20.0
+# Bonus for a stopover with the strongest affinity (1.0) for one requested interest category
+AFFINITY_BONUS = 40.0
+
+_NON_NUMERIC = re.compile(r"[^\d.]")
+_ISO_DURATION = re.compile(r"P(?:(\d+)D)?T?(?:(\d+)H)?(?:(\d+)M)?")
+
+
+def parse_price(offer: Dict[str, Any]) -> Optional[float]:
+    """Extract price from offer in various formats"""
+    try:
+        price_data = offer.get("price")
+        if isinstance(price_data, dict):
+            for key in ("total", "grandTotal", "amount"):
+                if key in price_data:
+                    return _to_float(price_data[key])
+        elif isinstance(price_data, (int, float, str)):
+            return _to_float(price_data)
+        return None
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+def _to_float(value: Any) -> float:
+    # Plain numeric strings are the common case; only strip currency symbols when needed
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float(_NON_NUMERIC.sub("", str(value)))
+
+
+def parse_duration(value: Any) -> float:
+    """Minutes in an ISO-8601 duration such as PT14H30M (NaN when absent)"""
+    if not isinstance(value, str):
+        return float("nan")
+    return _parse_duration(value)
+
+
+@lru_cache(maxsize=4096)
+def _parse_duration(value: str) -> float:
+    match = _ISO_DURATION.fullmatch(value)
+    if not match:
+        return float("nan")
+    days, hours, minutes = (int(g) if g else 0 for g in match.groups())
+    return float(days * 1440 + hours * 60 + minutes)
+
+
+def first_stopover(offer: Dict[str, Any]) -> Optional[str]:
+    """Arrival airport of the first segment when the outbound itinerary has a connection"""
+    itineraries = offer.get("itineraries")
+    if not itineraries:
+        return None
+    segments = itineraries[0].get("segments") or []
+    if len(segments) > 1:
+        return segments[0].get("arrival", {}).get("iataCode")
+    return None
+
+
+class OfferBatch:
+    """Column view of a list of offers; rows without a usable price are dropped
+
+    Stopover airports are interned: ``cities`` lists each distinct code once and
+    ``stopover_idx`` points every row at its entry (index 0 is "no stopover").
+    """
+
+    __slots__ = ("offers", "price", "stops", "duration", "cities", "stopover_idx")
+
+    def __init__(self, offers: Sequence[Dict[str, Any]]):
+        kept, prices, stops, durations, stopover_idx = [], [], [], [], []
+        city_index: Dict[str, int] = {"": 0}
+        for offer in offers:
+            if not isinstance(offer, dict):
+                continue
+            price = parse_price(offer)
+            if price is None:
+                continue
+            try:
+                itineraries = offer.get("itineraries") or [{}]
+                outbound = itineraries[0] if isinstance(itineraries[0], dict) else {}
+                segments = outbound.get("segments") or []
+                duration = parse_duration(outbound.get("duration"))
+                stopover = ""
+                if len(segments) > 1:
+                    stopover = segments[0].get("arrival", {}).get("iataCode") or ""
+            except (AttributeError, TypeError, IndexError, KeyError):
+                # Malformed offers are skipped, as the per-offer loop used to do
+                continue
+            kept.append(offer)
+            prices.append(price)
+            stops.append(max(0, len(segments) - 1))
+            durations.append(duration)
+            stopover_idx.append(city_index.setdefault(stopover, len(city_index)))
+
+        self.offers = kept
+        self.price = np.asarray(prices, dtype=np.float64)
+        self.stops = np.asarray(stops, dtype=np.int16)
+        self.duration = np.asarray(durations, dtype=np.float64)
+        self.cities = list(city_index)
+        self.stopover_idx = np.asarray(stopover_idx, dtype=np.intp)
+
+    def __len__(self) -> int:
+        return len(self.offers)
+
+    def stopover(self, row: int) -> Optional[str]:
+        return self.cities[self.stopover_idx[row]] or None
+
+
+@lru_cache(maxsize=4096)
+def place_text(code: str) -> str:
+    """Lowercased ' code city country ' for an airport (padded for whole-word matching), or just the code"""
+    airport = get_airport_index().get(code)
+    if airport is None:
+        return f" {code.lower()} "
+    return f" {code} {airport.city} {airport.country} ".lower()
+
+
+class InterestMatcher:
+    """
+    Interests cleaned and mapped to categories once per request instead of once per offer.
+
+    UI categories ("food & dining") say nothing about a city's name, so they are scored only
+    through the affinity matrix; free-text interests that are not categories ("Japan",
+    "Singapore") earn ``bonus`` when they name the stopover's city or country.
+    """
+
+    def __init__(self, interests: Optional[Sequence[str]], bonus: float = INTEREST_BONUS,
+                 affinity: Optional[AffinityMatrix] = None, affinity_bonus: float = AFFINITY_BONUS):
+        labels = [clean_interest(i) for i in interests or [] if isinstance(i, str)]
+        self.terms = [f" {label} " for label in labels if label and not is_category(label)]
+        self.bonus = bonus
+        self.weights = category_weights(interests) * affinity_bonus
+        self.affinity = affinity if affinity is not None else get_affinity_matrix()
+
+    def city_bonus(self, city: str) -> float:
+        """One bonus per place-naming interest that is the stopover's code, city name or country"""
+        if not city or not self.terms:
+            return 0.0
+        place = place_text(city)
+        return self.bonus * sum(1 for term in self.terms if term in place)
+
+    def bonuses(self, batch: OfferBatch) -> np.ndarray:
+        """Bonus per offer, evaluated once per distinct stopover city
+
+        Name matches are added to the city's affinity for the requested categories, which
+        comes from one matrix product over all distinct stopovers in the batch.
+        """
+        if not len(batch) or not (self.terms or self.weights.any()):
+            return np.zeros(len(batch), dtype=np.float64)
+        return self.city_bonuses(batch.cities)[batch.stopover_idx]
+
+    def city_bonuses(self, cities: Sequence[str]) -> np.ndarray:
+        """Name-match plus affinity bonus for each city code ("" for no stopover scores 0)"""
+        per_city = np.fromiter((self.city_bonus(c) for c in cities), dtype=np.float64, count=len(cities))
+        per_city += self.affinity.score(cities, self.weights)
+        return per_city
+
+
+def top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k lowest scores, ties broken by input order"""
+    n = len(scores)
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.intp)
+    if k < n:
+        candidates = np.argpartition(scores, k - 1)[:k]
+        # argpartition may pick any of several tied rows at the boundary; take the earliest
+        cutoff = scores[candidates].max()
+        below = np.flatnonzero(scores < cutoff)
+        tied = np.flatnonzero(scores == cutoff)[: k - len(below)]
+        candidates = np.concatenate([below, tied])
+    else:
+        candidates = np.arange(n)
+    return candidates[np.lexsort((candidates, scores[candidates]))]
+
+
+def rank_offers(offers: Sequence[Dict[str, Any]], interests: Optional[Sequence[str]],
+                k: int = 2, affinity: Optional[AffinityMatrix] = None) -> Tuple[OfferBatch, np.ndarray, np.ndarray]:
+    """Score every offer (price minus experience bonus, lower is better) and select the best k
+
+    Returns the batch, the selected row indices in rank order and the full score array.
+    """
+    batch = OfferBatch(offers)
+    scores = batch.price - InterestMatcher(interests, affinity=affinity).bonuses(batch)
+    return batch, top_k(scores, k), scores
@@ -1,15 +1,31 @@
 # src/travel_planner/tools/stopover_evaluator.py
 from crewai.tools import BaseTool
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Type, Union
+from pydantic import BaseModel, Field
 import json
-import re
+
+from travel_planner.airports import get_airport_index
+from travel_planner.events import traced_tool
+from travel_planner.offers import get_offer_registry, offer_ref
+
+from .scoring import first_stopover, parse_price, rank_offers
+
+class StopoverEvaluatorInput(BaseModel):
+    offers: Union[List[Dict[str, Any]], List[str], str] = Field(
+        ..., description="The flight_search table (its search handle covers every offer, shown or not), "
+                         "a list of refs, or offers as a list or JSON text")
+    interests: List[str] = Field(default_factory=list, description="Traveller interests, e.g. ['food','culture']")
+    top_k: int = Field(2, ge=1, description="Number of routes to return")
+
 
 class StopoverEvaluator(BaseTool):
     name: str = "stopover_evaluator"
-    description: str = "Evaluate flight offers and select top options based on price and interests"
+    description: str = "Evaluate flight offers and select the top_k options (default 2) based on price and interests"
+    args_schema: Type[BaseModel] = StopoverEvaluatorInput
 
-    def _run(self, offers: List[Dict[str, Any]], interests: List[str]) -> List[Dict[str, Any]]:
-        """Evaluate flight offers and return top 2 options"""
+    @traced_tool
+    def _run(self, offers: List[Dict[str, Any]], interests: List[str], top_k: int = 2) -> List[Dict[str, Any]]:
+        """Evaluate flight offers and return the top_k options (default 2)"""
         try:
             # Handle different input formats
             if isinstance(offers, str):
@@ -17,55 +33,38 @@ class StopoverEvaluator(BaseTool):
                 try:
                     offers = json.loads(offers)
                 except json.JSONDecodeError:
-                    # Try to extract offers from text
-                    offers = self._extract_offers_from_text(offers)
+                    # The flight_search table (or any text quoting its refs), else the legacy text scrape
+                    offers = get_offer_registry().resolve(offers) or self._extract_offers_from_text(offers)
+            if isinstance(offers, list) and offers and all(isinstance(o, str) for o in offers):
+                offers = get_offer_registry().resolve(" ".join(offers))
             
             if not offers:
                 return []
             
-            scored = []
-            for offer in offers:
-                try:
-                    # Handle different price formats
-                    price = self._extract_price(offer)
-                    if price is None:
-                        continue
-                    
-                    # Extract stopover information
-                    stopover_city = self._extract_stopover_city(offer)
-                    
-                    # Calculate bonus based on interests
-                    bonus = 0
-                    if stopover_city and interests:
-                        for interest in interests:
-                            # Clean interest string (remove emojis and extra text)
-                            clean_interest = re.sub(r'[^\w\s]', '', interest.lower())
-                            if clean_interest in stopover_city.lower():
-                                bonus += 20
-                    
-                    # Calculate final score (lower is better)
-                    score = price - bonus
-                    scored.append((score, offer, price, stopover_city))
-                    
-                except Exception as e:
-                    print(f"Error processing offer: {e}")
-                    continue
-            
-            # Sort by score and return top 2
-            scored.sort(key=lambda x: x[0])
-            top2 = []
+            # Score the whole batch at once and keep only the best top_k
+            batch, ranked, scores = rank_offers(offers, interests, k=top_k)
             
-            for score, offer, price, stopover in scored[:2]:
+            airports = get_airport_index()
+            results = []
+            for row in ranked:
+                offer = batch.offers[row]
+                price = float(batch.price[row])
+                stopover = batch.stopover(row)
+                airport = airports.get(stopover) if stopover else None
+                via = f"{airport.city} ({stopover})" if airport else stopover or "Direct"
                 result = {
                     "id": offer.get("id", "Unknown"),
+                    "ref": offer_ref(offer),
                     "price": price,
                     "stopover_city": stopover,
-                    "score": score,
-                    "summary": f"Flight {offer.get('id', 'Unknown')}: €{price} via {stopover if stopover else 'Direct'}"
+                    "stopover_name": airport.city if airport else None,
+                    "stopover_country": airport.country if airport else None,
+                    "score": float(scores[row]),
+                    "summary": f"Flight {offer.get('id', 'Unknown')}: €{price} via {via}"
                 }
-                top2.append(result)
+                results.append(result)
             
-            return top2
+            return results
             
         except Exception as e:
             print(f"Error in stopover evaluator: {e}")
@@ -73,44 +72,13 @@ class StopoverEvaluator(BaseTool):
     
     def _extract_price(self, offer: Dict[str, Any]) -> float:
         """Extract price from offer in various formats"""
-        try:
-            # Try different price field formats
-            if "price" in offer:
-                price_data = offer["price"]
-                if isinstance(price_data, dict):
-                    # Try different price keys
-                    for key in ["total", "grandTotal", "amount"]:
-                        if key in price_data:
-                            price_str = str(price_data[key])
-                            # Remove currency symbols and convert to float
-                            price = re.sub(r'[^\d.]', '', price_str)
-                            return float(price)
-                elif isinstance(price_data, (int, float)):
-                    return float(price_data)
-                elif isinstance(price_data, str):
-                    price = re.sub(r'[^\d.]', '', price_data)
-                    return float(price)
-            
-            return None
-        except:
-            return None
+        return parse_price(offer)
     
     def _extract_stopover_city(self, offer: Dict[str, Any]) -> str:
         """Extract stopover city from offer"""
         try:
-            if "itineraries" in offer and offer["itineraries"]:
-                itinerary = offer["itineraries"][0]
-                if "segments" in itinerary:
-                    segments = itinerary["segments"]
-                    if len(segments) > 1:
-                        # Return the destination of the first segment (stopover)
-                        first_segment = segments[0]
-                        if "arrival" in first_segment:
-                            arrival = first_segment["arrival"]
-                            if "iataCode" in arrival:
-                                return arrival["iataCode"]
-            return None
-        except:
+            return first_stopover(offer)
+        except Exception:
             return None
     
     def _extract_offers_from_text(self, text: str) -> List[Dict[str, Any]]:
@@ -9,7 +9,7 @@ from datetime import datetime, timedelta
 # Add the src directory to Python path
 sys.path.append(str(Path(__file__).parent.parent))
 
-from travel_planner.crew import crew
+from travel_planner.pipeline import stream_plan
 
 # Page configuration
 st.set_page_config(
@@ -115,6 +115,7 @@ with st.sidebar:
     # Date selection with smart defaults
     default_date = datetime.now() + timedelta(days=30)
     date = st.date_input("📅 Travel Date", value=default_date, min_value=datetime.now().date())
+    flex_days = st.slider("↔️ Flexible Dates (± days)", 0, 3, 0, help="Also search days either side of your travel date")
     
     # Interests with better options
     st.markdown("### 🎨 Interests")
@@ -133,6 +134,7 @@ with st.sidebar:
         "✈️ Preferred Airlines",
         ["Any", "Cathay Pacific", "Singapore Airlines", "Emirates", "Qatar Airways", "Lufthansa"]
     )
+    fast_mode = st.toggle("⚡ Fast mode", value=False, help="Rank flights instantly and use the AI only for itineraries")
     
     # Info box
     st.markdown("""
@@ -158,27 +160,56 @@ with col2:
             with st.spinner("🤖 AI agents are planning your perfect trip..."):
                 progress_bar = st.progress(0)
                 status_text = st.empty()
-                
-                # Simulate progress
-                for i in range(100):
-                    progress_bar.progress(i + 1)
-                    if i < 30:
-                        status_text.text("🔍 Searching for flights...")
-                    elif i < 60:
-                        status_text.text("📊 Evaluating routes...")
-                    elif i < 90:
-                        status_text.text("🗺️ Creating itineraries...")
-                    else:
-                        status_text.text("✨ Finalizing your travel plan...")
+                # Progress follows the real agent events as each stage starts and finishes
+                stage_labels = {
+                    "search_flights": "🔍 Searching for flights...",
+                    "evaluate_routes": "📊 Evaluating routes...",
+                    "plan_itinerary": "🗺️ Creating itineraries...",
+                    "plan_city_itinerary": "🗺️ Creating itineraries...",
+                }
+                early_results = st.container()
+                status_text.text("🤖 Starting your travel agents...")
                 
                 try:
-                    # Run the crew
-                    result = crew.kickoff(inputs={
+                    # Run the crew and consume its progress events
+                    result = None
+                    stages_done = 0
+                    for event in stream_plan({
                         "origin": origin,
                         "destination": destination,
                         "date": str(date),
-                        "interests": interests
-                    })
+                        "interests": interests,
+                        "flex_days": flex_days,
+                        "max_price": max_price,
+                        "preferred_airlines": [a for a in preferred_airlines if a != "Any"]
+                    }, mode="fast" if fast_mode else "crew"):
+                        kind = event["event"]
+                        if kind == "task_started":
+                            status_text.text(stage_labels.get(event["task"], "✨ Finalizing your travel plan..."))
+                        elif kind == "tool_call":
+                            status_text.text(f"🛠️ {event['tool']} answered in {event['latency_ms']:.0f} ms")
+                        elif kind == "task_finished" and event["task"] != "plan_city_itinerary":
+                            stages_done += 1
+                            progress_bar.progress(min(100, int(100 * stages_done / 3)))
+                            if event["task"] == "evaluate_routes":
+                                # Show the chosen flights while itineraries are still being written
+                                with early_results:
+                                    st.markdown("### ✈️ Recommended Flights")
+                                    routes = (event.get("data") or {}).get("routes")
+                                    if routes:
+                                        for route in routes:
+                                            st.markdown(f"""
+                                            <div class="flight-card">
+                                                <h4>{route['summary']}</h4>
+                                            </div>
+                                            """, unsafe_allow_html=True)
+                                    else:
+                                        st.markdown(event.get("output", ""))
+                        elif kind == "plan_finished":
+                            progress_bar.progress(100)
+                            result = event["data"]
+                        elif kind == "error":
+                            raise RuntimeError(event["detail"])
                     
                     # Clear progress
                     progress_bar.empty()
@@ -196,13 +227,14 @@ with col2:
                     st.markdown("## 📋 Travel Plan Summary")
                     
                     # Parse and display the result
-                    if isinstance(result, str):
+                    plan_text = result.get("raw") or result.get("itinerary")
+                    if isinstance(plan_text, str):
                         # Try to extract flight information
-                        if "Flight ID" in result:
+                        if "Flight ID" in plan_text:
                             st.markdown("### ✈️ Recommended Flights")
                             
                             # Extract flight information using simple parsing
-                            lines = result.split('\n')
+                            lines = plan_text.split('\n')
                             current_flight = None
                             
                             for line in lines:
@@ -221,7 +253,7 @@ with col2:
                                 elif line.strip() and not line.startswith("**"):
                                     st.markdown(line)
                         else:
-                            st.markdown(result)
+                            st.markdown(plan_text)
                     else:
                         st.json(result)
                     
@@ -0,0 +1,24 @@
+# tests/conftest.py
+import os
+import tempfile
+
+import pytest
+
+# Keep caches in memory and never reach real services while testing
+os.environ.setdefault("TRAVEL_PLANNER_CACHE_PATH", "")
+os.environ.setdefault("AMADEUS_CLIENT_ID", "test")
+os.environ.setdefault("AMADEUS_CLIENT_SECRET", "test")
+os.environ.setdefault("CREWAI_DISABLE_TELEMETRY", "true")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+os.environ.setdefault("AIRPORT_INDEX_PATH", os.path.join(tempfile.mkdtemp(), "airports.idx"))
+os.environ.setdefault("PRICE_STORE_PATH", tempfile.mkdtemp())
+# no affinity matrix unless a test builds one, whatever a local precompute left in .cache
+os.environ.setdefault("AFFINITY_PATH", os.path.join(tempfile.mkdtemp(), "affinity.npz"))
+
+
+@pytest.fixture(autouse=True)
+def fresh_plan_cache():
+    # Plans memoized by one test must not answer another test's request
+    from travel_planner.plan_cache import get_plan_cache
+    get_plan_cache().store.clear()
+    yield
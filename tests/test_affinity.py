@@ -0,0 +1,59 @@
+# tests/test_affinity.py
+import numpy as np
+import pytest
+
+from travel_planner import affinity
+from travel_planner.affinity import AffinityMatrix, build_matrix, category_weights, get_affinity_matrix
+from travel_planner.interests import INTEREST_CATEGORIES
+from travel_planner.itinerary_store import ItineraryStore
+from travel_planner.tools.scoring import rank_offers
+
+
+def offer(offer_id, price, stopover):
+    return {"id": offer_id, "price": {"total": str(price)},
+            "itineraries": [{"segments": [{"arrival": {"iataCode": stopover}}, {"arrival": {"iataCode": "BLR"}}]}]}
+
+
+def test_category_weights_accept_ui_labels_and_plain_words():
+    weights = category_weights(["🍽️ Food & Dining", "museums", "sin"])
+    assert weights.tolist() == [1, 1, 0, 0, 0, 0, 0, 0]
+    assert not category_weights([]).any()
+
+
+def test_build_matrix_scales_each_category_to_the_strongest_city(tmp_path):
+    matrix = build_matrix({
+        "AAA|": {"city": "AAA", "text": "Hawker food, street food and a temple museum"},
+        "BBB|": {"city": "BBB", "text": "Beach day, then a spa and a rooftop bar with food"},
+    })
+    food, culture, beaches = (INTEREST_CATEGORIES.index(c) for c in ("food & dining", "culture & history",
+                                                                      "beaches & relaxation"))
+    assert matrix.scores[matrix.rows["AAA"], food] == pytest.approx(1.0)
+    assert matrix.scores[matrix.rows["BBB"], beaches] == pytest.approx(1.0)
+    assert matrix.scores[matrix.rows["BBB"], culture] == 0
+
+    loaded = AffinityMatrix.load(matrix.save(tmp_path / "affinity.npz"))
+    np.testing.assert_allclose(loaded.scores, matrix.scores)
+
+
+def test_score_handles_unknown_cities_and_many_travellers():
+    matrix = AffinityMatrix(["AAA", "BBB"], np.eye(2, len(INTEREST_CATEGORIES)))
+    weights = np.stack([category_weights(["food"]), category_weights(["culture", "food"])], axis=1)
+    assert matrix.score(["AAA", "", "ZZZ", "BBB"], weights).tolist() == [[1, 1], [0, 0], [0, 0], [0, 1]]
+
+
+def test_affinity_reorders_equally_priced_stopovers():
+    offers = [offer("1", 500, "SYD"), offer("2", 500, "HKG")]
+    matrix = AffinityMatrix(["HKG", "SYD"], np.eye(2, len(INTEREST_CATEGORIES))[::-1])
+    batch, ranked, scores = rank_offers(offers, ["beaches & relaxation", "food"], k=2, affinity=matrix)
+    assert [batch.offers[r]["id"] for r in ranked] == ["1", "2"]
+    assert scores.tolist() == [460.0, 500.0]
+
+
+def test_no_matrix_until_precompute_rebuilds_it(monkeypatch, tmp_path):
+    monkeypatch.setenv("AFFINITY_PATH", str(tmp_path / "affinity.npz"))
+    assert len(AffinityMatrix.from_env()) == 0
+    monkeypatch.setattr(affinity, "_matrix", None)
+    matrix = affinity.rebuild_affinity_matrix(ItineraryStore().itineraries)
+    assert {"HKG", "SYD"} <= set(matrix.codes)
+    assert get_affinity_matrix() is matrix
+    assert AffinityMatrix.from_env().codes == matrix.codes
@@ -0,0 +1,85 @@
+# tests/test_airports.py
+import pytest
+from fastapi.testclient import TestClient
+
+import src.travel_planner.api as api
+from src.travel_planner.api import app
+from travel_planner.airports import AirportIndex, airport_code, build_index, slot_of
+from travel_planner.research import research_query
+from travel_planner.tools.scoring import InterestMatcher
+from travel_planner.tools.stopover_evaluator import StopoverEvaluator
+
+
+def test_index_round_trips_csv(tmp_path):
+    csv_path = tmp_path / "airports.csv"
+    csv_path.write_text(
+        "iata,city,country,latitude,longitude,timezone\n"
+        "AAA,Anaa,French Polynesia,-17.35,-145.51,Pacific/Tahiti\n"
+        "ZZZ,Zürich Test,Switzerland,47.46,8.55,Europe/Zurich\n"
+        "TOOLONG,Ignored,Nowhere,0,0,UTC\n",
+        encoding="utf-8",
+    )
+    assert build_index(csv_path, tmp_path / "airports.idx") == 2
+
+    index = AirportIndex(tmp_path / "airports.idx")
+    assert len(index) == 2
+    assert index.get("zzz").city == "Zürich Test"
+    assert index.get("AAA").latitude == pytest.approx(-17.35, abs=1e-3)
+    assert index.get("AAB") is None and "TOOLONG" not in index
+    assert (slot_of("AAA"), slot_of("ZZZ"), slot_of("A1A")) == (0, 26 ** 3 - 1, None)
+
+
+def test_airport_code_validation():
+    assert airport_code(" sin ") == "SIN"
+    assert airport_code("QQQ", require_known=False) == "QQQ"
+    with pytest.raises(ValueError, match="Unknown"):
+        airport_code("QQQ")
+    with pytest.raises(ValueError, match="three-letter"):
+        airport_code("ME1")
+
+
+def test_trip_request_checks_format_by_default_and_the_index_when_strict(monkeypatch):
+    client = TestClient(app)
+    # real airports the bundled index does not list are accepted by default
+    monkeypatch.setattr(api, "run_plan", lambda inputs, mode=None, use_cache=True: {"raw": "plan"})
+    r = client.post("/plan-trip", json={"origin": "CBR", "destination": "WLG", "date": "2025-08-01"})
+    assert r.status_code == 200
+    r = client.post("/plan-trip", json={"origin": "MEL", "destination": "BLR", "date": "2025-08-01",
+                                        "alternate_destinations": ["XX"]})
+    assert r.status_code == 422
+
+    monkeypatch.setattr(api, "STRICT_AIRPORTS", True)
+    r = client.post("/plan-trip", json={"origin": "MEL", "destination": "QQQ", "date": "2025-08-01"})
+    assert r.status_code == 422
+
+
+def test_place_naming_interests_match_city_and_country_names():
+    matcher = InterestMatcher(["🍽️ Food & Dining", "🏖️ Beaches & Relaxation", "Singapore", "japan"])
+    assert matcher.city_bonus("SIN") == 20.0
+    assert matcher.city_bonus("NRT") == 20.0
+    assert matcher.city_bonus("XSP") == 0.0
+    # UI categories are left to the affinity matrix instead of matching names by accident
+    assert InterestMatcher(["🏛️ Culture & History", "food"]).city_bonus("SIN") == 0.0
+    # whole words only: "kyo" is not Tokyo
+    assert InterestMatcher(["kyo"]).city_bonus("NRT") == 0.0
+
+
+def test_evaluator_and_research_use_city_names():
+    offers = [{"id": "1", "price": "500",
+               "itineraries": [{"segments": [{"arrival": {"iataCode": "SIN"}}, {"arrival": {"iataCode": "BLR"}}]}]}]
+    result = StopoverEvaluator()._run(offers, [])[0]
+    assert result["stopover_name"] == "Singapore"
+    assert result["summary"] == "Flight 1: €500.0 via Singapore (SIN)"
+    assert research_query("HKG", []).startswith("Hong Kong stopover")
+    assert research_query("XSP", []).startswith("XSP stopover")
+
+
+def test_trip_request_refuses_a_fanout_over_the_cap(monkeypatch):
+    client = TestClient(app)
+    monkeypatch.setattr(api, "run_plan", lambda inputs, mode=None, use_cache=True: {"raw": "plan"})
+    trip = {"origin": "MEL", "destination": "BLR", "date": "2030-08-01", "flex_days": 7,
+            "alternate_origins": ["AVV"], "alternate_destinations": ["MAA"]}
+    # 2 origins x 2 destinations x 15 days is exactly the cap
+    assert client.post("/plan-trip", json=trip).status_code == 200
+    r = client.post("/plan-trip", json={**trip, "alternate_destinations": ["MAA", "HYD"]})
+    assert r.status_code == 422 and "90 flight searches" in r.text
@@ -25,7 +25,9 @@ def mock_kickoff_success(inputs):
 def patch_crew_kickoff(monkeypatch):
     # Patch the crew.kickoff used by the API to avoid real external calls
     import travel_planner.crew as crew_module
-    monkeypatch.setattr(crew_module.crew, "kickoff", mock_kickoff_success)
+    # Crew is a pydantic model, so instance attributes cannot be replaced; patch the class instead
+    monkeypatch.setattr(type(crew_module.crew), "kickoff",
+                        lambda self, inputs=None, **kwargs: mock_kickoff_success(inputs))
     yield
 
 
@@ -48,3 +50,114 @@ def test_plan_trip_success():
     assert body["status"] == "success"
     assert "recommended" in body["data"]
     assert isinstance(body["data"]["recommended"], list)
+
+
+def test_plan_trip_fast_mode_skips_llm_for_search_and_ranking(monkeypatch):
+    import travel_planner.crew as crew_module
+    offers = [
+        {"id": "1", "price": {"total": "420.00"},
+         "itineraries": [{"segments": [{"arrival": {"iataCode": "KUL"}}, {"arrival": {"iataCode": "BLR"}}]}]},
+        {"id": "2", "price": {"total": "400.00"},
+         "itineraries": [{"segments": [{"arrival": {"iataCode": "SIN"}}, {"arrival": {"iataCode": "BLR"}}]}]},
+    ]
+    monkeypatch.setattr(type(crew_module.flight_tool), "search_many", lambda self, *args, **kwargs: offers)
+    payload = {
+        "origin": "MEL",
+        "destination": "BLR",
+        "date": "2025-08-01",
+        "interests": ["food"],
+        "mode": "fast",
+    }
+    r = client.post("/plan-trip", json=payload)
+    assert r.status_code == 200
+    data = r.json()["data"]
+    assert data["mode"] == "fast"
+    assert [route["id"] for route in data["routes"]] == ["2", "1"]
+
+
+def test_self_transfer_routes_are_kept_apart_from_the_ranking(monkeypatch):
+    import travel_planner.crew as crew_module
+    import travel_planner.pipeline as pipeline_module
+    offers = [{"id": "1", "price": {"total": "420.00"},
+               "itineraries": [{"segments": [{"arrival": {"iataCode": "SIN"}}, {"arrival": {"iataCode": "BLR"}}]}]}]
+    graph_route = {"id": "ST1", "price": 380.0, "stopover_city": "HKG", "stopover_days": 3, "self_transfer": True,
+                   "score": 460.0, "legs": [], "summary": "Self-transfer MEL → HKG (3 days) → BLR: €380.0"}
+    monkeypatch.setattr(type(crew_module.flight_tool), "search_many", lambda self, *args, **kwargs: offers)
+    monkeypatch.setattr(pipeline_module, "stopover_routes", lambda *args, **kwargs: [graph_route])
+    payload = {"origin": "MEL", "destination": "BLR", "date": "2025-08-01", "interests": ["food"],
+               "mode": "fast", "stopover_days": 3}
+    data = client.post("/plan-trip", json=payload).json()["data"]
+    # graph costs and evaluator scores are different units, so they are not one ranking
+    assert [route["id"] for route in data["routes"]] == ["1"]
+    assert [route["id"] for route in data["self_transfer_routes"]] == ["ST1"]
+    assert [i["city"] for i in data["itineraries"]] == ["SIN", "HKG"]
+
+
+def test_plan_trip_rejects_malformed_date():
+    for value in ("01/08/2025", "2025-13-01", ""):
+        r = client.post("/plan-trip", json={"origin": "MEL", "destination": "BLR", "date": value})
+        assert r.status_code == 422
+
+
+def test_plan_trip_saturated_pool_returns_retry_after(monkeypatch):
+    import src.travel_planner.api as api_module
+    from travel_planner.crew_pool import PoolSaturated
+
+    def saturated(inputs, mode=None, use_cache=True):
+        raise PoolSaturated("plan pool queue is full", 429, 7)
+
+    monkeypatch.setattr(api_module, "run_plan", saturated)
+    r = client.post("/plan-trip", json={"origin": "MEL", "destination": "BLR", "date": "2025-08-01"})
+    assert r.status_code == 429
+    assert r.headers["Retry-After"] == "7"
+
+
+def test_metrics_reports_pool_and_cache():
+    client.post("/plan-trip", json={"origin": "MEL", "destination": "BLR", "date": "2025-08-01"})
+    body = client.get("/metrics").json()
+    assert body["crew_pools"]["plan"]["leases"] >= 1
+    assert "hit_rate" in body["flight_cache"]
+
+
+def test_plan_trip_job_lifecycle():
+    payload = {"origin": "MEL", "destination": "BLR", "date": "2025-08-01", "interests": ["food"]}
+    r = client.post("/plan-trip/jobs", json=payload)
+    assert r.status_code == 202
+    job_id = r.json()["job_id"]
+    assert r.headers["Location"] == f"/plan-trip/jobs/{job_id}"
+
+    body = client.get(f"/plan-trip/jobs/{job_id}", params={"wait": 5}).json()
+    assert body["status"] == "succeeded"
+    assert "recommended" in body["data"]
+
+
+def test_plan_trip_job_unknown_id():
+    assert client.get("/plan-trip/jobs/does-not-exist").status_code == 404
+
+
+def test_plan_trip_stream_emits_sse_events():
+    payload = {"origin": "MEL", "destination": "BLR", "date": "2025-08-01"}
+    with client.stream("POST", "/plan-trip/stream", json=payload) as r:
+        assert r.status_code == 200
+        assert r.headers["content-type"].startswith("text/event-stream")
+        body = "".join(r.iter_text())
+    events = [line[len("event: "):] for line in body.splitlines() if line.startswith("event: ")]
+    assert events[0] == "plan_started"
+    assert "task_started" in events
+    assert events[-1] == "plan_finished"
+
+
+def test_plan_trip_websocket_streams_fast_mode_progress(monkeypatch):
+    import travel_planner.crew as crew_module
+    offers = [{"id": "1", "price": {"total": "400.00"},
+               "itineraries": [{"segments": [{"arrival": {"iataCode": "SIN"}}, {"arrival": {"iataCode": "BLR"}}]}]}]
+    monkeypatch.setattr(type(crew_module.flight_tool), "search_many", lambda self, *args, **kwargs: offers)
+    with client.websocket_connect("/plan-trip/ws") as ws:
+        ws.send_json({"origin": "MEL", "destination": "BLR", "date": "2025-08-01", "mode": "fast"})
+        events = []
+        while not events or events[-1]["event"] not in ("plan_finished", "error"):
+            events.append(ws.receive_json())
+    routes_ready = next(e for e in events if e["event"] == "task_finished" and e["task"] == "evaluate_routes")
+    assert routes_ready["data"]["routes"][0]["stopover_city"] == "SIN"
+    assert any(e["event"] == "tool_call" and e["tool"] == "flight_search" for e in events)
+    assert events[-1]["event"] == "plan_finished"
@@ -0,0 +1,107 @@
+# tests/test_batch.py
+import json
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from src.travel_planner.api import app
+from travel_planner import batch as batch_module
+from travel_planner import research
+from travel_planner.batch import BatchPlanner, flight_queries, query_key
+from travel_planner.passages import PassageIndex
+
+client = TestClient(app)
+
+DIRECT = [{"id": "1", "price": {"total": "400.00"}, "itineraries": [{"segments": [{"arrival": {"iataCode": "BLR"}}]}]}]
+
+
+def test_flight_queries_follow_the_trip_fan_out():
+    inputs = {"origin": "MEL", "destination": "BLR", "date": "2030-01-02", "flex_days": 1,
+              "alternate_origins": ["AVV"], "alternate_destinations": [], "max_price": 500}
+    queries = flight_queries(inputs)
+    assert len(queries) == 6
+    assert {q[:2] for q in queries} == {("MEL", "BLR"), ("AVV", "BLR")}
+    assert query_key(queries[0]) != query_key(flight_queries({**inputs, "max_price": 600})[0])
+
+
+def test_batch_shares_searches_and_streams_every_trip(monkeypatch):
+    import travel_planner.crew as crew_module
+    fetched = []
+
+    class OffersSearch:
+        def get(self, **params):
+            fetched.append(params["originLocationCode"])
+            time.sleep(0.1)
+            return type("Response", (), {"data": DIRECT})()
+
+    monkeypatch.setattr(crew_module.flight_tool._client.shopping, "flight_offers_search", OffersSearch(),
+                        raising=False)
+    trip = {"origin": "MEL", "destination": "BLR", "date": "2030-01-02", "mode": "fast", "use_cache": False}
+    payload = {"trips": [
+        {**trip, "interests": ["food"]},
+        {**trip, "interests": ["culture"]},
+        {**trip, "interests": ["food"]},
+        {**trip, "origin": "SYD"},
+    ]}
+    with client.stream("POST", "/plan-trips", json=payload) as r:
+        assert r.headers["content-type"].startswith("application/x-ndjson")
+        events = [json.loads(line) for line in r.iter_lines() if line]
+
+    assert events[0]["event"] == "batch_started"
+    assert events[0]["plans"] == 3
+    assert (events[0]["flight_queries"], events[0]["flight_queries_requested"]) == (2, 4)
+    assert sorted(fetched) == ["MEL", "SYD"]
+    finished = [e for e in events if e["event"] == "trip_finished"]
+    assert sorted(e["index"] for e in finished) == [0, 1, 2, 3]
+    assert sum(e["deduplicated"] for e in finished) == 1
+    assert all(e["status"] == "success" and e["data"]["mode"] == "fast" for e in finished)
+    assert events[-1]["event"] == "batch_finished" and events[-1]["succeeded"] == 4
+
+
+def test_batch_rejects_empty_list():
+    assert client.post("/plan-trips", json={"trips": []}).status_code == 422
+
+
+def test_malformed_date_is_refused_and_only_fails_its_own_trip(monkeypatch):
+    trip = {"origin": "MEL", "destination": "BLR", "date": "2030-02-30", "mode": "fast"}
+    assert client.post("/plan-trips", json={"trips": [trip]}).status_code == 422
+
+    monkeypatch.setattr(batch_module, "run_plan", lambda inputs, mode, use_cache: {"raw": inputs["date"]})
+    monkeypatch.setattr(type(batch_module.crew_module.flight_tool), "search", lambda self, *args, **kwargs: [])
+    # callers that skip the API model still get a result for every trip
+    events = list(BatchPlanner(max_concurrency=2).stream([
+        ({**trip, "date": "not a date"}, "fast", True),
+        ({**trip, "date": "2030-02-01"}, "fast", True),
+    ]))
+    finished = {e["index"]: e for e in events if e["event"] == "trip_finished"}
+    assert sorted(finished) == [0, 1] and finished[1]["data"] == {"raw": "2030-02-01"}
+    assert events[-1]["event"] == "batch_finished"
+
+
+def test_concurrent_research_for_one_city_runs_once(monkeypatch):
+    calls = []
+
+    def index_city(city, api_key):
+        calls.append(city)
+        time.sleep(0.2)
+        index = PassageIndex()
+        index.add("https://food.test", "Hawker centres serve the best street food: chicken rice and laksa. " * 5)
+        index.add("https://museum.test", "The National Museum covers Singapore history and culture. " * 5)
+        return index
+
+    monkeypatch.setenv("SERPER_API_KEY", "test")
+    monkeypatch.setattr(research, "_index_city", index_city)
+    results = {}
+    travellers = {"foodie": ["🍽️ Food & Dining"], "historian": ["🏛️ Culture & History"], "hungry": ["food"]}
+    threads = [threading.Thread(target=lambda n=name, i=interests: results.__setitem__(
+        n, research.city_research_notes("SIN", i))) for name, interests in travellers.items()]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # one search and page fetch for the city, ranked separately for each traveller
+    assert calls == ["SIN"]
+    assert "food.test" in results["foodie"] and "museum.test" not in results["foodie"]
+    assert "museum.test" in results["historian"] and "food.test" not in results["historian"]
+    assert results["hungry"] == results["foodie"]
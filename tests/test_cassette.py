@@ -0,0 +1,81 @@
+# tests/test_cassette.py
+import gzip
+import re
+import time
+from importlib import import_module
+from pathlib import Path
+
+import pytest
+
+from travel_planner.cache import TwoTierCache
+from travel_planner.cassette import Cassette, CassetteMiss, use_cassette
+from travel_planner.research import serper_search
+from travel_planner.tools.flight_search import FlightSearch
+
+
+@pytest.fixture
+def cassette_path(tmp_path):
+    yield tmp_path / "cassette.json.gz"
+    use_cassette(None)
+
+
+def test_recorded_exchanges_replay_with_simulated_latency(cassette_path):
+    recorder = Cassette(cassette_path, mode="record")
+    calls = []
+    assert recorder.exchange("serper", {"q": "Singapore"}, lambda: calls.append(1) or [{"link": "a"}]) == [{"link": "a"}]
+    recorder.exchange("gemini", "key", lambda: object())  # not serializable, so not recorded
+    recorder.meta["inputs"] = {"origin": "MEL"}
+    recorder.save()
+
+    player = Cassette(cassette_path, mode="replay", latency=0.05)
+    started = time.perf_counter()
+    assert player.exchange("serper", {"q": "Singapore"}, lambda: pytest.fail("network used")) == [{"link": "a"}]
+    assert time.perf_counter() - started >= 0.05
+    assert player.meta == {"inputs": {"origin": "MEL"}}
+    with pytest.raises(CassetteMiss):
+        player.exchange("gemini", "key", lambda: "live")
+    assert player.metrics()["exchanges"] == {"serper": 1}
+    assert (player.metrics()["replayed"], player.metrics()["misses"]) == (1, 1)
+    assert calls == [1]
+
+
+def test_flight_and_serper_calls_replay_offline(cassette_path, monkeypatch, tmp_path):
+    class OffersSearch:
+        def get(self, **params):
+            return type("Response", (), {"data": [{"id": "1", "price": {"total": "400.00"}}]})()
+
+    class Response:
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return {"organic": [{"title": "Hawker guide", "link": "https://example.org/hawker", "snippet": "Eat"}]}
+
+    tool = FlightSearch(cache=TwoTierCache("flight_offers", path=str(tmp_path / "cache.sqlite"), ttl=60, enabled=False))
+    monkeypatch.setattr(tool._client.shopping, "flight_offers_search", OffersSearch(), raising=False)
+    monkeypatch.setattr("travel_planner.research.get_http_client", lambda: type("C", (), {"post": lambda *a, **k: Response()})())
+    recorder = Cassette(cassette_path, mode="record")
+    use_cassette(recorder)
+    offers = tool.search("MEL", "BLR", "2030-01-02")
+    results = serper_search("Singapore food", "secret-key")
+    recorder.save()
+
+    class Offline:
+        def get(self, **params):
+            raise AssertionError("Amadeus called during replay")
+
+    monkeypatch.setattr(tool._client.shopping, "flight_offers_search", Offline(), raising=False)
+    monkeypatch.setattr("travel_planner.research.get_http_client", lambda: pytest.fail("Serper called during replay"))
+    use_cassette(Cassette(cassette_path, mode="replay", latency_scale=0))
+    assert tool.search("MEL", "BLR", "2030-01-02") == offers
+    assert serper_search("Singapore food", "another-key") == results
+    assert "secret-key" not in gzip.open(cassette_path, "rt").read()
+
+
+def test_every_project_script_has_an_entry_point():
+    scripts = (Path(__file__).parent.parent / "pyproject.toml").read_text().split("[project.scripts]")[1]
+    targets = re.findall(r'^\w+ = "([\w.]+:\w+)"', scripts, re.M)
+    assert len(targets) >= 5
+    for target in targets:
+        module, name = target.split(":")
+        assert callable(getattr(import_module(module), name)), target
@@ -0,0 +1,50 @@
+# tests/test_crew_pool.py
+import threading
+
+import pytest
+
+from travel_planner.crew_pool import CrewPool, PoolSaturated
+
+
+def test_lease_returns_distinct_crews_and_recycles_them():
+    built = []
+    pool = CrewPool(lambda: built.append(object()) or built[-1], size=2, max_waiting=0)
+    with pool.lease() as first, pool.lease() as second:
+        assert first is not second
+        assert pool.metrics()["leased"] == 2
+    with pool.lease() as again:
+        assert again in built
+    assert len(built) == 2
+    assert pool.metrics()["leases"] == 3
+
+
+def test_full_queue_is_rejected_with_429():
+    pool = CrewPool(object, size=1, max_waiting=0)
+    with pool.lease():
+        with pytest.raises(PoolSaturated) as exc:
+            with pool.lease():
+                pass
+    assert exc.value.status_code == 429
+    assert exc.value.retry_after >= 1
+
+
+def test_waiting_too_long_is_rejected_with_503():
+    pool = CrewPool(object, size=1, max_waiting=4, acquire_timeout=0.05)
+    holding = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with pool.lease():
+            holding.set()
+            release.wait(1)
+
+    worker = threading.Thread(target=hold)
+    worker.start()
+    holding.wait(1)
+    with pytest.raises(PoolSaturated) as exc:
+        with pool.lease():
+            pass
+    release.set()
+    worker.join()
+    assert exc.value.status_code == 503
+    assert pool.metrics()["rejected_timeout"] == 1
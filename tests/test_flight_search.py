@@ -0,0 +1,163 @@
+# tests/test_flight_search.py
+import threading
+import time
+
+import pytest
+
+from travel_planner.cache import TwoTierCache
+from travel_planner.tools.flight_search import FlightFilters, FlightSearch, date_window, merge_offers, offer_price
+from travel_planner.tools.scoring import parse_price
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+
+class FakeOffersSearch:
+    def __init__(self):
+        self.calls = []
+
+    def get(self, **params):
+        self.calls.append(params)
+        return FakeResponse([{"id": str(len(self.calls)), "price": {"total": "400.00"}}])
+
+
+@pytest.fixture
+def flight_tool(monkeypatch, tmp_path):
+    monkeypatch.setenv("AMADEUS_CLIENT_ID", "test")
+    monkeypatch.setenv("AMADEUS_CLIENT_SECRET", "test")
+    cache = TwoTierCache("flight_offers", path=str(tmp_path / "cache.sqlite"), ttl=60)
+    tool = FlightSearch(cache=cache)
+    search = FakeOffersSearch()
+    monkeypatch.setattr(tool._client.shopping, "flight_offers_search", search, raising=False)
+    return tool, search
+
+
+def test_repeat_search_is_served_from_cache(flight_tool):
+    tool, search = flight_tool
+    first = tool.search("MEL", "BLR", "2025-08-01")
+    second = tool.search(" mel", "blr ", "2025-08-01")
+    assert first == second
+    assert len(search.calls) == 1
+    assert tool.cache.metrics()["memory_hits"] == 1
+
+
+def test_bypass_refreshes_cache(flight_tool):
+    tool, search = flight_tool
+    tool.search("MEL", "BLR", "2025-08-01")
+    refreshed = tool.search("MEL", "BLR", "2025-08-01", bypass_cache=True)
+    assert len(search.calls) == 2
+    assert tool.search("MEL", "BLR", "2025-08-01") == refreshed
+
+
+def test_concurrent_identical_misses_share_one_amadeus_call(flight_tool, monkeypatch):
+    tool, search = flight_tool
+    slow_get = search.get
+
+    def get(**params):
+        time.sleep(0.2)
+        return slow_get(**params)
+
+    monkeypatch.setattr(search, "get", get)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(tool.search("MEL", "BLR", "2025-08-01")))
+               for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(search.calls) == 1
+    assert results == [results[0]] * 4
+
+
+def test_disk_tier_is_shared_and_expires(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    writer = TwoTierCache("ns", path=path, ttl=0.05)
+    writer.set("k", [1, 2, 3])
+    reader = TwoTierCache("ns", path=path, ttl=0.05)
+    assert reader.get("k") == [1, 2, 3]
+    assert reader.stats["disk_hits"] == 1
+    time.sleep(0.1)
+    assert TwoTierCache("ns", path=path).get("k") is None
+
+
+def test_disk_tier_evicts_least_recently_used(tmp_path):
+    cache = TwoTierCache("ns", path=str(tmp_path / "cache.sqlite"), max_bytes=64)
+    cache.set("a", "x" * 20)
+    cache.set("b", "y" * 20)
+    cache.set("c", "z" * 20)
+    assert cache.metrics()["disk_bytes"] <= 64
+    assert cache.stats["evictions"] >= 1
+
+
+def _offer(offer_id, price, flight_number, at="2025-08-01T10:00:00"):
+    return {
+        "id": offer_id,
+        "price": {"grandTotal": price},
+        "itineraries": [{"segments": [{
+            "carrierCode": "SQ", "number": flight_number,
+            "departure": {"iataCode": "MEL", "at": at},
+        }]}],
+    }
+
+
+def test_merge_offers_keeps_cheapest_copy_of_each_journey():
+    merged = merge_offers([
+        [_offer("1", "500.00", "218"), _offer("2", "450.00", "208")],
+        [_offer("3", "480.00", "218")],
+    ])
+    assert [o["id"] for o in merged] == ["2", "3"]
+
+
+def test_merge_and_ranking_read_the_same_price():
+    # total and grandTotal can differ (e.g. fees); merging must compare the price ranking uses
+    offer = {"id": "1", "price": {"total": "400.00", "grandTotal": "430.00"}}
+    assert offer_price(offer) == parse_price(offer) == 400.0
+    assert offer_price({"id": "2", "price": {}}) == float("inf")
+
+
+def test_run_fans_out_over_airports_and_dates(flight_tool, monkeypatch):
+    tool, search = flight_tool
+    monkeypatch.setattr(
+        "travel_planner.tools.flight_search.date_window",
+        lambda date, flex_days: ["2030-01-01", "2030-01-02", "2030-01-03"][: 2 * flex_days + 1],
+    )
+    tool._run("LHR,LGW", "BLR", "2030-01-02", flex_days=1)
+    queried = {(c["originLocationCode"], c["departureDate"]) for c in search.calls}
+    assert len(search.calls) == 6
+    assert ("LGW", "2030-01-03") in queried
+
+
+def test_fanout_beyond_the_cap_is_counted_and_logged(flight_tool, caplog):
+    tool, search = flight_tool
+    origins = ["MEL", "SYD", "AVV", "PER", "ADL", "BNE", "CBR"]
+    dates = [f"2030-01-{day:02d}" for day in range(1, 10)]
+    tool.search_many(origins, ["BLR"], dates)
+    # 7 origins x 9 days is 63 queries, three over the cap
+    assert len(search.calls) == 60
+    assert tool.metrics() == {"fanouts": 1, "queries_dropped": 3}
+    assert "3 not searched" in caplog.text
+
+
+def test_date_window_skips_past_days():
+    assert date_window("2000-01-02", 1) == ["2000-01-02"]
+    assert date_window("2999-01-02", 1) == ["2999-01-02", "2999-01-01", "2999-01-03"]
+
+
+def test_filters_are_pushed_down_and_rechecked(flight_tool):
+    tool, search = flight_tool
+    filters = FlightFilters.build(max_price=399.5, preferred_airlines=["Any", "Singapore Airlines"], max_stops=1)
+    offers = tool.search("MEL", "BLR", "2025-08-01", filters=filters)
+    params = search.calls[0]
+    assert params["maxPrice"] == 400
+    assert params["includedAirlineCodes"] == "SQ"
+    assert "nonStop" not in params
+    # the fake offer costs 400.00 and has no segments, so the local re-check drops it
+    assert offers == []
+
+
+def test_filters_accept_matching_offer():
+    offer = _offer("1", "350.00", "218")
+    assert FlightFilters.build(max_price=400, preferred_airlines=["SQ"], non_stop=True).accepts(offer)
+    assert not FlightFilters.build(preferred_airlines=["Emirates"]).accepts(offer)
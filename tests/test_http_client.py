@@ -0,0 +1,96 @@
+# tests/test_http_client.py
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from travel_planner.http_client import HttpClient
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    hits = {}
+    connections = 0
+
+    def setup(self):
+        type(self).connections += 1
+        super().setup()
+
+    def do_GET(self):
+        hits = type(self).hits
+        hits[self.path] = hits.get(self.path, 0) + 1
+        if self.path == "/slow":
+            time.sleep(0.2)
+        status = 503 if self.path == "/flaky" and hits[self.path] == 1 else 200
+        body = f"{self.path} #{hits[self.path]}".encode()
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    Handler.hits = {}
+    Handler.connections = 0
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_sequential_requests_reuse_one_connection(server):
+    client = HttpClient()
+    for _ in range(5):
+        assert client.get(f"{server}/page").status_code == 200
+    assert Handler.connections == 1
+    assert client.metrics()[server[len("http://"):]]["requests"] == 5
+
+
+def test_concurrent_identical_requests_share_one_round_trip(server):
+    client = HttpClient()
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(client.get(f"{server}/slow").text))
+               for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert Handler.hits["/slow"] == 1
+    assert results == ["/slow #1"] * 5
+    assert client.metrics()[server[len("http://"):]]["single_flight_shared"] == 4
+
+
+def test_requests_with_different_headers_are_not_collapsed(server):
+    client = HttpClient()
+    threads = [threading.Thread(target=client.get, args=(f"{server}/slow",), kwargs={"headers": headers})
+               for headers in ({}, {"If-None-Match": '"v1"'})]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert Handler.hits["/slow"] == 2
+
+
+def test_retryable_status_is_retried_with_backoff(server):
+    client = HttpClient(backoff=0.01, jitter=0.01)
+    response = client.get(f"{server}/flaky")
+    assert response.status_code == 200
+    assert response.text == "/flaky #2"
+    assert client.metrics()[server[len("http://"):]]["retries"] == 1
+
+
+def test_environment_is_trusted_unless_opted_out(monkeypatch):
+    monkeypatch.delenv("HTTP_TRUST_ENV", raising=False)
+    assert HttpClient.from_env().session.trust_env is True
+    monkeypatch.setenv("HTTP_TRUST_ENV", "false")
+    monkeypatch.setenv("HTTPS_PROXY", "http://proxy.example:3128")
+    client = HttpClient.from_env()
+    assert client.session.trust_env is False
+    assert client.session.proxies["https"] == "http://proxy.example:3128"
@@ -0,0 +1,68 @@
+# tests/test_itinerary_store.py
+from travel_planner import pipeline, precompute
+from travel_planner.itinerary_store import ItineraryStore
+from travel_planner.tools.local_guide_tools import HubItineraryTool, ScrapeWebsiteToolWrapper
+
+
+def test_bundled_store_replaces_hardcoded_fallbacks():
+    tool = ScrapeWebsiteToolWrapper()
+    assert "Victoria Peak" in tool._get_fallback_content("https://guides.test/hong-kong/", error="timeout")
+    assert "Opera House" in tool._get_fallback_content("https://www.sydney.test/things-to-do")
+    assert "Stopover City" in tool._get_fallback_content("https://unknown.test/")
+
+
+def test_lookup_prefers_exact_then_closest_interests(tmp_path):
+    store = ItineraryStore(path=str(tmp_path / "store.json"))
+    store.put("SIN", ["🍽️ Food & Dining", "🏛️ Culture & History"], "food and culture")
+    store.put("sin", ["Shopping"], "shopping")
+    store.put("SIN", [], "general")
+
+    assert store.lookup("SIN", ["culture & history", "food & dining"])["text"] == "food and culture"
+    assert store.lookup("SIN", ["culture & history", "food & dining"])["match"] == "exact"
+    partial = store.lookup("SIN", ["food & dining", "wine & nightlife"])
+    assert (partial["text"], partial["match"]) == ("food and culture", "partial")
+    assert store.lookup("SIN", ["adventure & sports"])["text"] == "general"
+    assert store.lookup("DXB", ["shopping"]) is None
+
+
+def test_store_round_trips_through_disk(tmp_path):
+    path = str(tmp_path / "store.json")
+    store = ItineraryStore(path=path)
+    store.put("DOH", ["culture & history"], "Museum of Islamic Art", name="Doha")
+    store.save()
+    reloaded = ItineraryStore(path=path)
+    assert reloaded.lookup("DOH", ["🏛️ Culture & History"])["text"] == "Museum of Islamic Art"
+    assert reloaded.find_city("https://visit.test/doha-stopover") == "DOH"
+
+
+def test_hub_tool_answers_from_store():
+    output = HubItineraryTool()._run("HKG", ["Food & Dining", "Culture & History"])
+    assert output.startswith("Precomputed itinerary for HKG:")
+    assert "research it live" in HubItineraryTool()._run("ZZZ")
+
+
+def test_exact_precomputed_hit_skips_the_city_crew(monkeypatch):
+    import travel_planner.crew as crew_module
+    kickoffs = []
+    monkeypatch.setattr(type(crew_module.city_crew), "kickoff",
+                        lambda self, inputs=None, **kw: kickoffs.append(inputs["city"]) or {"raw": "live"})
+    routes = [{"id": "1", "stopover_city": "HKG"}, {"id": "2", "stopover_city": "KUL"}]
+    itineraries = pipeline.plan_itineraries(routes, {"interests": ["🍽️ Food & Dining", "🏛️ Culture & History"]})
+    assert kickoffs == ["KUL"]
+    assert "Victoria Peak" in itineraries[0]["itinerary"]
+    assert itineraries[1]["itinerary"] == "live"
+
+
+def test_precompute_fills_missing_pairs_only(monkeypatch, tmp_path):
+    import travel_planner.crew as crew_module
+    calls = []
+    monkeypatch.setattr(type(crew_module.city_crew), "kickoff",
+                        lambda self, inputs=None, **kw: calls.append(inputs) or {"raw": f"{inputs['city_name']} plan"})
+    store = ItineraryStore(path=str(tmp_path / "store.json"))
+    combos = [["food & dining"], []]
+    assert precompute.precompute(store, {"SIN": "Singapore"}, combos) == 2
+    assert precompute.precompute(store, {"SIN": "Singapore"}, combos) == 0
+    assert calls[0]["interests"] == "food & dining"
+    # the freshness checks are not plans served from the store
+    assert store.metrics()["exact_hits"] == store.metrics()["misses"] == 0
+    assert store.lookup("SIN", ["food & dining"])["text"] == "Singapore plan"
@@ -0,0 +1,100 @@
+# tests/test_jobs.py
+import threading
+import time
+
+import pytest
+
+from travel_planner.crew_pool import PoolSaturated
+from travel_planner.jobs import JobManager
+
+
+def test_identical_in_flight_requests_share_a_job():
+    release = threading.Event()
+    calls = []
+
+    def runner(inputs, mode, use_cache):
+        calls.append(inputs)
+        release.wait(1)
+        return {"raw": "plan"}
+
+    manager = JobManager(runner, max_workers=2, ttl=60)
+    first, created_first = manager.submit({"origin": "MEL", "destination": "BLR"})
+    second, created_second = manager.submit({"destination": "BLR", "origin": "MEL"})
+    assert created_first and not created_second
+    assert first is second
+
+    release.set()
+    assert first.wait(1)
+    assert len(calls) == 1
+    assert manager.get(first.id).result == {"raw": "plan"}
+
+    third, created_third = manager.submit({"origin": "MEL", "destination": "BLR"})
+    assert created_third and third.id != first.id
+
+
+def test_finished_jobs_expire_after_ttl():
+    manager = JobManager(lambda inputs, mode, use_cache: {}, max_workers=1, ttl=0.01)
+    job, _ = manager.submit({"origin": "MEL"})
+    assert job.wait(1)
+    time.sleep(0.05)
+    assert manager.get(job.id) is None
+    assert manager.metrics()["expired"] == 1
+
+
+def test_submissions_beyond_max_pending_are_rejected_with_retry_after():
+    release = threading.Event()
+    manager = JobManager(lambda inputs, mode, use_cache: release.wait(1) and {}, max_workers=1, ttl=60,
+                         max_pending=2, retry_after=7)
+    manager.submit({"origin": "MEL"})
+    manager.submit({"origin": "SYD"})
+    # a duplicate of a pending job is still attached rather than rejected
+    _, created = manager.submit({"origin": "MEL"})
+    assert not created
+
+    with pytest.raises(PoolSaturated) as excinfo:
+        manager.submit({"origin": "PER"})
+    assert excinfo.value.status_code == 429 and excinfo.value.retry_after == 7
+    assert manager.metrics()["rejected"] == 1
+
+    release.set()
+    manager.shutdown()
+
+
+def test_use_cache_reaches_the_runner_and_fresh_requests_get_a_fresh_job():
+    release = threading.Event()
+    calls = []
+
+    def runner(inputs, mode, use_cache):
+        calls.append(use_cache)
+        release.wait(1)
+        return {}
+
+    manager = JobManager(runner, max_workers=3, ttl=60)
+    cached, _ = manager.submit({"origin": "MEL"})
+    fresh, created = manager.submit({"origin": "MEL"}, use_cache=False)
+    # a cached plan must not answer a request for a fresh one
+    assert created and fresh is not cached
+    # but a fresh plan in flight answers fresh and cached requests alike
+    assert manager.submit({"origin": "MEL"}, use_cache=False) == (fresh, False)
+    manager.submit({"origin": "SYD"}, use_cache=False)
+    assert manager.submit({"origin": "SYD"})[1] is False
+
+    release.set()
+    assert cached.wait(1) and fresh.wait(1)
+    assert sorted(calls) == [False, False, True]
+
+
+def test_equivalent_requests_share_a_job(monkeypatch):
+    monkeypatch.setenv("PIPELINE_MODE", "fast")
+    release = threading.Event()
+    manager = JobManager(lambda inputs, mode, use_cache: release.wait(1) and {}, max_workers=1, ttl=60)
+    first, _ = manager.submit({"origin": "MEL", "destination": "BLR", "interests": ["food", "culture"]})
+    # upper-case codes, reordered interests and the default mode sent explicitly are the same plan
+    second, created = manager.submit({"origin": "mel", "destination": "BLR", "interests": ["culture", "food"]},
+                                     "fast")
+    assert not created and second is first
+    _, created = manager.submit({"origin": "MEL", "destination": "BLR", "interests": ["food"]}, "crew")
+    assert created
+
+    release.set()
+    manager.shutdown()
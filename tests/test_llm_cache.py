@@ -0,0 +1,79 @@
+# tests/test_llm_cache.py
+import pytest
+from crewai import LLM
+
+from travel_planner.cache import TwoTierCache
+from travel_planner.cassette import Cassette, CassetteMiss, use_cassette
+from travel_planner.llm_cache import CachedLLM, LLMCacheMiss
+
+
+@pytest.fixture
+def model_calls(monkeypatch):
+    calls = []
+
+    def fake_call(self, messages, tools=None, callbacks=None, available_functions=None,
+                  from_task=None, from_agent=None):
+        calls.append(messages)
+        return f"answer {len(calls)}"
+
+    monkeypatch.setattr(LLM, "call", fake_call)
+    return calls
+
+
+def make_llm(**kwargs):
+    return CachedLLM(model="gemini/gemini-1.5-flash", api_key="test",
+                     cache=TwoTierCache("llm-test", path=None, ttl=None), **kwargs)
+
+
+def test_identical_prompt_is_served_from_cache(model_calls):
+    llm = make_llm()
+    messages = [{"role": "user", "content": "Plan a day in Singapore"}]
+    assert llm.call(messages) == "answer 1"
+    assert llm.call(list(messages)) == "answer 1"
+    assert len(model_calls) == 1
+    metrics = llm.metrics()
+    assert metrics["hits"] == 1 and metrics["misses"] == 1
+
+
+def test_parameters_are_part_of_the_key(model_calls):
+    cache = TwoTierCache("llm-test", path=None, ttl=None)
+    precise = CachedLLM(model="gemini/gemini-1.5-flash", api_key="a", cache=cache, temperature=0.0)
+    creative = CachedLLM(model="gemini/gemini-1.5-flash", api_key="b", cache=cache, temperature=0.9)
+    precise.call("hello")
+    creative.call("hello")
+    assert len(model_calls) == 2
+    # credentials do not change the answer, so they do not change the key
+    same = CachedLLM(model="gemini/gemini-1.5-flash", api_key="c", cache=cache, temperature=0.0)
+    assert same.call("hello") == "answer 1"
+
+
+def test_tool_executing_calls_bypass_cache(model_calls):
+    llm = make_llm()
+    tools = [{"name": "flight_search"}]
+    llm.call("search", tools=tools, available_functions={"flight_search": print})
+    llm.call("search", tools=tools, available_functions={"flight_search": print})
+    assert len(model_calls) == 2
+    assert llm.metrics()["bypassed"] == 2
+
+
+def test_replay_mode_raises_on_unrecorded_prompt(model_calls):
+    llm = make_llm(replay=True)
+    with pytest.raises(LLMCacheMiss):
+        llm.call("never recorded")
+    assert model_calls == []
+
+
+def test_replaying_cassette_answers_llm_cache_misses(model_calls, tmp_path):
+    recorder = Cassette(tmp_path / "cassette.json.gz", mode="record")
+    use_cassette(recorder)
+    try:
+        make_llm().call("recorded")
+        recorder.save()
+        use_cassette(Cassette(recorder.path, mode="replay", latency=0))
+        llm = make_llm(replay=True)
+        assert llm.call("recorded") == "answer 1"
+        with pytest.raises(CassetteMiss):
+            llm.call("never recorded")
+    finally:
+        use_cassette(None)
+    assert len(model_calls) == 1
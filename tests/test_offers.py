@@ -0,0 +1,83 @@
+# tests/test_offers.py
+from travel_planner.events import EventStream, bind_stream
+from travel_planner.offers import OfferRecord, compact_offers, get_offer_registry, offers_table, track_savings
+from travel_planner.tools.stopover_evaluator import StopoverEvaluator
+
+
+def amadeus_offer(offer_id, price, hub=None):
+    """An offer shaped like a real Amadeus response, fare rules and baggage included"""
+    stops = [hub, "BLR"] if hub else ["BLR"]
+    segments, origin = [], "MEL"
+    for n, arrival in enumerate(stops):
+        segments.append({
+            "departure": {"iataCode": origin, "terminal": "2", "at": f"2030-01-01T{8 + 6 * n:02d}:15:00"},
+            "arrival": {"iataCode": arrival, "at": f"2030-01-01T{12 + 6 * n:02d}:40:00"},
+            "carrierCode": "SQ", "number": f"{200 + n}{offer_id}", "aircraft": {"code": "359"},
+            "operating": {"carrierCode": "SQ"}, "duration": "PT4H25M", "id": str(n), "numberOfStops": 0,
+            "blacklistedInEU": False,
+        })
+        origin = arrival
+    return {
+        "type": "flight-offer", "id": offer_id, "source": "GDS", "instantTicketingRequired": False,
+        "nonHomogeneous": False, "oneWay": False, "lastTicketingDate": "2029-12-20", "numberOfBookableSeats": 9,
+        "itineraries": [{"duration": "PT16H25M", "segments": segments}],
+        "price": {"currency": "EUR", "total": price, "base": "300.00", "grandTotal": price,
+                  "fees": [{"amount": "0.00", "type": "SUPPLIER"}, {"amount": "0.00", "type": "TICKETING"}]},
+        "pricingOptions": {"fareType": ["PUBLISHED"], "includedCheckedBagsOnly": True},
+        "validatingAirlineCodes": ["SQ"],
+        "travelerPricings": [{
+            "travelerId": "1", "fareOption": "STANDARD", "travelerType": "ADULT",
+            "price": {"currency": "EUR", "total": price, "base": "300.00"},
+            "fareDetailsBySegment": [{
+                "segmentId": str(n), "cabin": "ECONOMY", "fareBasis": "K14AUO", "brandedFare": "LITE",
+                "class": "K", "includedCheckedBags": {"weight": 25, "weightUnit": "KG"},
+            } for n in range(len(segments))],
+        }],
+    }
+
+
+def test_record_keeps_only_what_agents_use():
+    record = OfferRecord.from_offer(amadeus_offer("1", "512.30", "SIN"))
+    assert record.row().split("|")[1:] == ["512.3", "MEL", "BLR", "2030-01-01T08:15", "2030-01-01T18:40",
+                                           "16.4", "1", "SIN", "SQ"]
+    assert not hasattr(record, "__dict__")
+
+
+def test_table_respects_token_budget_cheapest_first():
+    records = [OfferRecord.from_offer(amadeus_offer(str(i), f"{900 - i}.00", "SIN")) for i in range(30)]
+    table = offers_table(records, token_budget=120)
+    lines = table.splitlines()
+    assert lines[0].startswith("ref|eur")
+    assert lines[1].split("|")[1] == "871"
+    assert lines[-1].startswith("(+") and len(lines) < 30
+
+
+def test_compact_offers_reports_savings_and_resolves_refs():
+    offers = [amadeus_offer("1", "512.30", "SIN"), amadeus_offer("2", "480.00", "HKG"), amadeus_offer("3", "700.00")]
+    stream = EventStream()
+    with bind_stream(stream), track_savings() as savings:
+        table, report = compact_offers(offers)
+    stream.close()
+
+    assert report["rows"] == 3 and report["compact_tokens"] * 5 < report["raw_tokens"]
+    assert savings["raw_bytes"] == report["raw_bytes"]
+    assert [e["event"] for e in stream] == ["context_savings"]
+    assert table.startswith("search S") and table.splitlines()[1].startswith("ref|eur")
+    # the table's search handle stands for the whole result set, in search order
+    assert get_offer_registry().resolve(table) == offers
+    assert get_offer_registry().resolve(" ".join(line[:9] for line in table.splitlines()[2:])) == [
+        offers[1], offers[0], offers[2]]
+
+    routes = StopoverEvaluator()._run(table, [])
+    assert [r["id"] for r in routes] == ["2", "1"]
+    assert StopoverEvaluator()._run([routes[1]["ref"]], [])[0]["id"] == "1"
+
+
+def test_evaluator_ranks_offers_the_table_budget_left_out():
+    offers = [amadeus_offer(str(i), f"{500 + i}.00") for i in range(30)]
+    offers.append(amadeus_offer("via-sin", "515.00", "SIN"))
+    table, report = compact_offers(offers, token_budget=120)
+    assert "SIN" not in table and report["rows"] < len(offers)
+
+    routes = StopoverEvaluator()._run(table, ["Singapore"])
+    assert routes[0]["id"] == "via-sin"
@@ -0,0 +1,68 @@
+# tests/test_passages.py
+from travel_planner import research as research_module
+from travel_planner.passages import PassageIndex, chunk_text, estimate_tokens, get_passage_store
+
+FOOD_PAGE = ("Cookie policy Accept all Home Deals Login " * 10
+             + "Singapore hawker centres serve chicken rice and laksa, the best street food in Asia. "
+             + "Maxwell Food Centre and Lau Pa Sat are the classic hawker stops for dinner. " * 3)
+MUSEUM_PAGE = "The National Museum and the Asian Civilisations Museum cover Singapore history and culture. " * 5
+
+
+def test_chunks_overlap():
+    chunks = chunk_text(" ".join(str(i) for i in range(100)), words=40, overlap=10)
+    assert chunks[0].split()[-10:] == chunks[1].split()[:10]
+    assert chunks[-1].split()[-1] == "99"
+
+
+def test_search_ranks_relevant_passages_first():
+    index = PassageIndex()
+    index.add("https://food.test", FOOD_PAGE)
+    index.add("https://museum.test", MUSEUM_PAGE)
+    food = index.search("food & dining street food", k=2)
+    assert food[0]["source"] == "https://food.test"
+    assert "hawker" in food[0]["text"]
+    assert index.search("history culture", k=1)[0]["source"] == "https://museum.test"
+
+
+def test_search_respects_token_budget():
+    index = PassageIndex()
+    index.add("https://museum.test", MUSEUM_PAGE)
+    index.add("https://food.test", FOOD_PAGE)
+    results = index.search("singapore museum food hawker", k=10, token_budget=150)
+    assert results
+    assert sum(estimate_tokens(r["text"]) for r in results) <= 150
+
+
+def test_re_adding_a_source_replaces_its_passages():
+    index = PassageIndex()
+    index.add("https://food.test", FOOD_PAGE)
+    before = len(index)
+    index.add("https://food.test", FOOD_PAGE)
+    assert len(index) == before
+    index.add("https://food.test", "Closed for renovation")
+    assert index.search("hawker") == []
+
+
+def test_city_notes_are_built_once_and_kept_across_requests(monkeypatch):
+    searches, fetched = [], []
+
+    class FakePages:
+        def get_many(self, urls, deadline=15):
+            fetched.extend(urls)
+            return [{"url": u, "status": "ok", "text": FOOD_PAGE} for u in urls]
+
+    monkeypatch.setattr(research_module, "serper_search",
+                        lambda q, key, num=5: searches.append(q) or [
+                            {"title": "Eat in Singapore", "link": "https://food.test", "snippet": "Hawker guide"}])
+    monkeypatch.setattr(research_module, "get_page_cache", FakePages)
+    research_module.get_research_cache().clear()
+
+    first = research_module.city_research_notes("XSP", ["🍽️ Food & Dining"], api_key="test")
+    second = research_module.city_research_notes("xsp", ["🍽️ Food & Dining"], api_key="test")
+    research_module.city_research_notes("XSP", ["🏛️ Culture & History"], api_key="test")
+    assert "hawker" in first.lower()
+    assert first == second
+    # one interest-independent search serves every traveller
+    assert searches == [research_module.research_query("XSP")]
+    assert fetched == ["https://food.test"]
+    assert len(get_passage_store().index("XSP")) > 0
@@ -0,0 +1,68 @@
+# tests/test_pipeline.py
+import threading
+import time
+
+import pytest
+
+from travel_planner import pipeline
+
+ROUTES = [
+    {"id": "1", "price": 400.0, "stopover_city": "SIN", "score": 380.0},
+    {"id": "2", "price": 420.0, "stopover_city": "KUL", "score": 400.0},
+    {"id": "3", "price": 430.0, "stopover_city": "SIN", "score": 410.0},
+    {"id": "4", "price": 450.0, "stopover_city": None, "score": 450.0},
+]
+
+
+def test_stopover_cities_are_distinct_and_in_rank_order():
+    assert pipeline.stopover_cities(ROUTES) == {"SIN": ["1", "3"], "KUL": ["2"]}
+
+
+@pytest.fixture
+def city_kickoffs(monkeypatch):
+    import travel_planner.crew as crew_module
+    calls = []
+    lock = threading.Lock()
+    running = {"now": 0, "peak": 0, "barrier": None}
+
+    def kickoff(self, inputs=None, **kwargs):
+        with lock:
+            calls.append(inputs["city"])
+            running["now"] += 1
+            running["peak"] = max(running["peak"], running["now"])
+        if running["barrier"] is not None:
+            # every city must be in flight at once; a sequential fan-out breaks the barrier
+            running["barrier"].wait(timeout=5)
+        # later-ranked city finishes first to prove the merge keeps rank order
+        time.sleep(0.05 if inputs["city"] == "SIN" else 0)
+        with lock:
+            running["now"] -= 1
+        if inputs["city"] == "DXB":
+            raise RuntimeError("search quota exceeded")
+        return {"raw": f"Day in {inputs['city']}"}
+
+    monkeypatch.setattr(type(crew_module.city_crew), "kickoff", kickoff)
+    return calls, running
+
+
+def test_itineraries_run_concurrently_and_merge_in_rank_order(city_kickoffs):
+    calls, running = city_kickoffs
+    running["barrier"] = threading.Barrier(2)
+    itineraries = pipeline.plan_itineraries(ROUTES, {"origin": "MEL", "destination": "BLR"})
+
+    assert sorted(calls) == ["KUL", "SIN"]
+    assert running["peak"] == 2
+    assert not running["barrier"].broken
+    assert all(i["itinerary"] for i in itineraries)
+    assert [i["city"] for i in itineraries] == ["SIN", "KUL"]
+    assert itineraries[0]["route_ids"] == ["1", "3"]
+    assert pipeline.merge_itineraries(itineraries) == "## Stopover in SIN\n\nDay in SIN\n\n## Stopover in KUL\n\nDay in KUL"
+
+
+def test_failed_city_does_not_lose_the_others(city_kickoffs):
+    routes = ROUTES + [{"id": "5", "price": 500.0, "stopover_city": "DXB", "score": 500.0}]
+    itineraries = pipeline.plan_itineraries(routes, {})
+    assert itineraries[-1]["city"] == "DXB"
+    assert itineraries[-1]["itinerary"] is None
+    assert "quota" in itineraries[-1]["error"]
+    assert itineraries[0]["itinerary"] == "Day in SIN"
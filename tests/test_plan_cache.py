@@ -0,0 +1,81 @@
+# tests/test_plan_cache.py
+import threading
+import time
+
+from travel_planner.cache import TwoTierCache
+from travel_planner.plan_cache import PlanCache, plan_key
+
+
+def make_cache(ttl=60, stale_ttl=600):
+    return PlanCache(TwoTierCache("plans-test", path=None, ttl=ttl + stale_ttl), ttl=ttl, stale_ttl=stale_ttl)
+
+
+def test_plan_key_ignores_order_case_and_emoji_labels():
+    a = {"origin": "mel", "destination": "BLR", "date": "2025-08-01",
+         "interests": ["🍽️ Food & Dining", "🏛️ Culture & History"]}
+    b = {"origin": "MEL", "destination": "blr ", "date": "2025-08-01",
+         "interests": ["culture & history", "Food & Dining", "food & dining"]}
+    assert plan_key(a, "crew") == plan_key(b, "crew")
+    assert plan_key(a, "crew") != plan_key(a, "fast")
+    assert plan_key(a, "crew") != plan_key({**a, "date": "2025-08-02"}, "crew")
+
+
+def test_hit_after_miss_skips_compute():
+    cache = make_cache()
+    calls = []
+    compute = lambda: calls.append(1) or {"raw": "plan"}
+    assert cache.get_or_compute("k", compute)[1]["status"] == "miss"
+    data, info = cache.get_or_compute("k", compute)
+    assert info["status"] == "hit"
+    assert data == {"raw": "plan"}
+    assert len(calls) == 1
+
+
+def test_stale_entry_is_served_and_refreshed_in_background():
+    cache = make_cache(ttl=0.05)
+    cache.get_or_compute("k", lambda: {"raw": "old"})
+    time.sleep(0.1)
+    data, info = cache.get_or_compute("k", lambda: {"raw": "new"})
+    assert info["status"] == "stale"
+    assert data == {"raw": "old"}
+    deadline = time.time() + 5
+    while cache.metrics()["refreshes"] < 1 and time.time() < deadline:
+        time.sleep(0.01)
+    assert cache.store.get("k")["data"] == {"raw": "new"}
+
+
+def test_concurrent_misses_share_one_computation():
+    cache = make_cache()
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return {"raw": "plan"}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute("k", compute)))
+               for _ in range(4)]
+    for t in threads:
+        t.start()
+    time.sleep(0.1)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert sorted(info["status"] for _, info in results) == ["coalesced"] * 3 + ["miss"]
+    assert all(data == {"raw": "plan"} for data, _ in results)
+
+
+def test_empty_or_failed_plans_are_not_stored():
+    cache = make_cache()
+    empty = {"mode": "fast", "offers_found": 0, "routes": [], "itinerary": None}
+    for _ in range(2):
+        data, info = cache.get_or_compute("empty", lambda: empty)
+        assert data == empty and info["status"] == "miss"
+    assert cache.get_or_compute("failed", lambda: {"raw": "", "error": "Amadeus unavailable"})[1]["status"] == "miss"
+    assert cache.get_or_compute("failed", lambda: {"raw": "plan"})[1]["status"] == "miss"
+    assert cache.get_or_compute("failed", lambda: {"raw": "plan"})[1]["status"] == "hit"
+    assert cache.metrics()["not_stored"] == 3
@@ -0,0 +1,85 @@
+# tests/test_prefetch.py
+import threading
+
+from travel_planner import research as research_module
+from travel_planner.passages import PassageStore
+from travel_planner.prefetch import ResearchPrefetcher, candidate_cities
+from travel_planner.research import get_research_cache, research_query, search_key
+
+
+def offer(offer_id, price, stopover):
+    segments = [{"arrival": {"iataCode": stopover}}] if stopover else []
+    segments.append({"arrival": {"iataCode": "BLR"}})
+    return {"id": offer_id, "price": {"total": str(price)}, "itineraries": [{"segments": segments}]}
+
+
+OFFERS = [offer("1", 500, "DXB"), offer("2", 400, "SIN"), offer("3", 410, "SIN"),
+          offer("4", 450, "KUL"), offer("5", 300, None)]
+
+
+def test_candidate_cities_follow_the_evaluator_ranking():
+    assert candidate_cities(OFFERS, [], 2) == ["SIN", "KUL"]
+    assert candidate_cities(OFFERS, [], 5) == ["SIN", "KUL", "DXB"]
+
+
+def test_prefetch_warms_what_the_research_notes_read(monkeypatch):
+    monkeypatch.setenv("SERPER_API_KEY", "test")
+    searches = []
+
+    def fake_search(query, api_key, num=5):
+        searches.append(query)
+        return [{"title": "Singapore street food guide", "link": "https://guide.test/a", "snippet": "Hawker food"}]
+
+    pages = []
+
+    class FakePages:
+        def get_many(self, urls, deadline=15):
+            pages.extend(urls)
+            return [{"url": url, "status": "ok", "text": "Hawker centres serve chicken rice and laksa. " * 5}
+                    for url in urls]
+
+    monkeypatch.setattr(research_module, "serper_search", fake_search)
+    monkeypatch.setattr(research_module, "get_page_cache", FakePages)
+    monkeypatch.setattr(research_module, "get_passage_store", lambda store=PassageStore(): store)
+    get_research_cache().clear()
+
+    prefetcher = ResearchPrefetcher(top_n=1)
+    handle = prefetcher.start(OFFERS, ["🍽️ Food & Dining"])
+    future, _ = handle._jobs["SIN"]
+    future.result(timeout=5)
+
+    assert searches == [research_query("SIN")]
+    assert pages == ["https://guide.test/a"]
+    # the notes for any traveller stopping there need no further search or page fetch
+    notes = research_module.city_research_notes("SIN", ["🍽️ Food & Dining"])
+    assert "guide.test/a" in notes
+    research_module.city_research_notes("SIN", ["🏛️ Culture & History"])
+    assert searches == [research_query("SIN")]
+    assert pages == ["https://guide.test/a"]
+    assert prefetcher.metrics()["completed"] == 1
+
+
+def test_keep_cancels_unchosen_cities(monkeypatch):
+    monkeypatch.setenv("SERPER_API_KEY", "test")
+    release = threading.Event()
+    searched = []
+
+    def slow_search(query, api_key, num=5):
+        release.wait(5)
+        searched.append(query)
+        return []
+
+    monkeypatch.setattr(research_module, "serper_search", slow_search)
+    monkeypatch.setattr(research_module, "get_passage_store", lambda store=PassageStore(): store)
+    get_research_cache().clear()
+
+    prefetcher = ResearchPrefetcher(top_n=3, max_workers=1)
+    handle = prefetcher.start(OFFERS, [])
+    assert handle.cities == ["SIN", "KUL", "DXB"]
+    assert handle.keep(["SIN"]) == ["KUL", "DXB"]
+    release.set()
+    handle._jobs["SIN"][0].result(timeout=5)
+
+    assert searched == [research_query("SIN")]
+    assert get_research_cache().get(search_key(research_query("KUL"))) is None
+    assert prefetcher.metrics()["cancelled"] == 2
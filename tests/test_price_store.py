@@ -0,0 +1,79 @@
+# tests/test_price_store.py
+import pytest
+from fastapi.testclient import TestClient
+
+from src.travel_planner import api as api_module
+from travel_planner import price_store as price_store_module
+from travel_planner.price_store import PriceStore
+
+
+def offer(price, carrier="SQ", segments=1):
+    return {"price": {"total": str(price)}, "validatingAirlineCodes": [carrier],
+            "itineraries": [{"segments": [{"carrierCode": carrier}] * segments}]}
+
+
+def test_calendar_returns_cheapest_fare_per_day(tmp_path):
+    store = PriceStore(path=str(tmp_path), compact_every=3)
+    store.append_offers("MEL", "BLR", "2030-01-02", [offer(500), offer(420, "MH", 2)], seen=1000)
+    store.append_offers("MEL", "BLR", "2030-01-01", [offer(610)], seen=2000)  # triggers compaction
+    store.append_offers("mel", "blr", "2030-01-02", [offer(450, "QF")], seen=3000)  # unsorted tail
+    store.append_offers("MEL", "SIN", "2030-01-01", [offer(10)])
+
+    calendar = store.fare_calendar("MEL", "BLR", "2030-01-01", days=3)
+    assert [day["price"] for day in calendar] == [610.0, 420.0, None]
+    assert calendar[1]["carrier"] == "MH" and calendar[1]["stops"] == 1
+    assert store.fare_calendar("MEL", "BLR", "2030-01-01", days=3, max_stops=0)[1]["price"] == 450.0
+    assert store.metrics()["compactions"] == 1 and store.metrics()["rows"] == 5
+
+
+def test_interrupted_write_is_repaired(tmp_path):
+    store = PriceStore(path=str(tmp_path))
+    store.append_offers("MEL", "BLR", "2030-01-01", [offer(500)])
+    with open(tmp_path / "MEL-BLR" / "price.f4", "ab") as fh:
+        fh.write(b"\0\0")
+    store.append_offers("MEL", "BLR", "2030-01-02", [offer(300)])
+    assert [d["price"] for d in store.fare_calendar("MEL", "BLR", "2030-01-01", days=2)] == [500.0, 300.0]
+
+
+def test_compaction_that_crashes_part_way_leaves_the_old_columns_in_use(monkeypatch, tmp_path):
+    store = PriceStore(path=str(tmp_path), compact_every=100)
+    for day, price in (("2030-01-03", 300), ("2030-01-01", 100), ("2030-01-02", 200)):
+        store.append_offers("MEL", "BLR", day, [offer(price)])
+    write = price_store_module._write_synced
+    written = []
+
+    def crash_after_two_columns(path, data):
+        if len(written) == 2:
+            raise OSError("disk full")
+        written.append(path)
+        write(path, data)
+
+    monkeypatch.setattr(price_store_module, "_write_synced", crash_after_two_columns)
+    with pytest.raises(OSError):
+        store.compact("MEL", "BLR")
+    # half the columns were sorted in the next generation, but the route never switched to it
+    assert [d["price"] for d in store.fare_calendar("MEL", "BLR", "2030-01-01", days=3)] == [100.0, 200.0, 300.0]
+
+    monkeypatch.setattr(price_store_module, "_write_synced", write)
+    assert store.compact("MEL", "BLR") == 3
+    store.append_offers("MEL", "BLR", "2030-01-01", [offer(90)])
+    assert store.compact("MEL", "BLR") == 4
+    route = tmp_path / "MEL-BLR"
+    assert (route / "CURRENT").read_text() == "2"
+    # the generation before the live one is gone, the one just replaced stays for open readers
+    assert sorted(p.name for p in route.iterdir()) == ["CURRENT", "g1", "g2"]
+    assert [d["price"] for d in store.fare_calendar("MEL", "BLR", "2030-01-01", days=3)] == [90.0, 200.0, 300.0]
+
+
+def test_fare_calendar_endpoint_reads_only_the_store(monkeypatch, tmp_path):
+    store = PriceStore(path=str(tmp_path))
+    store.append_offers("MEL", "BLR", "2030-03-05", [offer(380)])
+    monkeypatch.setattr(api_module, "get_price_store", lambda: store)
+    client = TestClient(api_module.app)
+
+    r = client.get("/fare-calendar", params={"origin": "mel", "destination": "BLR", "start": "2030-03-01", "days": 7})
+    assert r.status_code == 200
+    body = r.json()
+    assert len(body["days"]) == 7 and body["days_with_data"] == 1
+    assert body["cheapest"]["date"] == "2030-03-05" and body["cheapest"]["price"] == 380.0
+    assert client.get("/fare-calendar", params={"origin": "MEL", "destination": "Q1"}).status_code == 422
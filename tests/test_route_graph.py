@@ -0,0 +1,125 @@
+# tests/test_route_graph.py
+import pytest
+
+from travel_planner.cache import TwoTierCache
+from travel_planner.route_graph import LegIndex, k_shortest_routes, stopover_routes
+from travel_planner.tools.flight_search import FlightFilters, FlightSearch
+
+
+def leg(offer_id, origin, destination, depart, arrive, price, duration="PT8H", carrier="SQ"):
+    return {"id": offer_id, "price": {"total": str(price)},
+            "itineraries": [{"duration": duration, "segments": [
+                {"carrierCode": carrier, "departure": {"iataCode": origin, "at": depart},
+                 "arrival": {"iataCode": destination, "at": arrive}}]}]}
+
+
+LEGS = [
+    leg("a", "MEL", "SIN", "2030-01-01T10:00:00", "2030-01-01T15:00:00", 300),
+    leg("b", "MEL", "HKG", "2030-01-01T09:00:00", "2030-01-01T16:00:00", 250),
+    leg("c", "MEL", "BLR", "2030-01-01T08:00:00", "2030-01-01T20:00:00", 200),
+    leg("d", "SIN", "BLR", "2030-01-04T09:00:00", "2030-01-04T11:00:00", 150),
+    leg("e", "HKG", "BLR", "2030-01-04T09:00:00", "2030-01-04T13:00:00", 300),
+    leg("f", "SIN", "BLR", "2030-01-02T09:00:00", "2030-01-02T11:00:00", 50),
+]
+
+
+def index_of(offers):
+    index = LegIndex()
+    index.add_offers(offers)
+    return index
+
+
+def test_k_shortest_routes_combine_legs_with_the_requested_stay():
+    routes = k_shortest_routes(index_of(LEGS), ["MEL"], ["BLR"], ["2030-01-01"], k=3, min_stay=3, max_stay=3)
+    assert [(r["hubs"], r["price"], r["stay_days"]) for r in routes] == [
+        (["SIN"], 450.0, [3]),
+        (["HKG"], 550.0, [3]),
+    ]
+    assert [leg["id"] for leg in routes[0]["legs"]] == ["a", "d"]
+    assert routes[0]["cost"] == pytest.approx(450 + 2 * 8 * 5)
+
+
+def test_experience_bonus_and_connection_time():
+    index = index_of(LEGS + [leg("g", "SIN", "BLR", "2030-01-01T16:00:00", "2030-01-01T18:00:00", 10)])
+    bonus = {"HKG": 200.0}
+    routes = k_shortest_routes(index, ["MEL"], ["BLR"], ["2030-01-01"], k=1, min_stay=0, max_stay=3,
+                               bonus=lambda city: bonus.get(city, 0.0))
+    # g leaves SIN an hour after arrival, too tight; HKG's bonus outweighs SIN's cheaper fare
+    assert routes[0]["hubs"] == ["HKG"]
+
+
+def test_routes_over_max_price_do_not_take_the_k_places():
+    bonus = {"HKG": 400.0}
+    # HKG's bonus makes its €550 route the cheapest by cost, but it is over budget
+    routes = k_shortest_routes(index_of(LEGS), ["MEL"], ["BLR"], ["2030-01-01"], k=1, min_stay=3, max_stay=3,
+                               bonus=lambda city: bonus.get(city, 0.0), max_price=500)
+    assert [(r["hubs"], r["price"]) for r in routes] == [(["SIN"], 450.0)]
+
+
+def test_stale_legs_are_ignored():
+    index = LegIndex(max_age=0)
+    index.add_offers(LEGS)
+    assert k_shortest_routes(index, ["MEL"], ["BLR"], ["2030-01-01"], min_stay=3, max_stay=3) == []
+
+
+class LegSearch:
+    def __init__(self):
+        self.calls = []
+
+    def get(self, **params):
+        self.calls.append(params)
+        route = (params["originLocationCode"], params["destinationLocationCode"], params["departureDate"])
+        return type("Response", (), {"data": [o for o in LEGS if self.matches(o, route)]})()
+
+    @staticmethod
+    def matches(offer, route):
+        segment = offer["itineraries"][0]["segments"][0]
+        return (segment["departure"]["iataCode"], segment["arrival"]["iataCode"],
+                segment["departure"]["at"][:10]) == route
+
+
+def test_stopover_routes_only_search_single_legs(monkeypatch):
+    tool = FlightSearch(cache=TwoTierCache("flight_offers", path=None, ttl=60))
+    search = LegSearch()
+    monkeypatch.setattr(tool._client.shopping, "flight_offers_search", search, raising=False)
+    inputs = {"origin": "MEL", "destination": "BLR", "stopover_days": 3, "interests": []}
+
+    routes = stopover_routes(tool, inputs, ["SIN", "HKG"], ["2030-01-01"])
+    # MEL->SIN, MEL->HKG, then each hub -> BLR on day +3 and +4
+    assert len(search.calls) == 6
+    assert [r["stopover_city"] for r in routes] == ["SIN", "HKG"]
+    assert routes[0]["self_transfer"] and routes[0]["stopover_days"] == 3
+    assert routes[0]["summary"] == "Self-transfer MEL → SIN (3 days) → BLR: €450.0"
+    assert stopover_routes(tool, {**inputs, "stopover_days": 0}, ["SIN"], ["2030-01-01"]) == []
+
+
+def test_stopover_routes_apply_the_filters_to_every_leg(monkeypatch):
+    tool = FlightSearch(cache=TwoTierCache("flight_offers", path=None, ttl=60))
+    monkeypatch.setattr(tool._client.shopping, "flight_offers_search", LegSearch(), raising=False)
+    # cheaper legs another, unfiltered search left in the graph next to the ones searched here
+    index = index_of(LEGS + [
+        leg("x", "SIN", "BLR", "2030-01-04T10:00:00", "2030-01-04T12:00:00", 20, carrier="AI"),
+        {**leg("y", "MEL", "HKG", "2030-01-01T11:00:00", "2030-01-01T19:00:00", 30), "itineraries": [
+            {"duration": "PT9H", "segments": [
+                {"carrierCode": "SQ", "departure": {"iataCode": "MEL", "at": "2030-01-01T11:00:00"},
+                 "arrival": {"iataCode": "SIN", "at": "2030-01-01T15:00:00"}},
+                {"carrierCode": "SQ", "departure": {"iataCode": "SIN", "at": "2030-01-01T16:00:00"},
+                 "arrival": {"iataCode": "HKG", "at": "2030-01-01T19:00:00"}}]}]},
+    ])
+    inputs = {"origin": "MEL", "destination": "BLR", "stopover_days": 3, "interests": []}
+
+    unfiltered = stopover_routes(tool, inputs, ["SIN", "HKG"], ["2030-01-01"], index=index)
+    assert {"x", "y"} <= {leg["id"] for route in unfiltered for leg in route["legs"]}
+
+    filters = FlightFilters.build(preferred_airlines=["SQ"], non_stop=True)
+    routes = stopover_routes(tool, inputs, ["SIN", "HKG"], ["2030-01-01"], filters=filters, index=index)
+    assert [[leg["id"] for leg in r["legs"]] for r in routes] == [["a", "d"], ["b", "e"]]
+
+
+def test_stopover_routes_are_numbered_after_the_budget(monkeypatch):
+    tool = FlightSearch(cache=TwoTierCache("flight_offers", path=None, ttl=60))
+    monkeypatch.setattr(tool._client.shopping, "flight_offers_search", LegSearch(), raising=False)
+    inputs = {"origin": "MEL", "destination": "BLR", "stopover_days": 3, "interests": []}
+    filters = FlightFilters.build(max_price=500)
+    routes = stopover_routes(tool, inputs, ["SIN", "HKG"], ["2030-01-01"], filters=filters, index=index_of(LEGS))
+    assert [(r["id"], r["stopover_city"], r["price"]) for r in routes] == [("ST1", "SIN", 450.0)]
@@ -0,0 +1,188 @@
+# tests/test_scrape_cache.py
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from travel_planner import scrape_cache
+from travel_planner.cache import TwoTierCache
+from travel_planner.scrape_cache import PageCache, ScrapeFailed
+
+PAGE = b"<html><head><style>p {}</style></head><body><p>Gardens by the Bay</p><script>x()</script></body></html>"
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    hits = {}
+    active = 0
+    peak = 0
+    lock = threading.Lock()
+
+    def do_GET(self):
+        type(self).hits[self.path] = type(self).hits.get(self.path, 0) + 1
+        if self.path.startswith("/sleep"):
+            with Handler.lock:
+                Handler.active += 1
+                Handler.peak = max(Handler.peak, Handler.active)
+            time.sleep(float(self.path.rsplit("/", 1)[-1]))
+            with Handler.lock:
+                Handler.active -= 1
+        if self.path == "/missing":
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.headers.get("If-None-Match") == '"v1"':
+            self.send_response(304)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", '"v1"')
+        self.send_header("Content-Length", str(len(PAGE)))
+        self.end_headers()
+        self.wfile.write(PAGE)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    Handler.hits = {}
+    Handler.active = Handler.peak = 0
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def parses(monkeypatch):
+    calls = []
+    original = scrape_cache.extract_text
+    monkeypatch.setattr(scrape_cache, "extract_text", lambda *args, **kwargs: calls.append(1) or original(*args, **kwargs))
+    return calls
+
+
+def make_cache(tmp_path, **kwargs):
+    return PageCache(TwoTierCache("pages-test", path=str(tmp_path / "pages.sqlite"), ttl=3600), **kwargs)
+
+
+def test_fresh_entry_is_served_without_a_request(server, parses, tmp_path):
+    pages = make_cache(tmp_path)
+    assert pages.get_text(f"{server}/guide") == "Gardens by the Bay"
+    assert pages.get_text(f"{server}/guide") == "Gardens by the Bay"
+    assert Handler.hits["/guide"] == 1
+    assert len(parses) == 1
+
+
+def test_stale_entry_is_revalidated_and_304_skips_parsing(server, parses, tmp_path):
+    pages = make_cache(tmp_path, max_age=0)
+    pages.get_text(f"{server}/guide")
+    assert pages.get_text(f"{server}/guide") == "Gardens by the Bay"
+    assert Handler.hits["/guide"] == 2
+    assert len(parses) == 1
+    assert pages.metrics()["revalidated"] == 1
+
+
+def test_entries_survive_a_restart(server, tmp_path):
+    make_cache(tmp_path).get_text(f"{server}/guide")
+    restarted = make_cache(tmp_path)
+    assert restarted.get_text(f"{server}/guide") == "Gardens by the Bay"
+    assert Handler.hits["/guide"] == 1
+
+
+def test_failing_url_is_negatively_cached(server, tmp_path):
+    pages = make_cache(tmp_path)
+    with pytest.raises(Exception):
+        pages.get_text(f"{server}/missing")
+    with pytest.raises(ScrapeFailed):
+        pages.get_text(f"{server}/missing")
+    assert Handler.hits["/missing"] == 1
+    assert pages.metrics()["negative_hits"] == 1
+
+
+def test_extractor_skips_boilerplate_and_stops_once_enough_text_is_collected():
+    consumed = []
+
+    def chunks():
+        yield b"<html><body><nav>Home | Deals</nav><h1>Singapore</h1><scr"
+        yield b"ipt>var x = '<p>';</script><p>" + b"Hawker centres " * 20 + b"</p>"
+        for i in range(100):
+            consumed.append(i)
+            yield b"<p>" + b"more text " * 50 + b"</p>"
+
+    text = scrape_cache.extract_text(chunks(), max_chars=500)
+    assert text.startswith("Singapore Hawker centres")
+    assert "Deals" not in text and "var x" not in text
+    assert text.endswith("...") and len(text) == 503
+    assert len(consumed) <= 2
+
+
+def test_charset_comes_from_content_type_then_meta_tag():
+    assert scrape_cache.declared_charset("text/html; charset=ISO-8859-1") == "ISO-8859-1"
+    assert scrape_cache.declared_charset("text/html") is None
+    assert scrape_cache.extract_text([b"<p>caf\xc3\xa9</p>"], None) == "café"
+    latin = b'<html><head><meta charset="iso-8859-1"></head><body><p>caf\xe9</p></body></html>'
+    assert scrape_cache.extract_text([latin[:40], latin[40:]], None) == "café"
+    http_equiv = b'<meta http-equiv="Content-Type" content="text/html; charset=windows-1252"><p>\x93hi\x94</p>'
+    assert scrape_cache.extract_text([http_equiv], None) == "\u201chi\u201d"
+    # the header wins over the document
+    assert scrape_cache.extract_text([latin], "utf-8") == "caf\ufffd"
+
+
+def test_concurrent_fetches_of_one_url_share_a_request(server, tmp_path):
+    pages = make_cache(tmp_path)
+    url = f"{server}/sleep/shared/0.3"
+    results, errors = [], []
+
+    def fetch():
+        try:
+            results.append(pages.get_text(url))
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=fetch) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert results == ["Gardens by the Bay"] * 4
+    assert Handler.hits["/sleep/shared/0.3"] == 1
+
+
+def test_get_many_respects_per_host_limit(server, tmp_path):
+    pages = make_cache(tmp_path)
+    urls = [f"{server}/sleep/{i}/0.2" for i in range(4)]
+    started = time.perf_counter()
+    results = pages.get_many(urls, per_host=2, deadline=5)
+    assert [r["status"] for r in results] == ["ok"] * 4
+    assert Handler.peak == 2
+    assert time.perf_counter() - started >= 0.4
+
+
+def test_get_many_returns_partial_results_at_the_deadline(server, tmp_path):
+    pages = make_cache(tmp_path)
+    results = pages.get_many([f"{server}/guide", f"{server}/sleep/slow/1.0", f"{server}/missing"], deadline=0.5)
+    assert [(r["url"].rsplit("/", 1)[-1], r["status"]) for r in results] == [
+        ("guide", "ok"), ("1.0", "timeout"), ("missing", "error"),
+    ]
+    assert results[0]["text"] == "Gardens by the Bay"
+
+
+def test_urls_queued_at_the_deadline_time_out_and_still_warm_the_cache(server, tmp_path):
+    pages = make_cache(tmp_path)
+    urls = [f"{server}/sleep/a/0.3", f"{server}/sleep/b/0.3"]
+    # one slot for the host: b is still queued behind a when the deadline passes
+    results = pages.get_many(urls, per_host=1, deadline=0.1)
+    assert [r["status"] for r in results] == ["timeout", "timeout"]
+
+    deadline = time.time() + 5
+    while pages.metrics()["fetched"] < 2 and time.time() < deadline:
+        time.sleep(0.05)
+    assert [r["status"] for r in pages.get_many(urls, deadline=0.1)] == ["ok", "ok"]
+    assert Handler.hits == {"/sleep/a/0.3": 1, "/sleep/b/0.3": 1}
@@ -0,0 +1,58 @@
+# tests/test_stopover_evaluator.py
+import numpy as np
+
+from travel_planner.affinity import AffinityMatrix
+from travel_planner.evaluation.bench_stopover import INTERESTS, batched_rank, legacy_rank, make_offers
+from travel_planner.tools.scoring import rank_offers, top_k
+from travel_planner.tools.stopover_evaluator import StopoverEvaluator
+
+
+def test_evaluator_returns_top_two_by_default():
+    offers = [
+        {"id": "1", "price": {"total": "401.74"},
+         "itineraries": [{"segments": [{"arrival": {"iataCode": "HKG"}}, {"arrival": {"iataCode": "BLR"}}]}]},
+        {"id": "2", "price": "€438.90"},
+        {"id": "3", "price": {"total": "380.00"}, "itineraries": [{"segments": [{"arrival": {"iataCode": "BLR"}}]}]},
+        {"id": "4"},
+    ]
+    # without an affinity matrix the cheaper direct flight wins
+    result = StopoverEvaluator()._run(offers, ["culture", "food"])
+    assert [r["id"] for r in result] == ["3", "1"]
+    assert result[1]["stopover_city"] == "HKG"
+    assert result[0]["summary"] == "Flight 3: €380.0 via Direct"
+
+
+def test_interest_bonus_and_configurable_k():
+    offers = make_offers(500)
+    assert batched_rank(offers, INTERESTS, k=5, affinity=AffinityMatrix.empty()) == legacy_rank(offers, INTERESTS, k=5)
+    result = StopoverEvaluator()._run(offers, INTERESTS, top_k=5)
+    assert [r["id"] for r in result] == legacy_rank(offers, INTERESTS, k=5)
+
+
+def test_affinity_matrix_reorders_the_evaluator_ranking(monkeypatch):
+    from travel_planner.tools import scoring
+    offers = make_offers(500)
+    # a matrix that loves the stopover of a connection just outside the cheapest five
+    by_id = {o["id"]: o for o in offers}
+    segments = next(by_id[i]["itineraries"][0]["segments"] for i in legacy_rank(offers, [], k=len(offers))[5:]
+                    if len(by_id[i]["itineraries"][0]["segments"]) > 1)
+    hub = segments[0]["arrival"]["iataCode"]
+    matrix = AffinityMatrix([hub], np.ones((1, 8)))
+    monkeypatch.setattr(scoring, "get_affinity_matrix", lambda: matrix)
+    result = StopoverEvaluator()._run(offers, ["food"], top_k=5)
+    assert result[0]["stopover_city"] == hub
+    assert [r["id"] for r in result] == batched_rank(offers, ["food"], k=5, affinity=matrix)
+    assert [r["id"] for r in result] != legacy_rank(offers, ["food"], k=5)
+
+
+def test_top_k_breaks_ties_by_input_order():
+    scores = np.array([5.0, 1.0, 3.0, 1.0, 1.0, 0.5])
+    assert top_k(scores, 3).tolist() == [5, 1, 3]
+    assert top_k(scores, 10).tolist() == [5, 1, 3, 4, 2, 0]
+
+
+def test_rank_offers_extracts_columns():
+    batch, ranked, scores = rank_offers(make_offers(20), [], k=1)
+    assert len(batch) == 20
+    assert not np.isnan(batch.duration).any()
+    assert scores[ranked[0]] == scores.min()